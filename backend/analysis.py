@@ -0,0 +1,77 @@
+"""
+Analysis Module for ProXplore
+Shared text analysis for indexing and querying
+
+One Analyzer is used by the ranker and the query processor, so documents and
+queries are tokenized identically and the corpus is tokenized once per build.
+"""
+
+import re
+import sys
+
+# Words: runs of letters, digits and underscores
+TOKEN_PATTERN = re.compile(r'\w+')
+
+
+class Analyzer:
+    """
+    Lowercases and splits text into word tokens, then applies the optional
+    stopword and stemming stages. Tokens are interned, so every occurrence of
+    a word shares one string object across postings, vocabularies and caches.
+    """
+
+    def __init__(self, stopwords=None, stemmer=None):
+        """
+        stopwords: Tokens to drop (default: keep every token)
+        stemmer: Callable mapping a token to its stem, e.g. a Porter stemmer's
+                 stem method (default: no stemming). Must be picklable for
+                 parallel builds.
+        """
+        self.stopwords = frozenset(stopwords) if stopwords else None
+        self.stemmer = stemmer
+        self._stems = {}
+
+    def __getstate__(self):
+        # The stem cache is rebuilt lazily in worker processes
+        state = self.__dict__.copy()
+        state['_stems'] = {}
+        return state
+
+    def tokenize(self, text):
+        """
+        Analyzes `text` into a list of tokens
+
+        Args:
+            text (str): Text to analyze
+
+        Returns:
+            list: Tokens in text order
+        """
+        if not text:
+            return []
+        tokens = TOKEN_PATTERN.findall(text.lower())
+        if self.stopwords:
+            stopwords = self.stopwords
+            tokens = [token for token in tokens if token not in stopwords]
+        if self.stemmer is not None:
+            return [self._stem(token) for token in tokens]
+        return list(map(sys.intern, tokens))
+
+    def _stem(self, token):
+        stem = self._stems.get(token)
+        if stem is None:
+            stem = self._stems[token] = sys.intern(self.stemmer(token))
+        return stem
+
+    def analyze(self, doc):
+        """
+        Analyzes a document's fields
+
+        Returns:
+            tuple: (title tokens, content tokens)
+        """
+        return self.tokenize(doc.get('title', '')), self.tokenize(doc.get('content', ''))
+
+
+# Default analyzer: lowercase word tokens, no stopwords or stemming
+DEFAULT_ANALYZER = Analyzer()
@@ -0,0 +1,127 @@
+"""
+Crawl State Module for ProXplore
+Per-URL validators, content hashes and fingerprints kept between crawler runs
+
+For every crawled URL the store keeps the ETag and Last-Modified headers of
+the last response, a hash of the extracted page, its SimHash fingerprint and,
+for pages whose links were followed, its outgoing links. A recrawl sends the
+validators back as a conditional request and compares the hash, so unchanged
+pages are neither re-extracted nor re-emitted; the fingerprint of even an
+unchanged page is checked for near-duplicates, and its stored links are
+followed.
+"""
+
+import json
+import os
+import time
+
+STATE_VERSION = 1
+
+
+class CrawlState:
+    """
+    url -> {'etag', 'last_modified', 'content_hash', 'simhash', 'links', 'duplicate_of', 'crawled_at'}
+
+    'links' is set for pages whose links were collected; 'duplicate_of' for
+    pages left out of the snapshot as near-duplicates of that (canonical) URL.
+    """
+
+    def __init__(self, entries=None):
+        self.entries = entries if entries is not None else {}
+
+    @staticmethod
+    def load(filepath):
+        """
+        Loads a saved state; a missing or unreadable file gives an empty state
+        (every page is then fetched unconditionally)
+        """
+        if not os.path.exists(filepath):
+            return CrawlState()
+        try:
+            with open(filepath, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('version') != STATE_VERSION:
+                print(f"Ignoring crawl state with unsupported version {data.get('version')}")
+                return CrawlState()
+            return CrawlState(data['urls'])
+        except Exception as e:
+            print(f"Error loading crawl state: {e}")
+            return CrawlState()
+
+    def save(self, filepath):
+        """Writes the state atomically (a crash leaves the previous file intact)"""
+        tmp_path = filepath + '.tmp'
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'version': STATE_VERSION, 'urls': self.entries}, f, ensure_ascii=False)
+            os.replace(tmp_path, filepath)
+        except Exception as e:
+            print(f"Error saving crawl state: {e}")
+
+    def get(self, url):
+        return self.entries.get(url)
+
+    def links(self, url):
+        """Stored outgoing links of `url`, or None if they were not collected"""
+        entry = self.entries.get(url)
+        return entry.get('links') if entry else None
+
+    def conditional_headers(self, url):
+        """If-None-Match / If-Modified-Since headers for a recrawl of `url`"""
+        entry = self.entries.get(url)
+        headers = {}
+        if entry:
+            if entry.get('etag'):
+                headers['If-None-Match'] = entry['etag']
+            if entry.get('last_modified'):
+                headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def update(self, url, etag=None, last_modified=None, content_hash=None, simhash=None, links=None):
+        """
+        Records a fetch of `url`. A content_hash of None (e.g. after a 304)
+        keeps the stored hash, fingerprint and links; otherwise `links` (None
+        if they were not collected) replaces the stored links.
+        """
+        entry = self.entries.setdefault(url, {})
+        entry['etag'] = etag
+        entry['last_modified'] = last_modified
+        if content_hash is not None:
+            entry['content_hash'] = content_hash
+            entry['simhash'] = simhash
+            if links is None:
+                entry.pop('links', None)
+            else:
+                entry['links'] = links
+        entry['crawled_at'] = time.time()
+
+    def remove(self, url):
+        self.entries.pop(url, None)
+
+    def __contains__(self, url):
+        return url in self.entries
+
+    def __len__(self):
+        return len(self.entries)
+
+
+def load_snapshot(filepath):
+    """
+    Reads a crawler NDJSON output file
+
+    Returns:
+        dict: url -> NDJSON line (without the newline), in file order
+    """
+    documents = {}
+    if not os.path.exists(filepath):
+        return documents
+    with open(filepath, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                documents[json.loads(line)['url']] = line
+            except (ValueError, KeyError):
+                continue
+    return documents
@@ -1,13 +1,125 @@
 """
 ProXplore Web Crawler
-Crawls popular tech websites and stores content in NDJSON format
+Crawls popular tech websites, following their links, and stores content in
+NDJSON format
+
+Pages are fetched concurrently with asyncio over one pooled keep-alive HTTP
+session. A global limit caps the requests in flight, each host is contacted
+at most once every HOST_DELAY seconds, and transient failures are retried
+with exponential backoff.
+
+Links found on fetched pages are queued in a frontier (see frontier.py) that
+schedules hosts politely and is checkpointed, so an interrupted crawl resumes
+where it stopped; robots.txt is honored per host.
+
+Recrawls are incremental: pages in the previous snapshot are requested
+conditionally (ETag / Last-Modified) and compared by content hash, and the
+added, updated and removed documents are also written to DELTA_FILE. Each
+change is flushed as it happens, so a running server follows the crawl
+through that log (see delta_log.py) without waiting for the new snapshot.
+
+Near-duplicate pages (mirrors, localized copies) are left out of the
+snapshot: every page's text is fingerprinted with SimHash (see dedup.py) and
+a page close to one already kept is recorded under that canonical URL.
 """
 
-import requests
-import time
+import argparse
+import asyncio
+import json
+import os
 import sys
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import urlsplit
+from urllib.robotparser import RobotFileParser
+import aiohttp
 from bs4 import BeautifulSoup
-from database import format_ndjson, clean_text
+from crawl_state import CrawlState, load_snapshot
+from dedup import SimHashIndex, simhash
+from frontier import Frontier, normalize_url, url_host, save_checkpoint, load_checkpoint
+from database import format_ndjson, format_delta, content_hash, clean_text
+
+try:
+    import lxml  # noqa: F401 (optional, much faster BeautifulSoup backend)
+    HTML_PARSER = 'lxml'
+except ImportError:
+    HTML_PARSER = 'html.parser'
+
+
+# Requests in flight across all hosts
+MAX_CONCURRENCY = 16
+
+# Politeness: minimum seconds between requests to the same host
+HOST_DELAY = 1.0
+
+# Seconds allowed for a whole request, including reading the body
+REQUEST_TIMEOUT = 10
+
+# Retries of timeouts, connection errors and retryable statuses
+MAX_RETRIES = 2
+RETRY_BACKOFF = 1.0  # seconds before the first retry, doubled for each next one
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# Statuses meaning a page was removed from its site
+GONE_STATUSES = {404, 410}
+
+# Output files: the full snapshot, the changes of the last run, and the
+# per-URL state used for conditional recrawls
+INDEX_FILE = 'index.json'
+DELTA_FILE = 'index_delta.ndjson'
+STATE_FILE = 'crawl_state.json'
+CHECKPOINT_FILE = 'crawl_checkpoint.json'
+
+# Crawl outcomes of a page (ADDED, UPDATED and REMOVED are delta ops)
+ADDED = 'add'
+UPDATED = 'update'
+REMOVED = 'delete'
+UNCHANGED = 'unchanged'
+BLOCKED = 'blocked'
+FAILED = 'failed'
+DUPLICATE = 'duplicate'
+
+# Pages whose text fingerprints differ in at most this many of 64 bits are
+# near-duplicates; only the first one crawled is kept (None keeps them all)
+DEDUP_MAX_DISTANCE = 3
+
+# Characters of page text stored per document
+MAX_CONTENT_CHARS = 5000
+
+# Bytes of a page body downloaded at most; longer pages are cut off (the
+# first part of a page holds far more than MAX_CONTENT_CHARS of text)
+MAX_PAGE_BYTES = 512 * 1024
+READ_CHUNK_BYTES = 64 * 1024
+
+# Content types that are downloaded and extracted
+HTML_CONTENT_TYPES = {'text/html', 'application/xhtml+xml'}
+
+# Link following: depth from the seeds and page limits
+MAX_DEPTH = 2
+MAX_PAGES = 10000
+MAX_PAGES_PER_HOST = 500
+MAX_LINKS_PER_PAGE = 200
+
+# Sites crawled ahead of all others
+PRIORITY_DOMAINS = ('proxentix.in', 'proxpl.in')
+
+# robots.txt handling
+ROBOTS_USER_AGENT = 'ProXplore-Crawler'
+MAX_ROBOTS_BYTES = 512 * 1024
+MAX_CRAWL_DELAY = 30.0  # seconds; longer Crawl-delay values are capped
+
+# Seconds between frontier checkpoints, and between frontier polls of idle workers
+CHECKPOINT_INTERVAL = 30.0
+POLL_INTERVAL = 0.05
+
+# Processes extracting fetched pages (0 = a thread in the crawler process)
+EXTRACT_WORKERS = os.cpu_count() or 1
+
+HEADERS = {
+    'User-Agent': 'ProXplore-Crawler/1.0 (Educational Search Engine)',
+    'Accept': 'text/html,application/xhtml+xml',
+    'Accept-Language': 'en-US,en;q=0.9',
+}
 
 
 # Target websites to crawl
@@ -71,6 +183,27 @@ TARGETS = [
 ]
 
 
+def _parse(html, encoding=None):
+    """
+    Parses HTML with the fastest available BeautifulSoup backend. Raw bytes
+    are decoded with `encoding` if given, else with the encoding declared
+    in the page or detected from it.
+    """
+    if isinstance(html, bytes):
+        return BeautifulSoup(html, HTML_PARSER, from_encoding=encoding)
+    return BeautifulSoup(html, HTML_PARSER)
+
+
+def _soup_text(soup):
+    """Clean text of a parsed page, without scripts, styles and page chrome"""
+    # Remove script and style elements
+    for script in soup(["script", "style", "nav", "footer", "header"]):
+        script.decompose()
+    
+    # Get text and clean it
+    return clean_text(soup.get_text())
+
+
 def strip_tags(html):
     """
     Strips HTML tags and extracts clean text
@@ -82,109 +215,591 @@ def strip_tags(html):
         str: Clean text without HTML tags
     """
     try:
-        soup = BeautifulSoup(html, 'html.parser')
-        
-        # Remove script and style elements
-        for script in soup(["script", "style", "nav", "footer", "header"]):
-            script.decompose()
-        
-        # Get text
-        text = soup.get_text()
-        
-        # Clean text
-        return clean_text(text)
+        return _soup_text(_parse(html))
     except Exception as e:
         print(f"Error stripping tags: {e}")
         return ""
 
 
-def fetch_content(url):
+def _page_links(soup, url):
+    """Normalized http(s) links of a parsed page, in page order (nofollow links skipped)"""
+    base = url
+    base_tag = soup.find('base', href=True)
+    if base_tag is not None:
+        base = normalize_url(base_tag['href'], url) or url
+    links = {}
+    for anchor in soup.find_all('a', href=True):
+        if 'nofollow' in (anchor.get('rel') or ()):
+            continue
+        link = normalize_url(anchor['href'], base)
+        if link is not None:
+            links[link] = None
+            if len(links) >= MAX_LINKS_PER_PAGE:
+                break
+    return list(links)
+
+
+def extract_document(html, url, encoding=None, with_links=False):
     """
-    Fetches content from a URL
+    Extracts the title, clean text and (optionally) the outgoing links of a
+    page from a single parse. Runs in the crawler's extraction process pool.
     
     Args:
-        url (str): URL to fetch
+        html (str or bytes): HTML content (possibly cut off)
+        url (str): Page URL (title fallback and base of relative links)
+        encoding (str): Charset of raw bytes from the Content-Type header, if any
+        with_links (bool): Also collect links to follow
         
     Returns:
-        tuple: (html_content, title) or (None, None) on error
+        tuple: (title, text_content, links)
     """
     try:
-        print(f"Fetching: {url}")
+        soup = _parse(html, encoding)
+    except Exception as e:
+        print(f"Error parsing {url}: {e}")
+        return url, "", []
         
-        headers = {
-            'User-Agent': 'ProXplore-Crawler/1.0 (Educational Search Engine)',
-            'Accept': 'text/html,application/xhtml+xml',
-            'Accept-Language': 'en-US,en;q=0.9',
-        }
+    title = soup.title.string if soup.title else url
+    title = clean_text(title) if title else url
+    
+    # Links are read before the navigation is stripped from the tree
+    links = _page_links(soup, url) if with_links else []
+    
+    # Limit content size (first 5000 chars for memory efficiency)
+    try:
+        text_content = _soup_text(soup)[:MAX_CONTENT_CHARS]
+    except Exception as e:
+        print(f"Error stripping tags: {e}")
+        text_content = ""
+    return title, text_content, links
+
+
+def extract_fingerprinted(html, url, encoding=None, with_links=False):
+    """
+    extract_document, plus the SimHash fingerprint of the page text
+    
+    Returns:
+        tuple: (title, text_content, links, fingerprint)
+    """
+    title, text_content, links = extract_document(html, url, encoding, with_links)
+    return title, text_content, links, simhash(text_content)
+
+
+def extract_page(html, url, encoding=None):
+    """
+    Extracts the title and clean text of a page from a single parse
+    
+    Returns:
+        tuple: (title, text_content)
+    """
+    title, text_content, _ = extract_document(html, url, encoding)
+    return title, text_content
+
+
+class HostThrottle:
+    """
+    Spaces requests to each host at least `delay` seconds apart while requests
+    to other hosts proceed. A request takes its host's turn only once it also
+    holds a global concurrency slot, so slots are never held while sleeping.
+    """
+
+    def __init__(self, delay, concurrency):
+        self.delay = delay
+        self.slots = asyncio.Semaphore(concurrency)
+        self._locks = {}
+        self._next_start = {}  # host -> earliest loop time of its next request
+
+    async def acquire(self, host):
+        """Waits for the host's turn and a free slot; release() frees the slot"""
+        loop = asyncio.get_running_loop()
+        lock = self._locks.setdefault(host, asyncio.Lock())
+        async with lock:
+            wait = self._next_start.get(host, 0.0) - loop.time()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            await self.slots.acquire()
+            self._next_start[host] = loop.time() + self.delay
+
+    def release(self):
+        self.slots.release()
+
+
+class RobotsCache:
+    """
+    robots.txt rules per host, fetched once per crawl. Following RFC 9309, a
+    missing robots.txt (4xx) allows everything, while an unreachable one
+    (5xx or network error) disallows the host for this crawl.
+    """
+
+    def __init__(self):
+        self.rules = {}  # host -> RobotFileParser, or None if the host has no rules
+        self.unreachable = set()  # hosts whose robots.txt could not be read
+
+    async def check(self, crawler, session, throttle, frontier, url):
+        """
+        Checks `url` against its host's robots.txt
         
-        response = requests.get(url, headers=headers, timeout=10, allow_redirects=True)
-        response.raise_for_status()
+        Returns:
+            str: None if the page may be fetched, BLOCKED if robots.txt
+                 disallows it, FAILED if robots.txt is unreachable
+        """
+        key = normalize_url(url)
+        host = url_host(key)
+        if host not in self.rules:
+            rules = await crawler.fetch_robots(session, throttle, key)
+            if rules is False:
+                self.unreachable.add(host)
+                rules = None
+            self.rules[host] = rules
+            delay = rules.crawl_delay(ROBOTS_USER_AGENT) if rules is not None else None
+            if delay and float(delay) > frontier.host_delay:
+                frontier.set_delay(host, min(float(delay), MAX_CRAWL_DELAY))
+        if host in self.unreachable:
+            return FAILED
+        rules = self.rules[host]
+        if rules is not None and not rules.can_fetch(ROBOTS_USER_AGENT, key):
+            return BLOCKED
+        return None
+
+
+class AsyncCrawler:
+    """
+    Concurrent page fetcher writing crawled pages as NDJSON lines
+    """
+
+    def __init__(self, concurrency=MAX_CONCURRENCY, host_delay=HOST_DELAY, timeout=REQUEST_TIMEOUT,
+                 max_retries=MAX_RETRIES, backoff=RETRY_BACKOFF, extract_workers=EXTRACT_WORKERS,
+                 max_page_bytes=MAX_PAGE_BYTES, respect_robots=True, dedup_distance=DEDUP_MAX_DISTANCE):
+        """
+        concurrency: Requests in flight across all hosts (also the connection pool size)
+        host_delay: Minimum seconds between requests to one host
+        timeout: Seconds allowed per request attempt
+        max_retries: Extra attempts after a timeout, connection error or retryable status
+        backoff: Seconds before the first retry, doubled for each next one
+        extract_workers: Processes parsing fetched pages (0 = one background thread)
+        max_page_bytes: Bytes of a page body downloaded at most
+        respect_robots: Honor robots.txt rules and Crawl-delay
+        dedup_distance: Fingerprint bits near-duplicates differ in at most
+                        (None = keep near-duplicate pages)
+        """
+        self.concurrency = concurrency
+        self.host_delay = host_delay
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.extract_workers = extract_workers
+        self.max_page_bytes = max_page_bytes
+        self.respect_robots = respect_robots
+        self.dedup_distance = dedup_distance
+        self._extractor = None  # Process pool of the running crawl
+
+    def session(self):
+        """Pooled keep-alive HTTP session"""
+        connector = aiohttp.TCPConnector(limit=self.concurrency, keepalive_timeout=30)
+        return aiohttp.ClientSession(connector=connector, headers=HEADERS,
+                                     timeout=aiohttp.ClientTimeout(total=self.timeout))
+
+    async def fetch(self, session, throttle, url, headers=None):
+        """
+        Fetches a URL, retrying transient failures
         
-        html_content = response.text
+        Args:
+            headers (dict): Extra request headers (e.g. conditional request headers)
         
-        # Extract title
-        soup = BeautifulSoup(html_content, 'html.parser')
-        title = soup.title.string if soup.title else url
-        title = clean_text(title) if title else url
+        Returns:
+            tuple: (status, body, encoding, etag, last_modified); status is None
+                   on network errors, body (raw bytes, at most max_page_bytes)
+                   is None unless an HTML page was received, and encoding is
+                   the charset from the Content-Type header, if any
+        """
+        host = urlsplit(url).netloc.lower()
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                await asyncio.sleep(self.backoff * 2 ** (attempt - 1))
+            await throttle.acquire(host)
+            try:
+                print(f"Fetching: {url}")
+                async with session.get(url, headers=headers, allow_redirects=True) as response:
+                    if response.status in RETRY_STATUSES and attempt < self.max_retries:
+                        print(f"HTTP {response.status} fetching {url}, retrying")
+                        continue
+                    etag = response.headers.get('ETag')
+                    last_modified = response.headers.get('Last-Modified')
+                    if response.status == 304:
+                        return 304, None, None, etag, last_modified
+                    if response.status >= 400:
+                        print(f"Error fetching {url}: HTTP {response.status}")
+                        return response.status, None, None, None, None
+                    if 'Content-Type' in response.headers and response.content_type not in HTML_CONTENT_TYPES:
+                        print(f"Skipping {url}: not HTML ({response.content_type})")
+                        return response.status, None, None, None, None
+                    body = await self.read_body(response, url)
+                    return response.status, body, response.charset, etag, last_modified
+            except asyncio.TimeoutError:
+                print(f"Timeout fetching: {url}")
+            except aiohttp.ClientError as e:
+                print(f"Error fetching {url}: {e}")
+            except Exception as e:
+                print(f"Unexpected error fetching {url}: {e}")
+                return None, None, None, None, None
+            finally:
+                throttle.release()
+        return None, None, None, None, None
+
+    async def read_body(self, response, url):
+        """
+        Streams a response body, stopping once max_page_bytes have arrived
+        (the connection of a cut-off response is closed, not reused)
         
-        return html_content, title
+        Returns:
+            bytes: Up to max_page_bytes of the body
+        """
+        declared = response.content_length
+        if declared is not None and declared > self.max_page_bytes:
+            print(f"Large page {url} ({declared} bytes), keeping the first {self.max_page_bytes}")
+            
+        chunks = []
+        size = 0
+        async for chunk in response.content.iter_chunked(READ_CHUNK_BYTES):
+            chunks.append(chunk)
+            size += len(chunk)
+            if size >= self.max_page_bytes:
+                if size > self.max_page_bytes or not response.content.at_eof():
+                    response.close()
+                break
+        return b''.join(chunks)[:self.max_page_bytes]
+
+    async def fetch_robots(self, session, throttle, url):
+        """
+        Fetches and parses the robots.txt of `url`'s host
         
-    except requests.exceptions.Timeout:
-        print(f"Timeout fetching: {url}")
-        return None, None
-    except requests.exceptions.RequestException as e:
-        print(f"Error fetching {url}: {e}")
-        return None, None
-    except Exception as e:
-        print(f"Unexpected error fetching {url}: {e}")
-        return None, None
+        Returns:
+            RobotFileParser: The rules, None if the host has no robots.txt,
+                             or False if it could not be read
+        """
+        parts = urlsplit(url)
+        robots_url = f"{parts.scheme}://{parts.netloc}/robots.txt"
+        rules = RobotFileParser(robots_url)
+        await throttle.acquire(url_host(url))
+        try:
+            async with session.get(robots_url, allow_redirects=True) as response:
+                if 400 <= response.status < 500:
+                    return None
+                if response.status >= 500:
+                    print(f"robots.txt unavailable for {parts.netloc} (HTTP {response.status}), skipping host")
+                    return False
+                body = await response.content.read(MAX_ROBOTS_BYTES)
+                rules.parse(body.decode('utf-8', errors='replace').splitlines())
+                return rules
+        except (asyncio.TimeoutError, aiohttp.ClientError) as e:
+            print(f"robots.txt unreachable for {parts.netloc} ({e or 'timeout'}), skipping host")
+            return False
+        finally:
+            throttle.release()
 
+    async def crawl_page(self, session, throttle, url, state, previous, follow_links=False):
+        """
+        Fetches and extracts one page. Pages in the previous snapshot are
+        requested conditionally; a 304 has no body, so the links of a page
+        whose links are followed come from the crawl state (a page without
+        stored links is fetched unconditionally).
+        
+        Args:
+            state (CrawlState): Validators, content hashes and fingerprints; updated in place
+            previous (dict): url -> NDJSON line of the previous snapshot
+            follow_links (bool): Collect the page's links
+        
+        Returns:
+            tuple: (url, outcome, title, text_content, links); title and
+                   text_content are set for ADDED and UPDATED pages only
+        """
+        stored_links = state.links(url) if follow_links else None
+        use_validators = url in previous and (stored_links is not None or not follow_links)
+        headers = state.conditional_headers(url) if use_validators else None
+        status, body, encoding, etag, last_modified = await self.fetch(session, throttle, url, headers)
+        
+        if status == 304:
+            state.update(url, etag, last_modified)
+            return url, UNCHANGED, None, None, stored_links or []
+        if status in GONE_STATUSES:
+            state.remove(url)
+            return url, (REMOVED if url in previous else FAILED), None, None, []
+        if not body:
+            return url, FAILED, None, None, []
+            
+        # Parsing is CPU-bound: hand it to the extraction pool so it runs in
+        # parallel with other pages and never blocks fetching
+        loop = asyncio.get_running_loop()
+        title, text_content, links, fingerprint = await loop.run_in_executor(
+            self._extractor, extract_fingerprinted, body, url, encoding, follow_links)
+        page_hash = content_hash(title, text_content)
+        entry = state.get(url)
+        unchanged = url in previous and entry is not None and entry.get('content_hash') == page_hash
+        state.update(url, etag, last_modified, page_hash, fingerprint, links if follow_links else None)
+        if unchanged:
+            return url, UNCHANGED, None, None, links
+        return url, (UPDATED if url in previous else ADDED), title, text_content, links
 
-def main():
+    async def crawl(self, urls, output_file, state=None, previous=None, delta_file=None,
+                    frontier=None, checkpoint_path=None, stats=None):
+        """
+        Crawls from the seed `urls` and writes the new snapshot to
+        `output_file` as NDJSON lines (in completion order). Unchanged pages,
+        pages that failed to fetch and pages still queued when the page
+        budget ran out keep their line from the previous snapshot; previous
+        pages not reached by this crawl are removed.
+        Pages that near-duplicate a page already kept are left out.
+        
+        Args:
+            urls (list): Seed URLs
+            output_file: Text file receiving the full snapshot
+            state (CrawlState): Per-URL state from the last run (default: empty,
+                                so every page is fetched unconditionally)
+            previous (dict): url -> NDJSON line of the previous snapshot
+                             (see crawl_state.load_snapshot)
+            delta_file: Optional text file receiving only the added, updated
+                        and removed documents (see database.format_delta)
+            frontier (Frontier): Frontier to crawl, e.g. restored from a
+                                 checkpoint (default: the seeds only, no links)
+            checkpoint_path (str): File the frontier and progress are saved to
+                                   every CHECKPOINT_INTERVAL seconds and when
+                                   the crawl is interrupted
+            stats (Counter): Outcome counts of an interrupted run to continue
+        
+        Returns:
+            Counter: Pages per outcome (ADDED, UPDATED, UNCHANGED, REMOVED,
+                     DUPLICATE, BLOCKED, FAILED)
+        """
+        state = state if state is not None else CrawlState()
+        previous = previous or {}
+        stats = Counter(stats or {})
+        if frontier is None:
+            frontier = Frontier(max_depth=0, host_delay=self.host_delay)
+        for url in urls:
+            frontier.push(url, 0)
+        
+        # Fingerprints of the pages kept so far (on resume: the pages finished
+        # before the checkpoint)
+        kept = SimHashIndex(self.dedup_distance) if self.dedup_distance is not None else None
+        if kept is not None and stats:
+            pending = {url for queue in frontier.queues.values() for url, _ in queue}
+            pending.update(frontier.in_flight)
+            for url, entry in state.entries.items():
+                if (entry.get('simhash') is not None and 'duplicate_of' not in entry
+                        and url not in pending and normalize_url(url) in frontier.seen):
+                    kept.add(url, entry['simhash'])
+        
+        def emit_delta(line):
+            if delta_file is not None:
+                # Flushed per change: the server indexes the log as it grows
+                delta_file.write(line + '\n')
+                delta_file.flush()
+        
+        def canonical_of(url):
+            """URL of a kept page that `url` near-duplicates; None if `url` is kept"""
+            entry = state.get(url)
+            if kept is None or entry is None:
+                return None
+            if 'simhash' not in entry and url in previous:
+                # State written before fingerprints were recorded
+                entry['simhash'] = simhash(json.loads(previous[url]).get('content', ''))
+            fingerprint = entry.get('simhash')
+            canonical = kept.find(fingerprint, exclude=url) if fingerprint is not None else None
+            if canonical is None:
+                entry.pop('duplicate_of', None)
+                if fingerprint is not None:
+                    kept.add(url, fingerprint)
+            else:
+                entry['duplicate_of'] = canonical
+                kept.remove(url)
+            return canonical
+        
+        def record(url, depth, outcome, title, text_content, links):
+            canonical = canonical_of(url) if outcome in (ADDED, UPDATED, UNCHANGED) else None
+            if canonical is not None:
+                outcome = DUPLICATE
+            stats[outcome] += 1
+            progress = f"[{sum(stats.values())} done, {len(frontier) - 1} queued]"
+            if depth < frontier.max_depth:
+                for link in links:
+                    frontier.push(link, depth + 1)
+            if outcome in (ADDED, UPDATED):
+                output_file.write(format_ndjson(title, url, text_content) + '\n')
+                emit_delta(format_delta(outcome, url, title, text_content))
+                print(f"✓ Indexed {progress}: {url}")
+            elif outcome == UNCHANGED:
+                output_file.write(previous[url] + '\n')
+                print(f"= Unchanged {progress}: {url}")
+            elif outcome == REMOVED:
+                emit_delta(format_delta(REMOVED, url))
+                print(f"- Removed {progress}: {url}")
+            elif outcome == DUPLICATE:
+                if url in previous:
+                    emit_delta(format_delta(REMOVED, url))
+                print(f"≈ Duplicate of {canonical} {progress}: {url}")
+            elif outcome == BLOCKED:
+                print(f"⊘ Disallowed by robots.txt {progress}: {url}")
+            else:
+                if url in previous:
+                    output_file.write(previous[url] + '\n')
+                print(f"✗ Failed {progress}: {url}")
+        
+        def checkpoint():
+            output_file.flush()
+            if delta_file is not None:
+                delta_file.flush()
+            save_checkpoint(checkpoint_path, frontier, {
+                'stats': dict(stats),
+                'state': state.entries,
+                'output_offset': output_file.tell(),
+                'delta_offset': delta_file.tell() if delta_file is not None else 0,
+            })
+        
+        loop = asyncio.get_running_loop()
+        last_checkpoint = loop.time()
+        
+        async def worker(session, throttle, robots):
+            nonlocal last_checkpoint
+            while True:
+                entry = frontier.pop(loop.time())
+                if entry is None:
+                    wait = frontier.wait_time(loop.time())
+                    if wait is None and not frontier.in_flight:
+                        return
+                    await asyncio.sleep(POLL_INTERVAL if wait is None else min(wait, POLL_INTERVAL))
+                    continue
+                    
+                url, depth = entry
+                try:
+                    refused = await robots.check(self, session, throttle, frontier, url) if robots else None
+                    if refused == BLOCKED:
+                        state.remove(url)
+                        result = (url, REMOVED if url in previous else BLOCKED, None, None, [])
+                    elif refused == FAILED:
+                        result = (url, FAILED, None, None, [])
+                    else:
+                        result = await self.crawl_page(session, throttle, url, state, previous,
+                                                       depth < frontier.max_depth)
+                except Exception as e:
+                    print(f"Unexpected error crawling {url}: {e}")
+                    result = (url, FAILED, None, None, [])
+                record(url, depth, *result[1:])
+                frontier.done(url, loop.time())
+                
+                if checkpoint_path and loop.time() - last_checkpoint >= CHECKPOINT_INTERVAL:
+                    checkpoint()
+                    last_checkpoint = loop.time()
+        
+        throttle = HostThrottle(self.host_delay, self.concurrency)
+        robots = RobotsCache() if self.respect_robots else None
+        if self.extract_workers > 0:
+            self._extractor = ProcessPoolExecutor(max_workers=self.extract_workers)
+        completed = False
+        async with self.session() as session:
+            workers = [asyncio.ensure_future(worker(session, throttle, robots)) for _ in range(self.concurrency)]
+            try:
+                await asyncio.gather(*workers)
+                completed = True
+            finally:
+                for task in workers:
+                    task.cancel()
+                await asyncio.gather(*workers, return_exceptions=True)
+                if self._extractor is not None:
+                    self._extractor.shutdown(wait=False, cancel_futures=True)
+                    self._extractor = None
+                if not completed and checkpoint_path:
+                    # Pages in flight are saved as pending and fetched again on resume
+                    checkpoint()
+                    print(f"Crawl progress saved to {checkpoint_path}")
+                    
+        # Previous pages still queued when the page budget ran out are kept
+        # as they were; those this crawl did not reach (no longer linked, past
+        # the depth or host limits, or dropped from the seeds) are removed
+        pending = {url for queue in frontier.queues.values() for url, _ in queue}
+        for url in previous:
+            key = normalize_url(url)
+            if url in pending:
+                output_file.write(previous[url] + '\n')
+            elif key is None or key not in frontier.seen:
+                state.remove(url)
+                emit_delta(format_delta(REMOVED, url))
+                stats[REMOVED] += 1
+        if pending:
+            print(f"Page budget reached: {len(pending)} queued pages left for the next crawl")
+        return stats
+
+
+def parse_args(argv):
+    """Command line options of the crawler"""
+    parser = argparse.ArgumentParser(description="ProXplore Web Crawler")
+    parser.add_argument('--max-depth', type=int, default=MAX_DEPTH,
+                        help=f"link depth followed from the seed sites (default {MAX_DEPTH}, 0 = seeds only)")
+    parser.add_argument('--max-pages', type=int, default=MAX_PAGES,
+                        help=f"pages fetched at most (default {MAX_PAGES})")
+    parser.add_argument('--max-pages-per-host', type=int, default=MAX_PAGES_PER_HOST,
+                        help=f"pages fetched at most per host (default {MAX_PAGES_PER_HOST})")
+    parser.add_argument('--restart', action='store_true',
+                        help="ignore an interrupted crawl's checkpoint and start over")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
     """Main crawler function"""
+    args = parse_args(argv)
     print("Starting ProXplore Crawler...")
-    print(f"Crawling {len(TARGETS)} websites...\n")
-    
-    indexed_count = 0
-    failed_count = 0
     
+    tmp_path = INDEX_FILE + '.tmp'
+    resumed = None if args.restart else load_checkpoint(CHECKPOINT_FILE)
+    if resumed is not None and not os.path.exists(tmp_path):
+        print("Checkpoint has no partial output, starting over")
+        resumed = None
+        
     try:
-        with open('index.json', 'w', encoding='utf-8') as output_file:
-            for idx, url in enumerate(TARGETS):
-                # Politeness: Wait 1 second between requests
-                if idx > 0:
-                    time.sleep(1)
-                
-                # Fetch content
-                html_content, title = fetch_content(url)
-                
-                if html_content:
-                    # Clean content
-                    text_content = strip_tags(html_content)
-                    
-                    # Limit content size (first 5000 chars for memory efficiency)
-                    if len(text_content) > 5000:
-                        text_content = text_content[:5000]
-                    
-                    # Save to NDJSON
-                    ndjson_line = format_ndjson(title, url, text_content)
-                    output_file.write(ndjson_line + '\n')
-                    
-                    indexed_count += 1
-                    print(f"✓ Indexed [{idx + 1}/{len(TARGETS)}]: {url}")
-                else:
-                    failed_count += 1
-                    print(f"✗ Failed [{idx + 1}/{len(TARGETS)}]: {url}")
+        # Recrawl against the previous snapshot: unchanged pages are skipped
+        previous = load_snapshot(INDEX_FILE)
+        if resumed is not None:
+            # Continue an interrupted crawl: output written after its last
+            # checkpoint is dropped and those pages are fetched again
+            frontier, progress = resumed
+            state = CrawlState(progress['state'])
+            stats = Counter(progress['stats'])
+            output_file = open(tmp_path, 'r+', encoding='utf-8')
+            output_file.truncate(progress['output_offset'])
+            output_file.seek(0, os.SEEK_END)
+            delta_file = open(DELTA_FILE, 'a+', encoding='utf-8')
+            delta_file.truncate(progress['delta_offset'])
+            print(f"Resuming crawl: {frontier.dispatched()} pages done, {len(frontier)} queued\n")
+        else:
+            frontier = Frontier(args.max_depth, args.max_pages, args.max_pages_per_host,
+                                HOST_DELAY, PRIORITY_DOMAINS)
+            state = CrawlState.load(STATE_FILE)
+            stats = None
+            # The new snapshot replaces index.json only once it is complete
+            output_file = open(tmp_path, 'w', encoding='utf-8')
+            delta_file = open(DELTA_FILE, 'w', encoding='utf-8')
+            print(f"Crawling from {len(TARGETS)} websites (depth {args.max_depth}, "
+                  f"up to {args.max_pages} pages)...\n")
+            
+        with output_file, delta_file:
+            stats = asyncio.run(AsyncCrawler().crawl(TARGETS, output_file, state, previous, delta_file,
+                                                     frontier, CHECKPOINT_FILE, stats))
+        os.replace(tmp_path, INDEX_FILE)
+        state.save(STATE_FILE)
+        if os.path.exists(CHECKPOINT_FILE):
+            os.remove(CHECKPOINT_FILE)
         
         print(f"\n{'='*60}")
         print(f"Crawling Complete!")
-        print(f"Successfully indexed: {indexed_count}")
-        print(f"Failed: {failed_count}")
-        print(f"Data saved to: index.json")
+        print(f"Successfully indexed: {stats[ADDED] + stats[UPDATED] + stats[UNCHANGED]}")
+        print(f"Added: {stats[ADDED]}, Updated: {stats[UPDATED]}, "
+              f"Unchanged: {stats[UNCHANGED]}, Removed: {stats[REMOVED]}")
+        print(f"Near-duplicates skipped: {stats[DUPLICATE]}")
+        print(f"Failed: {stats[FAILED]}, Disallowed by robots.txt: {stats[BLOCKED]}")
+        print(f"Data saved to: {INDEX_FILE} (changes in {DELTA_FILE})")
         print(f"{'='*60}")
         
     except KeyboardInterrupt:
-        print("\n\nCrawling interrupted by user.")
+        print("\n\nCrawling interrupted by user. Run the crawler again to resume.")
         sys.exit(0)
     except Exception as e:
         print(f"\nFatal error: {e}")
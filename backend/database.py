@@ -1,8 +1,9 @@
 """
 Database Module for ProXplore
-Handles JSON escaping and NDJSON formatting
+Handles JSON escaping, NDJSON formatting, content hashes and corpus checksums
 """
 
+import hashlib
 import json
 import re
 
@@ -40,6 +41,41 @@ def format_ndjson(title, url, content):
     return json.dumps(result, ensure_ascii=False)
 
 
+def format_delta(op, url, title=None, content=None):
+    """
+    Formats a crawl change as a single NDJSON line
+    
+    Args:
+        op (str): 'add', 'update' or 'delete'
+        url (str): Page URL
+        title (str): Page title (add/update only)
+        content (str): Page content (add/update only)
+        
+    Returns:
+        str: NDJSON formatted line ({"op": ..., "title": ..., "url": ..., "content": ...};
+             deletes carry only "op" and "url")
+    """
+    result = {"op": op}
+    if op == 'delete':
+        result["url"] = url
+    else:
+        result.update(title=title, url=url, content=content)
+    return json.dumps(result, ensure_ascii=False)
+
+
+def content_hash(title, content):
+    """
+    Hashes the extracted title and content of a page
+    
+    Returns:
+        str: Hex SHA-256 digest
+    """
+    digest = hashlib.sha256(title.encode('utf-8'))
+    digest.update(b'\0')
+    digest.update(content.encode('utf-8'))
+    return digest.hexdigest()
+
+
 def clean_text(text):
     """
     Cleans text by removing extra whitespace and normalizing
@@ -55,3 +91,21 @@ def clean_text(text):
     # Remove leading/trailing whitespace
     text = text.strip()
     return text
+
+
+def file_checksum(path, chunk_size=1 << 20):
+    """
+    Computes the SHA-256 digest of a file without loading it into memory
+    
+    Args:
+        path (str): File path
+        chunk_size (int): Read size in bytes
+        
+    Returns:
+        bytes: 32-byte digest
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.digest()
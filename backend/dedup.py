@@ -0,0 +1,245 @@
+"""
+Dedup Module for ProXplore
+Near-duplicate detection with SimHash fingerprints
+
+A page's fingerprint is the 64-bit SimHash of its word shingles: every
+shingle hash votes on every bit, weighted by how often the shingle occurs, so
+pages that share most of their text get fingerprints differing in few bits.
+Pages whose fingerprints are within `max_distance` bits of each other are
+near-duplicates (mirrors, localized copies, boilerplate-only pages).
+
+The index splits fingerprints into max_distance + 1 blocks. Two fingerprints
+within max_distance bits agree exactly on at least one block, so a lookup
+only compares against the pages sharing a block value with the fingerprint
+instead of the whole corpus.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+from collections import Counter
+from analysis import TOKEN_PATTERN
+
+FINGERPRINT_BITS = 64
+
+# Words per shingle
+SHINGLE_SIZE = 3
+
+# Fingerprints differing in at most this many bits are near-duplicates
+MAX_DISTANCE = 3
+
+# Per-byte lookup tables spreading the bits of a hash byte over 16-bit lanes of
+# one integer, so a shingle's votes on all 64 bits are added in one step
+_LANE_BITS = 16
+_LANE_TABLES = [
+    [sum(1 << ((byte * 8 + bit) * _LANE_BITS) for bit in range(8) if value >> bit & 1) for value in range(256)]
+    for byte in range(FINGERPRINT_BITS // 8)
+]
+
+
+def shingles(text, size=SHINGLE_SIZE):
+    """
+    Word shingles of a text
+
+    Returns:
+        Counter: shingle -> occurrences (a text shorter than `size` words is
+                 one shingle; an empty text has none)
+    """
+    words = TOKEN_PATTERN.findall(text.lower()) if text else []
+    if len(words) <= size:
+        return Counter([' '.join(words)] if words else [])
+    return Counter(' '.join(words[i:i + size]) for i in range(len(words) - size + 1))
+
+
+def simhash(text, size=SHINGLE_SIZE):
+    """
+    SimHash fingerprint of a page's text
+
+    Args:
+        text (str): Clean page text (see crawler.strip_tags)
+        size (int): Words per shingle
+
+    Returns:
+        int: 64-bit fingerprint, or None for text without words
+    """
+    counts = shingles(text, size)
+    if not counts:
+        return None
+    t0, t1, t2, t3, t4, t5, t6, t7 = _LANE_TABLES
+    votes = 0
+    total = 0
+    for shingle, count in counts.items():
+        h = hashlib.blake2b(shingle.encode('utf-8'), digest_size=8).digest()
+        votes += count * (t0[h[0]] | t1[h[1]] | t2[h[2]] | t3[h[3]] | t4[h[4]] | t5[h[5]] | t6[h[6]] | t7[h[7]])
+        total += count
+        if total >= 1 << (_LANE_BITS - 1):
+            # Lanes are about to overflow: fold the votes into exact counts
+            return _simhash_large(counts)
+
+    fingerprint = 0
+    lane_mask = (1 << _LANE_BITS) - 1
+    for bit in range(FINGERPRINT_BITS):
+        if 2 * ((votes >> (bit * _LANE_BITS)) & lane_mask) > total:
+            fingerprint |= 1 << bit
+    return fingerprint
+
+
+def _simhash_large(counts):
+    """SimHash with unbounded per-bit counters, for texts with very many shingles"""
+    votes = [0] * FINGERPRINT_BITS
+    total = 0
+    for shingle, count in counts.items():
+        h = int.from_bytes(hashlib.blake2b(shingle.encode('utf-8'), digest_size=8).digest(), 'little')
+        total += count
+        for bit in range(FINGERPRINT_BITS):
+            if h >> bit & 1:
+                votes[bit] += count
+    return sum(1 << bit for bit in range(FINGERPRINT_BITS) if 2 * votes[bit] > total)
+
+
+def hamming_distance(a, b):
+    """Number of bits in which two fingerprints differ"""
+    return bin(a ^ b).count('1')
+
+
+class SimHashIndex:
+    """
+    key -> fingerprint, searchable for fingerprints within max_distance bits
+    """
+
+    def __init__(self, max_distance=MAX_DISTANCE):
+        """
+        max_distance: Largest number of differing bits between near-duplicates
+        """
+        self.max_distance = max_distance
+        blocks = max_distance + 1
+        # Bit ranges of the blocks, as even as possible
+        bounds = [FINGERPRINT_BITS * i // blocks for i in range(blocks + 1)]
+        self.blocks = [(start, (1 << (end - start)) - 1) for start, end in zip(bounds, bounds[1:])]
+        self.tables = [{} for _ in self.blocks]  # per block: block value -> keys
+        self.fingerprints = {}
+        self.added = {}  # key -> sequence number of its add (ties go to the earliest)
+        self._sequence = 0
+
+    def _block_values(self, fingerprint):
+        return [(fingerprint >> start) & mask for start, mask in self.blocks]
+
+    def add(self, key, fingerprint):
+        """Indexes `key` under `fingerprint`, replacing its previous fingerprint"""
+        self.remove(key)
+        self.fingerprints[key] = fingerprint
+        self.added[key] = self._sequence
+        self._sequence += 1
+        for table, value in zip(self.tables, self._block_values(fingerprint)):
+            table.setdefault(value, []).append(key)
+
+    def remove(self, key):
+        fingerprint = self.fingerprints.pop(key, None)
+        if fingerprint is None:
+            return
+        del self.added[key]
+        for table, value in zip(self.tables, self._block_values(fingerprint)):
+            keys = table[value]
+            keys.remove(key)
+            if not keys:
+                del table[value]
+
+    def find(self, fingerprint, exclude=None):
+        """
+        Closest indexed key within max_distance bits of `fingerprint`
+
+        Args:
+            fingerprint (int): Fingerprint to look up
+            exclude: Key to ignore (e.g. the page being checked itself)
+
+        Returns:
+            The key (the earliest added among equally close ones), or None
+        """
+        best = None
+        best_rank = (self.max_distance + 1, 0)
+        for table, value in zip(self.tables, self._block_values(fingerprint)):
+            for key in table.get(value, ()):
+                if key == exclude:
+                    continue
+                rank = (hamming_distance(fingerprint, self.fingerprints[key]), self.added[key])
+                if rank < best_rank:
+                    best, best_rank = key, rank
+        return best
+
+    def __contains__(self, key):
+        return key in self.fingerprints
+
+    def __len__(self):
+        return len(self.fingerprints)
+
+
+def drop_near_duplicates(documents, max_distance=MAX_DISTANCE):
+    """
+    Keeps the first document of every group of near-duplicates
+
+    Args:
+        documents (iterable): Dicts with 'url' and 'content'
+
+    Yields:
+        tuple: (document, canonical url or None if it is kept)
+    """
+    index = SimHashIndex(max_distance)
+    for doc in documents:
+        fingerprint = simhash(doc.get('content', ''))
+        if fingerprint is None:
+            yield doc, None
+            continue
+        canonical = index.find(fingerprint)
+        if canonical is None:
+            index.add(doc['url'], fingerprint)
+        yield doc, canonical
+
+
+def dedup_file(filepath, max_distance=MAX_DISTANCE):
+    """
+    Removes near-duplicate documents from an NDJSON snapshot in place
+    (the first document of every group is kept)
+
+    Returns:
+        int: Documents removed
+    """
+    lines = []
+    docs = []
+    with open(filepath, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            try:
+                doc = json.loads(line) if line else None
+            except json.JSONDecodeError:
+                doc = None
+            if isinstance(doc, dict) and 'url' in doc:
+                lines.append(line)
+                docs.append(doc)
+
+    removed = 0
+    tmp_path = filepath + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        for line, (doc, canonical) in zip(lines, drop_near_duplicates(docs, max_distance)):
+            if canonical is None:
+                f.write(line + '\n')
+            else:
+                removed += 1
+                print(f"Duplicate of {canonical}: {doc['url']}")
+    os.replace(tmp_path, filepath)
+    return removed
+
+
+def main(argv=None):
+    """Drops near-duplicate documents from an existing snapshot (e.g. index.json)"""
+    parser = argparse.ArgumentParser(description="Remove near-duplicate pages from a crawl snapshot")
+    parser.add_argument('file', nargs='?', default='index.json', help="NDJSON snapshot (default index.json)")
+    parser.add_argument('--max-distance', type=int, default=MAX_DISTANCE,
+                        help=f"differing fingerprint bits still counted as duplicates (default {MAX_DISTANCE})")
+    args = parser.parse_args(argv)
+    removed = dedup_file(args.file, args.max_distance)
+    print(f"Removed {removed} near-duplicate documents from {args.file}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Delta Log Module for ProXplore
+Follows the crawler's append-only delta log
+
+The crawler appends one {"op": "add" | "update" | "delete", "url", ...} line
+per changed document to its delta log (see crawler.DELTA_FILE) and flushes
+every line, so a reader polling the file sees a page seconds after it was
+crawled. Each crawl run starts a new log; the reader notices and reads the
+new log from its start.
+"""
+
+import json
+import os
+
+# Delta operations (see database.format_delta)
+DELTA_OPS = ('add', 'update', 'delete')
+
+
+class DeltaLogReader:
+    """
+    Reads the complete records appended to a delta log since the last read
+    """
+
+    def __init__(self, filepath):
+        self.filepath = filepath
+        self.offset = 0  # Bytes of the current log already read
+        self.read_from = 0  # Offset the last read started at (see rewind)
+        self.log_id = None  # (inode, first line) of the current log
+
+    def _log_id(self, f, st):
+        """Identifies a log: a new run truncates or replaces the file"""
+        first_line = f.readline()
+        if not first_line.endswith(b'\n'):
+            return None
+        return st.st_ino, first_line
+
+    def read(self):
+        """
+        Records appended since the last call. A partly written last line is
+        left for the next call.
+
+        Returns:
+            list: Delta records (dicts with 'op' and 'url'; 'title' and
+                  'content' for adds and updates), in log order
+        """
+        try:
+            with open(self.filepath, 'rb') as f:
+                st = os.fstat(f.fileno())
+                log_id = self._log_id(f, st)
+                if log_id is None or log_id != self.log_id or st.st_size < self.offset:
+                    # A new (or still empty) log: read it from the start
+                    self.log_id = log_id
+                    self.offset = 0
+                self.read_from = self.offset
+                if log_id is None:
+                    return []
+                f.seek(self.offset)
+                data = f.read(st.st_size - self.offset)
+        except FileNotFoundError:
+            self.read_from = self.offset
+            return []
+
+        end = data.rfind(b'\n') + 1
+        self.offset += end
+        records = []
+        for line in data[:end].splitlines():
+            record = parse_record(line)
+            if record is not None:
+                records.append(record)
+        return records
+
+    def rewind(self):
+        """Makes the next read return the records of the last read again (e.g. after they failed to apply)"""
+        self.offset = self.read_from
+
+
+def parse_record(line):
+    """
+    Parses and validates one delta log line
+
+    Returns:
+        dict: The record, or None if the line is blank or malformed
+    """
+    line = line.strip()
+    if not line:
+        return None
+    try:
+        record = json.loads(line)
+    except ValueError:
+        print(f"Warning: Invalid JSON in delta log: {line[:80]!r}")
+        return None
+    if not isinstance(record, dict) or record.get('op') not in DELTA_OPS or not record.get('url'):
+        return None
+    if record['op'] != 'delete' and not ('title' in record and 'content' in record):
+        return None
+    return record
+
+
+def latest_changes(records):
+    """
+    Collapses records to the last change of every URL
+
+    Returns:
+        dict: url -> last record, in order of each URL's first record
+    """
+    latest = {}
+    for record in records:
+        latest[record['url']] = record
+    return latest
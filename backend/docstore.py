@@ -0,0 +1,288 @@
+"""
+Document Store Module for ProXplore
+Memory-mapped binary store of the indexed documents
+
+Documents are stored by doc index as binary records in one file (see
+index_file.write_sections):
+
+    params          uint32 x 3: document count, compressed flag, documents per block
+    record_offsets  uint64 x (num_docs + 1), byte offsets of the records in the
+                    uncompressed record stream
+    block_offsets   uint64 x (num_blocks + 1), byte offsets of the compressed
+                    blocks in record_data (compressed stores only)
+    record_data     the records, or zlib-compressed blocks of `block_docs` records
+    sentence_index  uint64 x (num_docs + 1), offsets of each document's entries
+                    in the sentence tables
+    sentence_bytes  uint32 per sentence: byte offset of the sentence in the content
+    sentence_tokens uint32 per sentence: content token offset of the sentence
+
+Every record is a uint32 title length and uint32 URL length followed by the
+UTF-8 title, URL and content. Opening a store reads nothing but the section
+table; a record is only faulted in (and its block decompressed) when a field
+is read, and only the fields read are decoded. The sentence tables (see
+snippets.py) let a snippet decode just the sentences it shows.
+"""
+
+import struct
+import threading
+import zlib
+from array import array
+from collections import OrderedDict
+from collections.abc import Mapping
+import index_file
+from analysis import DEFAULT_ANALYZER
+from snippets import sentence_table
+
+DOCSTORE_MAGIC = b'PXPLDOC\0'
+DOCSTORE_VERSION = 2
+
+RECORD_HEADER = struct.Struct('<II')
+
+# Records compressed together in compressed stores
+BLOCK_DOCS = 16
+
+# Decompressed blocks kept per store
+BLOCK_CACHE_SIZE = 64
+
+FIELDS = ('title', 'url', 'content')
+
+
+def encode_record(doc):
+    """Binary record of a document's title, URL and content"""
+    title = doc.get('title', '').encode('utf-8')
+    url = doc.get('url', '').encode('utf-8')
+    return RECORD_HEADER.pack(len(title), len(url)) + title + url + doc.get('content', '').encode('utf-8')
+
+
+def _field_bounds(record, field):
+    """Byte range of `field` within a record"""
+    title_len, url_len = RECORD_HEADER.unpack_from(record)
+    start = RECORD_HEADER.size
+    if field == 'title':
+        return start, start + title_len
+    start += title_len
+    if field == 'url':
+        return start, start + url_len
+    if field == 'content':
+        return start + url_len, len(record)
+    raise KeyError(field)
+
+
+class StoredDocument(Mapping):
+    """
+    Read-only view of a stored document ('title', 'url', 'content');
+    each field is decoded from the record when first read
+    """
+
+    __slots__ = ('_record', '_decoded', '_sentences')
+
+    def __init__(self, record, sentences=None):
+        """
+        record: Binary record (see encode_record)
+        sentences: (byte starts, token starts) of the content's sentences
+        """
+        self._record = record
+        self._decoded = {}
+        self._sentences = sentences
+
+    def __getitem__(self, field):
+        value = self._decoded.get(field)
+        if value is None:
+            start, end = _field_bounds(self._record, field)
+            value = self._decoded[field] = bytes(self._record[start:end]).decode('utf-8')
+        return value
+
+    def sentences(self):
+        """
+        Sentence table of the content
+
+        Returns:
+            tuple: (byte starts, content size in bytes, token starts)
+        """
+        start, end = _field_bounds(self._record, 'content')
+        byte_starts, token_starts = self._sentences or ((), ())
+        return byte_starts, end - start, token_starts
+
+    def content_range(self, start, end):
+        """Decodes bytes start:end of the content (sentence boundaries from sentences())"""
+        content_start = _field_bounds(self._record, 'content')[0]
+        return bytes(self._record[content_start + start:content_start + end]).decode('utf-8')
+
+    def __iter__(self):
+        return iter(FIELDS)
+
+    def __len__(self):
+        return len(FIELDS)
+
+    def __repr__(self):
+        return f"StoredDocument(url={self['url']!r})"
+
+
+class DocumentStore:
+    """
+    Documents by doc index: the memory-mapped store, followed by documents
+    added since it was written (kept in memory). Deleted documents read as None.
+    """
+
+    def __init__(self, docs=None):
+        """
+        docs: Documents held in memory (e.g. when no store file is available)
+        """
+        self.num_stored = 0
+        self.record_offsets = array('Q', [0])
+        self.block_offsets = None  # Set for compressed stores
+        self.block_docs = BLOCK_DOCS
+        self.record_data = memoryview(b'')
+        self.sentence_index = array('Q', [0])
+        self.sentence_bytes = array('I')
+        self.sentence_tokens = array('I')
+        self.added = list(docs or ())
+        self.deleted = set()
+        self._blocks = OrderedDict()  # block -> decompressed records (LRU)
+        self._blocks_lock = threading.Lock()
+        self._mapping = None
+
+    @staticmethod
+    def write(filepath, docs, checksum=b'', compress=False, block_docs=BLOCK_DOCS, analyzer=None):
+        """
+        Writes documents to a store file, atomically (errors are reported,
+        not raised; open() then finds no valid store)
+
+        Args:
+            filepath (str): Destination path
+            docs (iterable): Documents (dicts with 'title', 'url' and 'content'), by doc index
+            checksum (bytes): Corpus checksum used for staleness checks
+            compress (bool): zlib-compress blocks of `block_docs` records
+            analyzer (Analyzer): Analyzer the documents are indexed with
+                                 (sentence token offsets must match the index)
+        """
+        analyzer = analyzer or DEFAULT_ANALYZER
+        try:
+            record_offsets = array('Q', [0])
+            sentence_index = array('Q', [0])
+            sentence_bytes = array('I')
+            sentence_tokens = array('I')
+            block_offsets = array('Q', [0])
+            data = []
+            block = []
+            for doc in docs:
+                record = encode_record(doc)
+                record_offsets.append(record_offsets[-1] + len(record))
+                _, byte_starts, token_starts = sentence_table(doc.get('content', ''), analyzer)
+                sentence_bytes.extend(byte_starts)
+                sentence_tokens.extend(token_starts)
+                sentence_index.append(len(sentence_bytes))
+                if not compress:
+                    data.append(record)
+                    continue
+                block.append(record)
+                if len(block) == block_docs:
+                    data.append(zlib.compress(b''.join(block)))
+                    block_offsets.append(block_offsets[-1] + len(data[-1]))
+                    block = []
+            if block:
+                data.append(zlib.compress(b''.join(block)))
+                block_offsets.append(block_offsets[-1] + len(data[-1]))
+
+            sections = {
+                'params': array('I', [len(record_offsets) - 1, int(compress), block_docs]),
+                'record_offsets': record_offsets,
+                'record_data': b''.join(data),
+                'sentence_index': sentence_index,
+                'sentence_bytes': sentence_bytes,
+                'sentence_tokens': sentence_tokens,
+            }
+            if compress:
+                sections['block_offsets'] = block_offsets
+            index_file.write_sections(filepath, DOCSTORE_MAGIC, DOCSTORE_VERSION, sections, checksum)
+            print(f"Document store saved to {filepath}")
+        except Exception as e:
+            print(f"Error saving document store: {e}")
+
+    @staticmethod
+    def open(filepath, checksum=None):
+        """
+        Maps a store file read-only
+
+        Returns:
+            DocumentStore: The store, or None if the file is missing, invalid,
+                           or (when `checksum` is given) written for another corpus
+        """
+        try:
+            mapped = index_file.open_sections(filepath, DOCSTORE_MAGIC, DOCSTORE_VERSION)
+            if checksum is not None and mapped['checksum'] != index_file.pad_checksum(checksum):
+                print("Persisted document store checksum does not match corpus")
+                return None
+            sections = mapped['sections']
+            num_docs, compressed, block_docs = sections['params'].cast('I')
+            store = DocumentStore()
+            store.record_offsets = sections['record_offsets'].cast('Q')
+            if len(store.record_offsets) != num_docs + 1:
+                raise index_file.IndexFormatError("Document offset table has the wrong length")
+            store.num_stored = num_docs
+            store.block_docs = block_docs
+            store.record_data = sections['record_data']
+            store.sentence_index = sections['sentence_index'].cast('Q')
+            store.sentence_bytes = sections['sentence_bytes'].cast('I')
+            store.sentence_tokens = sections['sentence_tokens'].cast('I')
+            if len(store.sentence_index) != num_docs + 1:
+                raise index_file.IndexFormatError("Sentence index has the wrong length")
+            if compressed:
+                store.block_offsets = sections['block_offsets'].cast('Q')
+            store._mapping = mapped['mmap']
+        except Exception as e:
+            print(f"Error loading document store: {e}")
+            return None
+        print(f"Document store mapped: {num_docs} documents")
+        return store
+
+    def _block(self, block):
+        """Decompressed records of a block, from a small LRU cache"""
+        with self._blocks_lock:
+            data = self._blocks.get(block)
+            if data is not None:
+                self._blocks.move_to_end(block)
+                return data
+        data = zlib.decompress(self.record_data[self.block_offsets[block]:self.block_offsets[block + 1]])
+        with self._blocks_lock:
+            self._blocks[block] = data
+            if len(self._blocks) > BLOCK_CACHE_SIZE:
+                self._blocks.popitem(last=False)
+        return data
+
+    def _record(self, doc_idx):
+        start, end = self.record_offsets[doc_idx], self.record_offsets[doc_idx + 1]
+        if self.block_offsets is None:
+            return self.record_data[start:end]
+        block = doc_idx // self.block_docs
+        block_start = self.record_offsets[block * self.block_docs]
+        return memoryview(self._block(block))[start - block_start:end - block_start]
+
+    def __getitem__(self, doc_idx):
+        """
+        The document at `doc_idx`: a StoredDocument or an added dict, or None
+        if it was deleted
+        """
+        if doc_idx in self.deleted:
+            return None
+        if doc_idx < self.num_stored:
+            if doc_idx < 0:
+                raise IndexError(doc_idx)
+            start, end = self.sentence_index[doc_idx], self.sentence_index[doc_idx + 1]
+            sentences = (self.sentence_bytes[start:end], self.sentence_tokens[start:end])
+            return StoredDocument(self._record(doc_idx), sentences)
+        return self.added[doc_idx - self.num_stored]
+
+    def __len__(self):
+        """Doc index slots, including deleted documents"""
+        return self.num_stored + len(self.added)
+
+    def extend(self, docs):
+        """Appends documents at the next doc indices (kept in memory)"""
+        self.added.extend(docs)
+
+    def delete(self, doc_idx):
+        """Deletes the document at `doc_idx`; its slot reads as None"""
+        self.deleted.add(doc_idx)
+        if doc_idx >= self.num_stored:
+            self.added[doc_idx - self.num_stored] = None
@@ -0,0 +1,355 @@
+"""
+Frontier Module for ProXplore
+Link-following crawl frontier: URL normalization, a compact seen-set,
+per-host priority scheduling and checkpoints
+
+Every host has its own queue of pending URLs, ordered by depth. A host is
+ready once its politeness delay has passed since its last page finished;
+among ready hosts the one with the best next URL is served first (priority
+domains, then shallow pages, then hosts with fewer pages fetched so far),
+so the crawl spreads across sites and never sends a host two requests at
+once. The whole frontier, including pages in flight, can be written to a
+checkpoint and resumed without refetching finished pages.
+"""
+
+import base64
+import hashlib
+import heapq
+import json
+import os
+from array import array
+from bisect import bisect_left
+from collections import deque
+from urllib.parse import urljoin, urlsplit, urlunsplit
+
+CHECKPOINT_VERSION = 1
+
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+
+def _remove_dot_segments(path):
+    """Resolves '.' and '..' path segments (RFC 3986, section 5.2.4)"""
+    if '.' not in path:
+        return path
+    output = []
+    segments = path.split('/')
+    for segment in segments[1:]:
+        if segment == '..':
+            if output:
+                output.pop()
+        elif segment != '.':
+            output.append(segment)
+    if segments[-1] in ('.', '..'):
+        output.append('')
+    return '/' + '/'.join(output)
+
+
+def normalize_url(url, base=None):
+    """
+    Canonical form of an http(s) URL, used to detect duplicates
+
+    Resolves `url` against `base`, lowercases the scheme and host, drops
+    default ports, fragments and dot segments, and gives an empty path '/'.
+
+    Returns:
+        str: The normalized URL, or None for other schemes and invalid URLs
+    """
+    try:
+        if base is not None:
+            url = urljoin(base, url.strip())
+        parts = urlsplit(url.strip())
+        scheme = parts.scheme.lower()
+        host = parts.hostname
+        if scheme not in DEFAULT_PORTS or not host:
+            return None
+        port = parts.port
+    except ValueError:
+        return None
+
+    netloc = f'[{host}]' if ':' in host else host
+    if port is not None and port != DEFAULT_PORTS[scheme]:
+        netloc += f':{port}'
+    path = _remove_dot_segments(parts.path) or '/'
+    return urlunsplit((scheme, netloc, path, parts.query, ''))
+
+
+def url_host(url):
+    """Host key (lowercased host[:port]) that politeness is enforced per"""
+    return urlsplit(url).netloc.lower()
+
+
+def url_fingerprint(url):
+    """64-bit hash of a normalized URL"""
+    return int.from_bytes(hashlib.blake2b(url.encode('utf-8'), digest_size=8).digest(), 'little')
+
+
+class SeenSet:
+    """
+    Set of URL fingerprints stored as 8-byte integers: a sorted array searched
+    by bisection, plus a small set of recent additions merged into it in
+    batches. Uses about 8 bytes per URL instead of a stored string.
+    """
+
+    def __init__(self, fingerprints=None):
+        self.sorted = array('Q', sorted(fingerprints or ()))
+        self.recent = set()
+
+    def _contains(self, fingerprint):
+        if fingerprint in self.recent:
+            return True
+        i = bisect_left(self.sorted, fingerprint)
+        return i < len(self.sorted) and self.sorted[i] == fingerprint
+
+    def __contains__(self, url):
+        return self._contains(url_fingerprint(url))
+
+    def add(self, url):
+        """Adds `url`; returns False if it was already present"""
+        fingerprint = url_fingerprint(url)
+        if self._contains(fingerprint):
+            return False
+        self.recent.add(fingerprint)
+        if len(self.recent) > max(4096, len(self.sorted) // 8):
+            self._merge()
+        return True
+
+    def _merge(self):
+        self.sorted = array('Q', sorted(self.sorted.tolist() + list(self.recent)))
+        self.recent.clear()
+
+    def __len__(self):
+        return len(self.sorted) + len(self.recent)
+
+    def to_bytes(self):
+        self._merge()
+        return self.sorted.tobytes()
+
+    @classmethod
+    def from_bytes(cls, data):
+        seen = cls()
+        seen.sorted.frombytes(data)
+        return seen
+
+
+class Frontier:
+    """
+    Pending URLs of a crawl, scheduled per host
+    """
+
+    def __init__(self, max_depth=2, max_pages=None, max_pages_per_host=None, host_delay=1.0,
+                 priority_domains=()):
+        """
+        max_depth: Link depth followed from the seeds (0 = seeds only)
+        max_pages: Pages fetched at most in total (None = no limit)
+        max_pages_per_host: Pages fetched at most per host (None = no limit)
+        host_delay: Default seconds between the end of one request to a host
+                    and the start of the next
+        priority_domains: Domains whose pages are served before all others
+        """
+        self.max_depth = max_depth
+        self.max_pages = max_pages
+        self.max_pages_per_host = max_pages_per_host
+        self.host_delay = host_delay
+        self.priority_domains = tuple(priority_domains)
+        self.seen = SeenSet()
+        self.queues = {}  # host -> deque of (url, depth), shallowest first
+        self.fetched = {}  # host -> pages dispatched
+        self.delays = {}  # host -> politeness delay overriding host_delay
+        self.in_flight = {}  # url -> (depth, host), for pages dispatched but not done
+        self._ready = []  # heap of (priority, host): hosts that may be served now
+        self._waiting = []  # heap of (ready time, host): hosts in their delay
+        self._ready_at = {}  # host -> earliest start of its next request
+        self._busy = set()  # hosts with a page in flight
+
+    def _is_priority(self, host):
+        domain = host.rsplit(':', 1)[0]
+        return any(domain == d or domain.endswith('.' + d) for d in self.priority_domains)
+
+    def _priority(self, host):
+        """Scheduling key of a host with pending URLs (smaller is served first)"""
+        _, depth = self.queues[host][0]
+        return (0 if self._is_priority(host) else 1, depth, self.fetched.get(host, 0))
+
+    def _host_full(self, host):
+        limit = self.max_pages_per_host
+        if limit is None:
+            return False
+        queued = len(self.queues.get(host, ()))
+        return self.fetched.get(host, 0) + queued >= limit
+
+    def push(self, url, depth=0):
+        """
+        Queues a URL unless it was seen before or is past the limits
+
+        Args:
+            url (str): Absolute URL (normalized for duplicate detection)
+            depth (int): Links followed from a seed to reach it
+
+        Returns:
+            bool: True if the URL was queued
+        """
+        key = normalize_url(url)
+        if key is None or depth > self.max_depth:
+            return False
+        host = url_host(key)
+        if self._host_full(host) or not self.seen.add(key):
+            return False
+        self._enqueue(host, url, depth)
+        return True
+
+    def _enqueue(self, host, url, depth):
+        queue = self.queues.get(host)
+        if queue is None:
+            queue = self.queues[host] = deque()
+        was_empty = not queue
+        if queue and depth < queue[-1][1]:
+            # Seeds pushed after links of the same host: keep depth order
+            items = sorted(list(queue) + [(url, depth)], key=lambda item: item[1])
+            queue.clear()
+            queue.extend(items)
+        else:
+            queue.append((url, depth))
+        if was_empty and host not in self._busy:
+            ready_at = self._ready_at.get(host)
+            if ready_at is None:
+                heapq.heappush(self._ready, (self._priority(host), host))
+            else:
+                heapq.heappush(self._waiting, (ready_at, host))
+
+    def pop(self, now):
+        """
+        Next URL to fetch: the best URL of a ready host, which stays busy until
+        done() is called for the URL
+
+        Args:
+            now (float): Current time (same clock as passed to done())
+
+        Returns:
+            tuple: (url, depth), or None if no host is ready
+        """
+        while self._waiting and self._waiting[0][0] <= now:
+            _, host = heapq.heappop(self._waiting)
+            if self.queues.get(host):
+                heapq.heappush(self._ready, (self._priority(host), host))
+        if self.max_pages is not None and self.dispatched() >= self.max_pages:
+            return None
+        while self._ready:
+            _, host = heapq.heappop(self._ready)
+            queue = self.queues.get(host)
+            if not queue or host in self._busy:
+                continue
+            url, depth = queue.popleft()
+            if not queue:
+                del self.queues[host]
+            self._busy.add(host)
+            self.fetched[host] = self.fetched.get(host, 0) + 1
+            self.in_flight[url] = (depth, host)
+            return url, depth
+        return None
+
+    def done(self, url, now):
+        """Marks a popped URL as finished; its host becomes ready after its delay"""
+        depth_host = self.in_flight.pop(url, None)
+        host = depth_host[1] if depth_host else url_host(normalize_url(url) or url)
+        self._busy.discard(host)
+        ready_at = self._ready_at[host] = now + self.delays.get(host, self.host_delay)
+        if self.queues.get(host):
+            heapq.heappush(self._waiting, (ready_at, host))
+
+    def set_delay(self, host, delay):
+        """Overrides the politeness delay of a host (e.g. a robots.txt Crawl-delay)"""
+        self.delays[host] = delay
+
+    def dispatched(self):
+        """Pages popped so far"""
+        return sum(self.fetched.values())
+
+    def wait_time(self, now):
+        """
+        Seconds until a host with pending URLs becomes ready
+
+        Returns:
+            float: 0 if one is ready now, None if nothing is pending outside
+                   hosts that are busy
+        """
+        if self.max_pages is not None and self.dispatched() >= self.max_pages:
+            return None
+        if self._ready:
+            return 0.0
+        if self._waiting:
+            return max(0.0, self._waiting[0][0] - now)
+        return None
+
+    def __len__(self):
+        """Pending URLs, including those in flight"""
+        return sum(len(queue) for queue in self.queues.values()) + len(self.in_flight)
+
+    def to_dict(self):
+        """
+        JSON-serializable snapshot. Pages in flight are saved as pending, so a
+        resumed crawl fetches them again; finished pages stay in the seen-set.
+        """
+        pending = [(url, depth) for url, (depth, _) in self.in_flight.items()]
+        for queue in self.queues.values():
+            pending.extend(queue)
+        fetched = dict(self.fetched)
+        for _, host in self.in_flight.values():
+            fetched[host] -= 1
+        return {
+            'max_depth': self.max_depth,
+            'max_pages': self.max_pages,
+            'max_pages_per_host': self.max_pages_per_host,
+            'host_delay': self.host_delay,
+            'priority_domains': list(self.priority_domains),
+            'pending': pending,
+            'fetched': fetched,
+            'delays': self.delays,
+            'seen': base64.b64encode(self.seen.to_bytes()).decode('ascii'),
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        frontier = cls(data['max_depth'], data['max_pages'], data['max_pages_per_host'],
+                       data['host_delay'], data['priority_domains'])
+        frontier.seen = SeenSet.from_bytes(base64.b64decode(data['seen']))
+        frontier.fetched = {host: count for host, count in data['fetched'].items() if count}
+        frontier.delays = data['delays']
+        for url, depth in sorted(data['pending'], key=lambda item: item[1]):
+            frontier._enqueue(url_host(normalize_url(url)), url, depth)
+        return frontier
+
+
+def save_checkpoint(filepath, frontier, extra):
+    """
+    Atomically writes a frontier checkpoint
+
+    Args:
+        filepath (str): Checkpoint file
+        frontier (Frontier): Frontier to save
+        extra (dict): JSON-serializable crawl progress stored alongside
+    """
+    tmp_path = filepath + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({'version': CHECKPOINT_VERSION, 'frontier': frontier.to_dict(), 'extra': extra}, f)
+    os.replace(tmp_path, filepath)
+
+
+def load_checkpoint(filepath):
+    """
+    Reads a checkpoint written by save_checkpoint
+
+    Returns:
+        tuple: (Frontier, extra dict), or None if missing or unreadable
+    """
+    if not os.path.exists(filepath):
+        return None
+    try:
+        with open(filepath, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        if data.get('version') != CHECKPOINT_VERSION:
+            print(f"Ignoring crawl checkpoint with unsupported version {data.get('version')}")
+            return None
+        return Frontier.from_dict(data['frontier']), data['extra']
+    except Exception as e:
+        print(f"Error loading crawl checkpoint: {e}")
+        return None
@@ -0,0 +1,543 @@
+"""
+Index File Module for ProXplore
+Versioned binary on-disk format for the BM25 index, read through mmap
+
+Layout (all sections 8-byte aligned, native little-endian):
+    header          magic, version, counts, BM25 parameters, corpus checksum,
+                    section offsets
+    doc_len         uint32 x num_docs (doc slots, including compacted-away deletes)
+    title_len       uint32 x num_docs, title tokens at the start of each body
+    term_offsets    uint64 x (vocab_size + 1), byte offsets into term_data
+    term_data       UTF-8 terms, sorted by their encoded bytes
+    doc_freqs       uint32 x vocab_size
+    idf             float64 x vocab_size
+    max_scores      float64 x vocab_size
+    postings_start  uint64 x (vocab_size + 1), element offsets into the postings
+    doc_ids         uint32 x total_postings
+    tfs             uint32 x total_postings
+    positions_start uint64 x (vocab_size + 1), element offsets into positions
+    pos_starts      uint32 x total_postings, offset of each posting's positions
+                    within its term's block
+    positions       uint32 x sum(tfs), token positions of every posting
+    url_offsets     uint64 x (num_docs + 1), byte offsets into url_data
+    url_data        UTF-8 document URLs by doc index (empty for deleted slots)
+    url_*           URL-token postings with positions, laid out like the body
+                    term_offsets .. positions sections (no statistics)
+
+Nothing but the header is read at load time; every table is a memoryview over
+the mapping, so pages are faulted in lazily and shared between processes
+through the page cache.
+"""
+
+import mmap
+import os
+import struct
+import sys
+from array import array
+from collections.abc import Mapping
+from postings import Postings, POSTING_TYPECODE
+from segments import Segment, merge_segments
+
+MAGIC = b'PXPLIDX\0'
+FORMAT_VERSION = 3
+
+_POSTINGS_SECTIONS = ('postings_start', 'doc_ids', 'tfs', 'positions_start', 'pos_starts', 'positions')
+SECTIONS = (('doc_len', 'title_len', 'term_offsets', 'term_data', 'doc_freqs', 'idf', 'max_scores') +
+            _POSTINGS_SECTIONS +
+            ('url_offsets', 'url_data', 'url_term_offsets', 'url_term_data') +
+            tuple('url_' + name for name in _POSTINGS_SECTIONS) +
+            ('end',))
+
+# magic, version, reserved, corpus_size, num_docs, total_length, vocab_size,
+# total_postings, avgdl, k1, b, checksum, then one offset per section
+HEADER = struct.Struct(f'<8sIIQQQQQddd32s{len(SECTIONS)}Q')
+
+# Size of the checksum field in file headers (shorter checksums are NUL-padded)
+CHECKSUM_SIZE = 32
+
+
+class IndexFormatError(Exception):
+    """Raised when an index file is missing, corrupt or from another format version"""
+
+
+def pad_checksum(checksum):
+    """
+    Pads a corpus checksum to CHECKSUM_SIZE bytes, the way headers store it,
+    so it compares equal to the checksum read back from a file
+
+    Args:
+        checksum (bytes): Corpus checksum
+
+    Returns:
+        bytes: The checksum, NUL-padded to CHECKSUM_SIZE bytes
+
+    Raises:
+        ValueError: If the checksum is longer than CHECKSUM_SIZE bytes
+    """
+    if len(checksum) > CHECKSUM_SIZE:
+        raise ValueError(f"Checksum is {len(checksum)} bytes; at most {CHECKSUM_SIZE} fit in the header")
+    return bytes(checksum).ljust(CHECKSUM_SIZE, b'\0')
+
+
+class MappedLexicon:
+    """Sorted term dictionary resolved by binary search over the mapped file"""
+
+    def __init__(self, term_offsets, term_data):
+        self.term_offsets = term_offsets
+        self.term_data = term_data
+
+    def __len__(self):
+        return len(self.term_offsets) - 1
+
+    def term_at(self, term_id):
+        start = self.term_offsets[term_id]
+        end = self.term_offsets[term_id + 1]
+        return bytes(self.term_data[start:end]).decode('utf-8')
+
+    def term_id(self, token):
+        """Returns the id of `token`, or None if it is not in the lexicon"""
+        if not isinstance(token, str):
+            return None
+        key = token.encode('utf-8')
+        offsets = self.term_offsets
+        data = self.term_data
+        lo, hi = 0, len(offsets) - 1
+        while lo < hi:
+            mid = (lo + hi) // 2
+            term = data[offsets[mid]:offsets[mid + 1]].tobytes()
+            if term < key:
+                lo = mid + 1
+            elif term > key:
+                hi = mid
+            else:
+                return mid
+        return None
+
+    def __iter__(self):
+        for term_id in range(len(self)):
+            yield self.term_at(term_id)
+
+
+class MappedStrings:
+    """Read-only sequence of strings stored as an offset table plus a UTF-8 blob"""
+
+    def __init__(self, offsets, data):
+        self.offsets = offsets
+        self.data = data
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        return bytes(self.data[self.offsets[i]:self.offsets[i + 1]]).decode('utf-8')
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+
+def _string_table(strings):
+    """Encodes strings as (uint64 offsets, blob) for MappedStrings"""
+    encoded = [s.encode('utf-8') for s in strings]
+    offsets = array('Q', [0])
+    for item in encoded:
+        offsets.append(offsets[-1] + len(item))
+    return offsets, b''.join(encoded)
+
+
+class MappedTermTable(Mapping):
+    """Read-only token -> value mapping over a per-term column of the file"""
+
+    def __init__(self, lexicon, values):
+        self.lexicon = lexicon
+        self.values = values
+
+    def __getitem__(self, token):
+        term_id = self.lexicon.term_id(token)
+        if term_id is None:
+            raise KeyError(token)
+        return self.values[term_id]
+
+    def get(self, token, default=None):
+        term_id = self.lexicon.term_id(token)
+        return default if term_id is None else self.values[term_id]
+
+    def __contains__(self, token):
+        return self.lexicon.term_id(token) is not None
+
+    def __iter__(self):
+        return iter(self.lexicon)
+
+    def __len__(self):
+        return len(self.lexicon)
+
+
+class MappedTermLists(Mapping):
+    """Read-only token -> sequence mapping; each token owns a slice of `values`"""
+
+    def __init__(self, lexicon, starts, values):
+        self.lexicon = lexicon
+        self.starts = starts
+        self.values = values
+
+    def __getitem__(self, token):
+        term_id = self.lexicon.term_id(token)
+        if term_id is None:
+            raise KeyError(token)
+        return self.values[self.starts[term_id]:self.starts[term_id + 1]]
+
+    def get(self, token, default=None):
+        term_id = self.lexicon.term_id(token)
+        return default if term_id is None else self.values[self.starts[term_id]:self.starts[term_id + 1]]
+
+    def __contains__(self, token):
+        return self.lexicon.term_id(token) is not None
+
+    def __iter__(self):
+        return iter(self.lexicon)
+
+    def __len__(self):
+        return len(self.lexicon)
+
+
+def term_lists(table):
+    """
+    Encodes a token -> list of ints mapping for MappedTermLists
+
+    Returns:
+        dict: 'offsets', 'data' (sorted term table), 'starts' and 'values' sections
+    """
+    terms = sorted(table, key=lambda t: t.encode('utf-8'))
+    offsets, data = _string_table(terms)
+    starts = array('Q', [0])
+    values = array('I')
+    for term in terms:
+        values.extend(table[term])
+        starts.append(len(values))
+    return {'offsets': offsets, 'data': data, 'starts': starts, 'values': values}
+
+
+def open_term_lists(sections, prefix):
+    """MappedTermLists over the sections written from term_lists() under `prefix`"""
+    lexicon = MappedLexicon(sections[prefix + 'offsets'].cast('Q'), sections[prefix + 'data'])
+    return MappedTermLists(lexicon, sections[prefix + 'starts'].cast('Q'), sections[prefix + 'values'].cast('I'))
+
+
+class MappedInvertedIndex(Mapping):
+    """Read-only token -> Postings mapping; postings are zero-copy views of the file"""
+
+    def __init__(self, lexicon, postings_start, doc_ids, tfs, positions_start, pos_starts, positions):
+        self.lexicon = lexicon
+        self.postings_start = postings_start
+        self.doc_ids = doc_ids
+        self.tfs = tfs
+        self.positions_start = positions_start
+        self.pos_starts = pos_starts
+        self.positions = positions
+
+    def _postings(self, term_id):
+        start = self.postings_start[term_id]
+        end = self.postings_start[term_id + 1]
+        positions = self.positions[self.positions_start[term_id]:self.positions_start[term_id + 1]]
+        return Postings(self.doc_ids[start:end], self.tfs[start:end], positions, self.pos_starts[start:end])
+
+    def __getitem__(self, token):
+        term_id = self.lexicon.term_id(token)
+        if term_id is None:
+            raise KeyError(token)
+        return self._postings(term_id)
+
+    def get(self, token, default=None):
+        term_id = self.lexicon.term_id(token)
+        return default if term_id is None else self._postings(term_id)
+
+    def __contains__(self, token):
+        return self.lexicon.term_id(token) is not None
+
+    def __iter__(self):
+        return iter(self.lexicon)
+
+    def __len__(self):
+        return len(self.lexicon)
+
+
+def _pad(f):
+    """Pads the file to the next 8-byte boundary and returns the offset"""
+    offset = f.tell()
+    if offset % 8:
+        f.write(b'\0' * (8 - offset % 8))
+    return f.tell()
+
+
+def _write_postings(f, offsets, prefix, terms, table):
+    """
+    Writes the postings of `terms` (in lexicon order) as the
+    postings_start .. positions sections named with `prefix`
+
+    Returns:
+        int: Number of postings written
+    """
+    postings = []
+    for t in terms:
+        p = table[t]
+        postings.append(p if isinstance(p, Postings) else p.decompress())
+
+    postings_start = array('Q', [0])
+    positions_start = array('Q', [0])
+    for p in postings:
+        if not p.has_positions:
+            raise IndexFormatError("Postings without positions cannot be written")
+        postings_start.append(postings_start[-1] + len(p))
+        positions_start.append(positions_start[-1] + len(p.positions))
+
+    offsets[prefix + 'postings_start'] = _pad(f)
+    f.write(postings_start.tobytes())
+    for name in ('doc_ids', 'tfs'):
+        offsets[prefix + name] = _pad(f)
+        for p in postings:
+            f.write(array(POSTING_TYPECODE, getattr(p, name)).tobytes())
+    offsets[prefix + 'positions_start'] = _pad(f)
+    f.write(positions_start.tobytes())
+    for name in ('pos_starts', 'positions'):
+        offsets[prefix + name] = _pad(f)
+        for p in postings:
+            f.write(array(POSTING_TYPECODE, getattr(p, name)).tobytes())
+    return postings_start[-1]
+
+
+def write_index(filepath, ranker, checksum=b''):
+    """
+    Writes a fitted BM25Ranker to `filepath` in the binary index format.
+    The file is written next to the target and atomically renamed into place,
+    so processes that still map the previous version are unaffected.
+
+    Args:
+        filepath (str): Destination path
+        ranker (BM25Ranker): Fitted ranker
+        checksum (bytes): Corpus checksum (up to 32 bytes) used for staleness checks
+    """
+    if sys.byteorder != 'little':
+        raise IndexFormatError("Index files are only supported on little-endian hosts")
+    checksum = pad_checksum(checksum)
+
+    # Positions are kept per segment, so the file is always written from one segment
+    segments = list(ranker.segments)
+    if len(segments) > 1:
+        segment = merge_segments(segments, set())
+    elif segments:
+        segment = segments[0]
+    else:
+        segment = Segment({}, 0, 0)
+
+    terms = sorted(segment.postings, key=lambda t: t.encode('utf-8'))
+    term_offsets, term_data = _string_table(terms)
+    url_terms = sorted(segment.url_postings, key=lambda t: t.encode('utf-8'))
+    url_term_offsets, url_term_data = _string_table(url_terms)
+
+    urls = [''] * len(ranker.doc_len)
+    for url, doc_idx in ranker.live_urls().items():
+        urls[doc_idx] = url
+    url_offsets, url_data = _string_table(urls)
+
+    doc_freqs = array('I', (ranker.doc_freqs[t] for t in terms))
+    idf = array('d', (ranker.idf[t] for t in terms))
+    max_scores = array('d', (ranker.max_scores[t] for t in terms))
+
+    offsets = {}
+    tmp_path = filepath + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(b'\0' * HEADER.size)
+        offsets['doc_len'] = _pad(f)
+        f.write(array(POSTING_TYPECODE, ranker.doc_len).tobytes())
+        offsets['title_len'] = _pad(f)
+        f.write(array(POSTING_TYPECODE, ranker.title_len).tobytes())
+        offsets['term_offsets'] = _pad(f)
+        f.write(term_offsets.tobytes())
+        offsets['term_data'] = _pad(f)
+        f.write(term_data)
+        offsets['doc_freqs'] = _pad(f)
+        f.write(doc_freqs.tobytes())
+        offsets['idf'] = _pad(f)
+        f.write(idf.tobytes())
+        offsets['max_scores'] = _pad(f)
+        f.write(max_scores.tobytes())
+        total_postings = _write_postings(f, offsets, '', terms, segment.postings)
+        offsets['url_offsets'] = _pad(f)
+        f.write(url_offsets.tobytes())
+        offsets['url_data'] = _pad(f)
+        f.write(url_data)
+        offsets['url_term_offsets'] = _pad(f)
+        f.write(url_term_offsets.tobytes())
+        offsets['url_term_data'] = _pad(f)
+        f.write(url_term_data)
+        _write_postings(f, offsets, 'url_', url_terms, segment.url_postings)
+        offsets['end'] = _pad(f)
+
+        f.seek(0)
+        f.write(HEADER.pack(MAGIC, FORMAT_VERSION, 0, ranker.corpus_size, len(ranker.doc_len),
+                            ranker.total_length, len(terms), total_postings,
+                            ranker.avgdl, ranker.k1, ranker.b, checksum,
+                            *(offsets[name] for name in SECTIONS)))
+    os.replace(tmp_path, filepath)
+
+
+def read_header(filepath):
+    """
+    Reads and validates the header of an index file without mapping it
+
+    Returns:
+        dict: Header fields
+    """
+    try:
+        with open(filepath, 'rb') as f:
+            raw = f.read(HEADER.size)
+    except OSError as e:
+        raise IndexFormatError(str(e))
+    if len(raw) < HEADER.size:
+        raise IndexFormatError("Truncated index header")
+    fields = HEADER.unpack(raw)
+    magic, version = fields[0], fields[1]
+    if magic != MAGIC:
+        raise IndexFormatError("Not a ProXplore index file")
+    if version != FORMAT_VERSION:
+        raise IndexFormatError(f"Unsupported index version {version} (expected {FORMAT_VERSION})")
+    header = {
+        'corpus_size': fields[3],
+        'num_docs': fields[4],
+        'total_length': fields[5],
+        'vocab_size': fields[6],
+        'total_postings': fields[7],
+        'avgdl': fields[8],
+        'k1': fields[9],
+        'b': fields[10],
+        'checksum': fields[11],
+    }
+    header['offsets'] = dict(zip(SECTIONS, fields[12:]))
+    return header
+
+
+def open_index(filepath):
+    """
+    Maps an index file read-only and returns lazily-read views of its tables
+
+    Returns:
+        dict: Header fields plus 'doc_len', 'title_len', 'urls', 'doc_freqs',
+              'idf', 'max_scores', 'inverted_index' and 'url_postings' views
+    """
+    header = read_header(filepath)
+    offsets = header['offsets']
+    with open(filepath, 'rb') as f:
+        if os.fstat(f.fileno()).st_size < offsets['end']:
+            raise IndexFormatError("Truncated index file")
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    view = memoryview(mapped)
+
+    def section(name, typecode):
+        end = SECTIONS[SECTIONS.index(name) + 1]
+        raw = view[offsets[name]:offsets[end]]
+        if typecode is None:
+            return raw
+        size = struct.calcsize(typecode)
+        return raw[:len(raw) - len(raw) % size].cast(typecode)
+
+    def inverted_index(prefix, lexicon):
+        postings_start = section(prefix + 'postings_start', 'Q')[:len(lexicon) + 1]
+        total = postings_start[-1]
+        positions_start = section(prefix + 'positions_start', 'Q')[:len(lexicon) + 1]
+        return MappedInvertedIndex(
+            lexicon,
+            postings_start,
+            section(prefix + 'doc_ids', POSTING_TYPECODE)[:total],
+            section(prefix + 'tfs', POSTING_TYPECODE)[:total],
+            positions_start,
+            section(prefix + 'pos_starts', POSTING_TYPECODE)[:total],
+            section(prefix + 'positions', POSTING_TYPECODE)[:positions_start[-1]])
+
+    vocab_size = header['vocab_size']
+    num_docs = header['num_docs']
+    lexicon = MappedLexicon(section('term_offsets', 'Q')[:vocab_size + 1], section('term_data', None))
+    url_lexicon = MappedLexicon(section('url_term_offsets', 'Q'), section('url_term_data', None))
+    header.update({
+        'mmap': mapped,
+        'doc_len': section('doc_len', POSTING_TYPECODE)[:num_docs],
+        'title_len': section('title_len', POSTING_TYPECODE)[:num_docs],
+        'urls': MappedStrings(section('url_offsets', 'Q')[:num_docs + 1], section('url_data', None)),
+        'doc_freqs': MappedTermTable(lexicon, section('doc_freqs', 'I')[:vocab_size]),
+        'idf': MappedTermTable(lexicon, section('idf', 'd')[:vocab_size]),
+        'max_scores': MappedTermTable(lexicon, section('max_scores', 'd')[:vocab_size]),
+        'inverted_index': inverted_index('', lexicon),
+        'url_postings': inverted_index('url_', url_lexicon),
+    })
+    return header
+
+
+# Generic container for auxiliary indexes: magic, version, section count,
+# checksum, then a table of (name, offset, length) entries
+SECTIONS_HEADER = struct.Struct('<8sII32s')
+SECTION_ENTRY = struct.Struct('<32sQQ')
+
+
+def write_sections(filepath, magic, version, sections, checksum=b''):
+    """
+    Writes named binary sections (8-byte aligned) to `filepath`, atomically
+
+    Args:
+        filepath (str): Destination path
+        magic (bytes): 8-byte file type marker
+        version (int): Format version
+        sections (dict): name -> bytes or array
+        checksum (bytes): Corpus checksum (up to 32 bytes) used for staleness checks
+    """
+    if sys.byteorder != 'little':
+        raise IndexFormatError("Index files are only supported on little-endian hosts")
+    checksum = pad_checksum(checksum)
+    entries = []
+    tmp_path = filepath + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(b'\0' * (SECTIONS_HEADER.size + SECTION_ENTRY.size * len(sections)))
+        for name, data in sections.items():
+            offset = _pad(f)
+            raw = data.tobytes() if isinstance(data, array) else bytes(data)
+            f.write(raw)
+            entries.append(SECTION_ENTRY.pack(name.encode('utf-8'), offset, len(raw)))
+        _pad(f)
+        f.seek(0)
+        f.write(SECTIONS_HEADER.pack(magic, version, len(sections), checksum))
+        f.write(b''.join(entries))
+    os.replace(tmp_path, filepath)
+
+
+def open_sections(filepath, magic, version):
+    """
+    Maps a file written by write_sections read-only
+
+    Returns:
+        dict: 'checksum', 'mmap' and 'sections' (name -> memoryview)
+    """
+    try:
+        f = open(filepath, 'rb')
+    except OSError as e:
+        raise IndexFormatError(str(e))
+    with f:
+        size = os.fstat(f.fileno()).st_size
+        raw = f.read(SECTIONS_HEADER.size)
+        if len(raw) < SECTIONS_HEADER.size:
+            raise IndexFormatError("Truncated index header")
+        file_magic, file_version, count, checksum = SECTIONS_HEADER.unpack(raw)
+        if file_magic != magic:
+            raise IndexFormatError("Unexpected index file type")
+        if file_version != version:
+            raise IndexFormatError(f"Unsupported index version {file_version} (expected {version})")
+        table = f.read(SECTION_ENTRY.size * count)
+        if len(table) < SECTION_ENTRY.size * count:
+            raise IndexFormatError("Truncated section table")
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if size else None
+    view = memoryview(mapped) if mapped is not None else memoryview(b'')
+    sections = {}
+    for name, offset, length in SECTION_ENTRY.iter_unpack(table):
+        if offset + length > size:
+            raise IndexFormatError("Truncated index file")
+        sections[name.rstrip(b'\0').decode('utf-8')] = view[offset:offset + length]
+    return {'checksum': checksum, 'mmap': mapped, 'sections': sections}
@@ -0,0 +1,101 @@
+"""
+NumPy Scoring Module for ProXplore
+Vectorized BM25 scoring over the ranker's postings (optional dependency)
+
+Postings are viewed as NumPy arrays without copying; the per-document length
+norms are computed from a copy of the doc lengths, taken under the ranker's
+write lock (a view would stop writers appending to the live array). A query's term contributions are computed in bulk,
+summed per document with bincount (in query term order, like the pure-Python
+path) and the top k is picked with argpartition.
+"""
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional; callers fall back to pure Python
+    np = None
+
+
+def is_available():
+    """True if NumPy is installed"""
+    return np is not None
+
+
+def _as_array(values, dtype):
+    """Zero-copy NumPy view of an array.array or memoryview"""
+    return np.frombuffer(values, dtype=dtype)
+
+
+def length_norms(ranker):
+    """
+    Per-document BM25 length norm k1 * (1 - b + b * dl / avgdl), cached on the
+    ranker until the doc count or avgdl changes
+    """
+    with ranker._lock:
+        key = (len(ranker.doc_len), ranker.avgdl)
+        cached = getattr(ranker, '_numpy_norms', None)
+        if cached is not None and cached[0] == key:
+            return cached[1]
+        doc_len = np.array(ranker.doc_len, dtype=np.float64)
+        avgdl = ranker.avgdl or 1
+    norms = ranker.k1 * (1 - ranker.b + ranker.b * (doc_len / avgdl))
+    ranker._numpy_norms = (key, norms)
+    return norms
+
+
+def search(ranker, query_terms, top_k, term_postings, deleted):
+    """
+    Scores every candidate of the query with vectorized operations.
+
+    Args:
+        ranker (BM25Ranker): Ranker to search
+        query_terms (list): (token, weight) pairs (repeated tokens count repeatedly)
+        top_k (int): Number of results
+        term_postings (dict): token -> Postings (or None) for the query tokens
+        deleted (set): Tombstones read before the segments the postings came from
+
+    Returns:
+        list: (doc_index, score) tuples, best first (ties by doc index)
+    """
+    norms = length_norms(ranker)
+    k1_plus_1 = ranker.k1 + 1
+
+    doc_parts = []
+    score_parts = []
+    for token, weight in query_terms:
+        postings = term_postings[token]
+        if postings is None:
+            continue
+        doc_ids = _as_array(postings.doc_ids, np.uint32).astype(np.intp)
+        tfs = _as_array(postings.tfs, np.uint32).astype(np.float64)
+        if len(doc_ids) and doc_ids[-1] >= len(norms):
+            # Documents added after the norms were computed; picked up next query
+            known = doc_ids < len(norms)
+            doc_ids, tfs = doc_ids[known], tfs[known]
+        idf = ranker._get_idf(token)
+        doc_parts.append(doc_ids)
+        score_parts.append(idf * ((tfs * k1_plus_1) / (tfs + norms[doc_ids])) * weight)
+
+    if not doc_parts:
+        return []
+
+    all_docs = np.concatenate(doc_parts)
+    all_scores = np.concatenate(score_parts)
+    candidates, inverse = np.unique(all_docs, return_inverse=True)
+    scores = np.bincount(inverse, weights=all_scores, minlength=len(candidates))
+
+    if deleted:
+        live = ~np.isin(candidates, np.array(list(deleted), dtype=np.intp))
+        candidates = candidates[live]
+        scores = scores[live]
+        if not len(candidates):
+            return []
+
+    if top_k < len(scores):
+        top = np.argpartition(-scores, top_k - 1)[:top_k]
+        # Widen to everything tied with the k-th score so doc-index tie-breaks match
+        keep = np.flatnonzero(scores >= scores[top].min())
+        candidates = candidates[keep]
+        scores = scores[keep]
+
+    order = np.lexsort((candidates, -scores))[:top_k]
+    return [(int(candidates[i]), float(scores[i])) for i in order]
@@ -0,0 +1,332 @@
+"""
+Postings Module for ProXplore
+Compact, array-backed posting lists for the inverted index
+"""
+
+import heapq
+from array import array
+from bisect import bisect_left
+from itertools import accumulate
+
+
+# Typecode for doc ids, term frequencies and positions (unsigned 32-bit)
+POSTING_TYPECODE = 'I'
+
+
+def encode_varints(values):
+    """
+    Encodes non-negative integers as LEB128 varints
+
+    Args:
+        values (iterable): Non-negative integers
+
+    Returns:
+        bytes: Encoded byte string
+    """
+    out = bytearray()
+    for value in values:
+        while value >= 0x80:
+            out.append((value & 0x7F) | 0x80)
+            value >>= 7
+        out.append(value)
+    return bytes(out)
+
+
+def decode_varints(data):
+    """
+    Decodes a LEB128 varint byte string
+
+    Args:
+        data (bytes): Encoded byte string
+
+    Returns:
+        array: Decoded integers
+    """
+    values = array(POSTING_TYPECODE)
+    value = 0
+    shift = 0
+    for byte in data:
+        value |= (byte & 0x7F) << shift
+        if byte & 0x80:
+            shift += 7
+        else:
+            values.append(value)
+            value = 0
+            shift = 0
+    return values
+
+
+class Postings:
+    """
+    Posting list for a single term.
+    Doc ids are kept in ascending order, with a parallel array of term frequencies.
+    When positions are stored, posting i owns the `tfs[i]` token positions
+    starting at `positions[pos_starts[i]]`.
+    """
+    __slots__ = ('doc_ids', 'tfs', 'positions', 'pos_starts')
+
+    def __init__(self, doc_ids=None, tfs=None, positions=None, pos_starts=None):
+        self.doc_ids = doc_ids if doc_ids is not None else array(POSTING_TYPECODE)
+        self.tfs = tfs if tfs is not None else array(POSTING_TYPECODE)
+        self.positions = positions
+        self.pos_starts = pos_starts
+
+    def append(self, doc_id, tf, positions=None):
+        """Appends a posting. Doc ids must be appended in ascending order."""
+        self.doc_ids.append(doc_id)
+        self.tfs.append(tf)
+        if positions is not None:
+            if self.positions is None:
+                self.positions = array(POSTING_TYPECODE)
+                self.pos_starts = array(POSTING_TYPECODE)
+            self.pos_starts.append(len(self.positions))
+            self.positions.extend(positions)
+
+    def __len__(self):
+        return len(self.doc_ids)
+
+    def __iter__(self):
+        return iter(self.doc_ids)
+
+    def __contains__(self, doc_id):
+        return self.tf(doc_id) > 0
+
+    def items(self):
+        """Iterates (doc_id, tf) pairs in doc order"""
+        return zip(self.doc_ids, self.tfs)
+
+    def _index(self, doc_id):
+        doc_ids = self.doc_ids
+        i = bisect_left(doc_ids, doc_id)
+        if i < len(doc_ids) and doc_ids[i] == doc_id:
+            return i
+        return -1
+
+    def tf(self, doc_id):
+        """Returns the term frequency of `doc_id`, or 0 if absent"""
+        i = self._index(doc_id)
+        return self.tfs[i] if i >= 0 else 0
+
+    @property
+    def has_positions(self):
+        return self.positions is not None
+
+    def positions_of(self, doc_id):
+        """Returns the ascending token positions of the term in `doc_id` (empty if absent)"""
+        i = self._index(doc_id)
+        if i < 0 or self.positions is None:
+            return ()
+        start = self.pos_starts[i]
+        return self.positions[start:start + self.tfs[i]]
+
+    def items_with_positions(self):
+        """Iterates (doc_id, tf, positions) triples in doc order"""
+        positions = self.positions
+        if positions is None:
+            for doc_id, tf in zip(self.doc_ids, self.tfs):
+                yield doc_id, tf, None
+            return
+        for doc_id, tf, start in zip(self.doc_ids, self.tfs, self.pos_starts):
+            yield doc_id, tf, positions[start:start + tf]
+
+    def compress(self):
+        """Returns a delta/varint compressed copy of this posting list"""
+        return CompressedPostings.from_postings(self)
+
+    @property
+    def nbytes(self):
+        """Approximate payload size in bytes"""
+        size = (len(self.doc_ids) * self.doc_ids.itemsize +
+                len(self.tfs) * self.tfs.itemsize)
+        if self.positions is not None:
+            size += (len(self.positions) * self.positions.itemsize +
+                     len(self.pos_starts) * self.pos_starts.itemsize)
+        return size
+
+
+class CompressedPostings:
+    """
+    Read-only posting list stored as delta-encoded doc ids and term
+    frequencies, both varint packed. Positions, when present, are delta
+    encoded within each posting. Doc ids and term frequencies are decoded on
+    first access and kept, so lookups are binary searches; the positions of
+    a posting are decoded on their own from its offset in `position_data`.
+    """
+    __slots__ = ('count', 'doc_data', 'tf_data', 'position_data',
+                 '_doc_ids', '_tfs', '_position_offsets')
+
+    def __init__(self, count, doc_data, tf_data, position_data=None):
+        self.count = count
+        self.doc_data = doc_data
+        self.tf_data = tf_data
+        self.position_data = position_data
+        self._doc_ids = None
+        self._tfs = None
+        self._position_offsets = None
+
+    @classmethod
+    def from_postings(cls, postings):
+        doc_ids = postings.doc_ids
+        gaps = [doc_ids[0]] if doc_ids else []
+        gaps.extend(doc_ids[i] - doc_ids[i - 1] for i in range(1, len(doc_ids)))
+        position_data = None
+        if postings.has_positions:
+            position_gaps = []
+            for _, _, positions in postings.items_with_positions():
+                previous = 0
+                for position in positions:
+                    position_gaps.append(position - previous)
+                    previous = position
+            position_data = encode_varints(position_gaps)
+        return cls(len(doc_ids), encode_varints(gaps), encode_varints(postings.tfs), position_data)
+
+    def _decode(self):
+        doc_ids = decode_varints(self.doc_data)
+        for i in range(1, len(doc_ids)):
+            doc_ids[i] += doc_ids[i - 1]
+        self._tfs = decode_varints(self.tf_data)
+        self._doc_ids = doc_ids  # Set last: concurrent readers check it
+
+    @property
+    def doc_ids(self):
+        """Decoded doc ids (shared; do not modify)"""
+        if self._doc_ids is None:
+            self._decode()
+        return self._doc_ids
+
+    @property
+    def tfs(self):
+        """Decoded term frequencies (shared; do not modify)"""
+        if self._doc_ids is None:
+            self._decode()
+        return self._tfs
+
+    @property
+    def has_positions(self):
+        return self.position_data is not None
+
+    def __len__(self):
+        return self.count
+
+    def __iter__(self):
+        return iter(self.doc_ids)
+
+    def __contains__(self, doc_id):
+        return self.tf(doc_id) > 0
+
+    def items(self):
+        return zip(self.doc_ids, self.tfs)
+
+    def items_with_positions(self):
+        return self.decompress().items_with_positions()
+
+    def _index(self, doc_id):
+        doc_ids = self.doc_ids
+        i = bisect_left(doc_ids, doc_id)
+        if i < len(doc_ids) and doc_ids[i] == doc_id:
+            return i
+        return -1
+
+    def tf(self, doc_id):
+        """Returns the term frequency of `doc_id`, or 0 if absent"""
+        i = self._index(doc_id)
+        return self.tfs[i] if i >= 0 else 0
+
+    def _positions_start(self, i):
+        """Byte offset of the positions of posting `i` in `position_data`"""
+        offsets = self._position_offsets
+        if offsets is None:
+            # One pass over the varints, skipping tfs[i] of them per posting
+            offsets = array(POSTING_TYPECODE)
+            data = self.position_data
+            offset = 0
+            for tf in self.tfs:
+                offsets.append(offset)
+                for _ in range(tf):
+                    while data[offset] & 0x80:
+                        offset += 1
+                    offset += 1
+            self._position_offsets = offsets
+        return offsets[i]
+
+    def positions_of(self, doc_id):
+        """Returns the ascending token positions of the term in `doc_id` (empty if absent)"""
+        i = self._index(doc_id)
+        if i < 0 or self.position_data is None:
+            return ()
+        end = self._positions_start(i + 1) if i + 1 < self.count else len(self.position_data)
+        positions = decode_varints(self.position_data[self._positions_start(i):end])
+        for j in range(1, len(positions)):
+            positions[j] += positions[j - 1]
+        return positions
+
+    def decompress(self):
+        """Returns an uncompressed Postings copy"""
+        doc_ids = array(POSTING_TYPECODE, self.doc_ids)
+        tfs = array(POSTING_TYPECODE, self.tfs)
+        if self.position_data is None:
+            return Postings(doc_ids, tfs)
+        positions = decode_varints(self.position_data)
+        pos_starts = array(POSTING_TYPECODE, accumulate(tfs[:-1], initial=0)) if tfs else array(POSTING_TYPECODE)
+        for i, start in enumerate(pos_starts):
+            for j in range(start + 1, start + tfs[i]):
+                positions[j] += positions[j - 1]
+        return Postings(doc_ids, tfs, positions, pos_starts)
+
+    def compress(self):
+        return self
+
+    @property
+    def nbytes(self):
+        """Approximate compressed payload size in bytes (decoded arrays not included)"""
+        return len(self.doc_data) + len(self.tf_data) + len(self.position_data or b'')
+
+
+def phrase_starts(position_lists):
+    """
+    Finds the start positions of a phrase from the position lists of its
+    tokens (in phrase order): token i must occur at start + i.
+
+    Args:
+        position_lists (list): Ascending positions of each phrase token
+
+    Returns:
+        list: Ascending start positions of every occurrence
+    """
+    if not position_lists:
+        return []
+    starts = set(position_lists[0])
+    for offset in range(1, len(position_lists)):
+        if not starts:
+            break
+        starts.intersection_update(p - offset for p in position_lists[offset])
+    return sorted(starts)
+
+
+def min_window(position_lists):
+    """
+    Length of the shortest span of positions containing at least one position
+    from every list (a k-way merge over the lists).
+
+    Args:
+        position_lists (list): Ascending positions of each token
+
+    Returns:
+        int: Span length in tokens, or None if any list is empty
+    """
+    if not position_lists or not all(position_lists):
+        return None
+    heap = [(positions[0], i, 0) for i, positions in enumerate(position_lists)]
+    heapq.heapify(heap)
+    highest = max(position for position, _, _ in heap)
+    best = None
+    while True:
+        lowest, i, j = heap[0]
+        span = highest - lowest + 1
+        if best is None or span < best:
+            best = span
+        if j + 1 == len(position_lists[i]):
+            return best
+        following = position_lists[i][j + 1]
+        highest = max(highest, following)
+        heapq.heapreplace(heap, (following, i, j + 1))
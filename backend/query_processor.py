@@ -1,11 +1,100 @@
-import re
+from array import array
 from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from analysis import DEFAULT_ANALYZER
+from cache import ResultCache
+from spelling import SymSpellIndex, edits1
+from suggestions import SuggestionIndex
+import index_file
+
+QUERY_INDEX_MAGIC = b'PXPLQRY\0'
+QUERY_INDEX_VERSION = 1
+
+# Term weights of a query plan: the (corrected) query terms, their synonyms,
+# and misspelled words kept alongside their corrections
+QUERY_TERM_WEIGHT = 1.0
+SYNONYM_WEIGHT = 0.5
+ORIGINAL_TERM_WEIGHT = 0.25
+
+
+class QueryPlan:
+    """
+    A processed query: the original and corrected tokens, the synonym terms,
+    and the weighted terms searched for in a single retrieval pass.
+    """
+
+    def __init__(self, original, tokens, corrected_tokens, synonyms):
+        """
+        original: The query as typed
+        tokens: Analyzed query tokens
+        corrected_tokens: tokens after spelling correction (same length)
+        synonyms: Synonym tokens of the corrected tokens
+        """
+        self.original = original
+        self.tokens = tokens
+        self.corrected_tokens = corrected_tokens
+        self.synonyms = synonyms
+        
+        # Every distinct term once, with the weight of its strongest role
+        self.terms = {}
+        for token in corrected_tokens:
+            self._add(token, QUERY_TERM_WEIGHT)
+        for token in synonyms:
+            self._add(token, SYNONYM_WEIGHT)
+        for token, corrected in zip(tokens, corrected_tokens):
+            if token != corrected:
+                self._add(token, ORIGINAL_TERM_WEIGHT)
+
+    def _add(self, token, weight):
+        if weight > self.terms.get(token, 0):
+            self.terms[token] = weight
+
+    @property
+    def corrected(self):
+        """The corrected query, used for phrase matching"""
+        return " ".join(self.corrected_tokens)
+
+    @property
+    def was_corrected(self):
+        return self.corrected_tokens != self.tokens
+
+    @property
+    def expanded(self):
+        """The corrected terms and their synonyms, without duplicates"""
+        return " ".join(dict.fromkeys(self.corrected_tokens + self.synonyms))
+
+    def __repr__(self):
+        return f"QueryPlan({self.original!r}, terms={self.terms})"
+
+
+def _count_chunk(args):
+    """Process pool worker: word counts for one corpus chunk"""
+    analyzer, docs = args
+    counts = Counter()
+    for doc in docs:
+        title_tokens, content_tokens = analyzer.analyze(doc)
+        counts.update(title_tokens + content_tokens)
+    return counts
+
 
 class QueryProcessor:
-    def __init__(self):
+    def __init__(self, max_edit_distance=2, analyzer=None, correction_cache_size=4096):
+        """
+        max_edit_distance: Largest number of edits a spelling correction may make
+        analyzer: Analyzer shared with the ranker (default: lowercase word tokens)
+        correction_cache_size: Unknown words whose corrections are memoized
+        """
+        self.analyzer = analyzer or DEFAULT_ANALYZER
         self.vocab = Counter()
+        self.vocab_version = 0
+        # Corrections of unknown words, valid for one vocabulary version; a word
+        # without a correction is cached as itself
+        self.correction_cache = ResultCache(max_entries=correction_cache_size, ttl=None)
         self.total_words = 0
         self.doc_titles = []
+        self.max_edit_distance = max_edit_distance
+        self.spelling = SymSpellIndex(max_edit_distance)
+        self.suggestions = SuggestionIndex()
         
         # Common English Stopwords
         self.stopwords = {
@@ -32,30 +121,72 @@ class QueryProcessor:
 
     def tokenize(self, text):
         """Extracts words from text"""
-        return re.findall(r'\w+', text.lower())
+        return self.analyzer.tokenize(text)
 
-    def fit(self, corpus):
+    def fit(self, corpus, workers=1, chunk_size=None, vocab=None):
         """
         Builds vocabulary from a list of documents.
         Corpus is a list of dicts with 'title' and 'content'.
+        workers: Processes used to count words (1 = serial); chunk counts are
+        merged in corpus order, so the vocabulary matches a serial fit
+        vocab: Word counts already collected for this corpus (see
+        BM25Ranker.fit), used instead of tokenizing the corpus again
         """
         print("Training QueryProcessor...")
+        self.vocab_version += 1
+        self.correction_cache.clear()
         self.vocab = Counter()
         self.doc_titles = []
         
+        if vocab is not None:
+            self.vocab = vocab
+        elif workers > 1 and len(corpus) > 1:
+            if chunk_size is None:
+                chunk_size = max(1, -(-len(corpus) // (workers * 4)))
+            chunks = [(self.analyzer, corpus[start:start + chunk_size])
+                      for start in range(0, len(corpus), chunk_size)]
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                for counts in pool.map(_count_chunk, chunks):
+                    self.vocab.update(counts)
+        else:
+            for doc in corpus:
+                # Add to vocabulary
+                title_tokens, content_tokens = self.analyzer.analyze(doc)
+                self.vocab.update(title_tokens + content_tokens)
+        
+        # Store titles for suggestions
         for doc in corpus:
-            # Add to vocabulary
-            text = (doc.get('title', '') + " " + doc.get('content', ''))
-            words = self.tokenize(text)
-            self.vocab.update(words)
-            
-            # Store title for suggestions
             if 'title' in doc:
                 self.doc_titles.append(doc['title'])
                 
         self.total_words = sum(self.vocab.values())
+        
+        # Symmetric-delete index for spelling correction
+        self.spelling = SymSpellIndex(self.max_edit_distance)
+        self.spelling.fit(self.vocab)
+        
+        # Prefix indexes for auto-complete
+        self.suggestions = SuggestionIndex()
+        self.suggestions.fit(self.vocab, self.doc_titles)
         print(f"QueryProcessor trained. Vocab size: {len(self.vocab)}")
 
+    def add_words(self, counts):
+        """
+        Adds the word counts of newly indexed documents to the vocabulary, so
+        their words are recognized as known instead of being corrected. The
+        spelling and auto-complete indexes only pick new words up at the next fit.
+        
+        Args:
+            counts (Counter): word -> occurrences (see BM25Ranker.add_documents)
+        """
+        if not counts:
+            return
+        self.vocab.update(counts)
+        self.total_words += sum(counts.values())
+        # Cached corrections may now point away from the more frequent word
+        self.vocab_version += 1
+        self.correction_cache.clear()
+
     def P(self, word): 
         """Probability of `word`."""
         N = self.total_words
@@ -67,14 +198,18 @@ class QueryProcessor:
         if word in self.vocab:
             return word
             
-        # Get candidates
-        candidates = (self.known([word]) or 
-                      self.known(self.edits1(word)) or 
-                      self.known(self.edits2(word)) or 
-                      [word])
-        
-        # Return the candidate with highest probability
-        return max(candidates, key=self.P)
+        # Query logs repeat the same misspellings; reuse earlier lookups
+        version = self.vocab_version
+        cached = self.correction_cache.get(word, version)
+        if cached is not None:
+            return cached
+            
+        # Known words at the smallest edit distance (up to max_edit_distance),
+        # looked up in the symmetric-delete index; the most probable one wins
+        # (equally probable candidates by alphabetical order)
+        corrected = self.spelling.lookup(word) or word
+        self.correction_cache.put(word, corrected, version)
+        return corrected
 
     def known(self, words): 
         """The subset of `words` that appear in the dictionary of frequencies."""
@@ -82,13 +217,7 @@ class QueryProcessor:
 
     def edits1(self, word):
         """All edits that are one edit away from `word`."""
-        letters    = 'abcdefghijklmnopqrstuvwxyz'
-        splits     = [(word[:i], word[i:])    for i in range(len(word) + 1)]
-        deletes    = [L + R[1:]               for L, R in splits if R]
-        transposes = [L + R[1] + R[0] + R[2:] for L, R in splits if len(R)>1]
-        replaces   = [L + c + R[1:]           for L, R in splits if R for c in letters]
-        inserts    = [L + c + R               for L, R in splits for c in letters]
-        return set(deletes + transposes + replaces + inserts)
+        return edits1(word)
 
     def edits2(self, word): 
         """All edits that are two edits away from `word`."""
@@ -101,67 +230,97 @@ class QueryProcessor:
         1. Exact phrases (from titles)
         2. High frequency words
         """
-        prefix = prefix.lower().strip()
-        if not prefix:
-            return []
-            
-        suggestions = []
-        
-        # 1. Check Titles (Phrase matching)
-        for title in self.doc_titles:
-            if title.lower().startswith(prefix):
-                 suggestions.append(title)
-            elif " " + prefix in title.lower(): # Match start of words in title
-                 suggestions.append(title)
-        
-        # Limit title suggestions
-        suggestions = sorted(list(set(suggestions)))[:3]
-        
-        # 2. Check Vocabulary (Word completion)
-        # Find words starting with prefix, sort by frequency
-        word_matches = [w for w in self.vocab if w.startswith(prefix)]
-        word_matches.sort(key=lambda w: self.vocab[w], reverse=True)
-        
-        suggestions.extend(word_matches[:limit])
-        
-        # Dedup and limit
-        return list(dict.fromkeys(suggestions))[:limit]
+        return self.suggestions.suggest(prefix.lower().strip(), limit)
+
+    def synonym_tokens(self, tokens):
+        """Analyzed synonyms of `tokens`, without duplicates"""
+        synonyms = []
+        for word in tokens:
+            for syn in self.synonyms.get(word, ()):
+                synonyms.extend(self.tokenize(syn))
+        return list(dict.fromkeys(synonyms))
 
     def expand_query(self, query):
         """Expands query with synonyms"""
         words = self.tokenize(query)
-        expanded_terms = set(words)
-        
-        for word in words:
-            if word in self.synonyms:
-                for syn in self.synonyms[word]:
-                    expanded_terms.add(syn)
-                    
-        return " ".join(expanded_terms)
+        return " ".join(dict.fromkeys(words + self.synonym_tokens(words)))
 
-    def process_query(self, query):
+    def plan(self, query):
         """
         Full pipeline:
         1. Tokenize
         2. Spell Correct
-        3. Remove Stopwords (for search, optional)
-        4. Return corrected query string and metadata
+        3. Expand with synonyms
+        4. Return a QueryPlan weighting the corrected, synonym and original terms
         """
         original_tokens = self.tokenize(query)
-        corrected_tokens = []
-        was_corrected = False
-        
-        for token in original_tokens:
-            correction = self.correction(token)
-            if correction != token:
-                was_corrected = True
-            corrected_tokens.append(correction)
-            
-        corrected_query = " ".join(corrected_tokens)
-        
+        corrected_tokens = [self.correction(token) for token in original_tokens]
+        return QueryPlan(query, original_tokens, corrected_tokens, self.synonym_tokens(corrected_tokens))
+
+    def process_query(self, query):
+        """
+        Returns the corrected and expanded query strings and metadata
+        (see plan() for the weighted terms)
+        """
+        plan = self.plan(query)
         return {
             "original": query,
-            "corrected": corrected_query,
-            "was_corrected": was_corrected,
-            "expanded": self.expand_query(corrected_query)
+            "corrected": plan.corrected,
+            "was_corrected": plan.was_corrected,
+            "expanded": plan.expanded
         }
+
+    def save(self, filepath, checksum=b''):
+        """
+        Saves the vocabulary, titles and the spelling and suggestion indexes
+        to one memory-mappable file (see index_file.write_sections).
+        checksum: Corpus checksum stored for staleness checks
+        """
+        try:
+            # The suggestion index stores the vocabulary words in vocab order
+            sections = self.suggestions.sections()
+            sections['vocab_counts'] = array('Q', self.vocab.values())
+            title_offsets, title_data = index_file._string_table(self.doc_titles)
+            sections['doc_title_offsets'] = title_offsets
+            sections['doc_title_data'] = title_data
+            sections.update(self.spelling.sections())
+            index_file.write_sections(filepath, QUERY_INDEX_MAGIC, QUERY_INDEX_VERSION, sections, checksum)
+            print(f"QueryProcessor saved to {filepath}")
+        except Exception as e:
+            print(f"Error saving QueryProcessor: {e}")
+
+    @staticmethod
+    def load(filepath, checksum=None, analyzer=None):
+        """
+        Loads a saved QueryProcessor without touching the corpus. Indexes stay
+        memory-mapped; only the vocabulary counts are read into memory.
+        Returns None if the file is missing, invalid, or (when `checksum` is
+        given) built from a different corpus.
+        analyzer: The analyzer the vocabulary was built with
+        """
+        try:
+            mapped = index_file.open_sections(filepath, QUERY_INDEX_MAGIC, QUERY_INDEX_VERSION)
+            if checksum is not None and mapped['checksum'] != index_file.pad_checksum(checksum):
+                print("Persisted QueryProcessor checksum does not match corpus")
+                return None
+            sections = mapped['sections']
+            suggestions = SuggestionIndex.from_sections(sections)
+            words = suggestions.words
+            counts = sections['vocab_counts'].cast('Q')
+            if len(counts) != len(words):
+                raise index_file.IndexFormatError("Vocabulary tables differ in length")
+                
+            processor = QueryProcessor(analyzer=analyzer)
+            processor.vocab = Counter(dict(zip(words, counts)))
+            processor.total_words = sum(counts)
+            processor.doc_titles = index_file.MappedStrings(sections['doc_title_offsets'].cast('Q'),
+                                                            sections['doc_title_data'])
+            processor.spelling = SymSpellIndex.from_sections(sections, processor.vocab, words)
+            processor.max_edit_distance = processor.spelling.max_edit_distance
+            processor.suggestions = suggestions
+            processor._mapping = mapped['mmap']
+        except Exception as e:
+            print(f"Error loading QueryProcessor: {e}")
+            return None
+        print(f"QueryProcessor loaded. Vocab size: {len(processor.vocab)}")
+        return processor
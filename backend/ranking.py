@@ -1,130 +1,881 @@
 import math
-import re
-import pickle
-import os
-from collections import Counter, defaultdict
+import heapq
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import Counter
+from analysis import DEFAULT_ANALYZER
+from postings import Postings, POSTING_TYPECODE, phrase_starts, min_window
+from segments import Segment, SegmentedIndexView, TieredMergePolicy, concat_postings, merge_segments
+import index_file
+import numpy_scoring
+
+# Relative slack added to score upper bounds so float rounding never prunes
+# a document whose exact score ties the heap threshold
+_UPPER_BOUND_SLACK = 1e-9
+
+
+def _build_chunk(args):
+    """
+    Process pool worker: tokenizes one corpus chunk into a partial segment.
+    
+    Returns:
+        tuple: (Segment, doc lengths, title lengths, url index, document frequencies,
+                total length, word counts or None)
+    """
+    k1, b, analyzer, docs, doc_start, count_words = args
+    partial = BM25Ranker(k1=k1, b=b, analyzer=analyzer)
+    vocab = Counter() if count_words else None
+    segment, total_length = partial._build_segment(docs, doc_start, vocab)
+    return (segment, partial.doc_len, partial.title_len, partial.url_index, partial.doc_freqs,
+            total_length, vocab)
+
 
 class BM25Ranker:
-    def __init__(self, k1=1.5, b=0.75):
+    def __init__(self, k1=1.5, b=0.75, compress_postings=False, compact_ratio=0.2, merge_policy=None,
+                 engine='python', analyzer=None):
         """
-        Initialize BM25 Ranker with Inverted Index
+        Initialize BM25 Ranker with a segmented Inverted Index
         k1: Term frequency saturation parameter (default 1.5)
         b: Length normalization parameter (default 0.75)
+        compress_postings: Store postings delta/varint compressed (smaller, slower to search)
+        compact_ratio: Fraction of deleted documents in a segment that triggers its rewrite
+        merge_policy: Segment merge policy (default TieredMergePolicy)
+        engine: Scoring engine: 'python' (MaxScore), 'numpy' (vectorized) or
+                'auto' (numpy when installed). Falls back to 'python' without NumPy.
+        analyzer: Analyzer for documents and queries (default: lowercase word tokens)
         """
         self.k1 = k1
         self.b = b
-        self.corpus_size = 0
+        self.engine = engine
+        self.analyzer = analyzer or DEFAULT_ANALYZER
+        self.compress_postings = compress_postings
+        self.compact_ratio = compact_ratio
+        self.merge_policy = merge_policy or TieredMergePolicy(expunge_ratio=compact_ratio)
+        self.checksum = b''
+        self.corpus_size = 0  # Live (non-deleted) documents
+        self.total_length = 0
         self.avgdl = 0
-        self.doc_freqs = {}
-        self.idf = {}
-        self.doc_len = []
-        self.doc_term_freqs = []
+        self.doc_freqs = {}  # Global statistics, shared by all segments
+        self.idf = {}  # Filled for every term by fit, lazily after updates
+        self.doc_len = array(POSTING_TYPECODE)  # Per doc index, including deleted slots
+        # Title tokens per doc: body positions below it are in the title, the rest in the content
+        self.title_len = array(POSTING_TYPECODE)
+        
+        # Incremental updates: url -> doc index (see live_urls), and tombstoned doc indices
+        self.url_index = {}
+        self.deleted = set()
+        self._mapped_urls = None
+        # Bumped by every change to the indexed documents (tags cached results)
+        self.generation = 0
+        self._lock = threading.RLock()
+        self._merger = None
+        self._merger_stop = None
         
-        # Inverted Index: token -> list of doc_indices
-        self.inverted_index = defaultdict(list)
+        # Upper bound of a single term's BM25 contribution: token -> max score
+        self.max_scores = {}
+        
+        # Immutable segments in doc order; replaced (never mutated) on every write
+        self.segments = ()
+
+    @property
+    def inverted_index(self):
+        """Inverted Index view across all segments: token -> Postings"""
+        return SegmentedIndexView(self.segments)
 
     def tokenize(self, text):
-        """Simple tokenizer that lowercases and extracts alphanumeric words"""
-        if not text:
-            return []
-        return re.findall(r'\w+', text.lower())
+        """Tokenizes text with the ranker's analyzer (lowercased alphanumeric words by default)"""
+        return self.analyzer.tokenize(text)
 
-    def fit(self, corpus):
-        """
-        Fits the ranker to the corpus and builds Inverted Index.
-        Corpus is a list of documents (dicts with 'title' and 'content').
+    def _build_segment(self, docs, doc_start, vocab=None):
         """
-        self.corpus_size = len(corpus)
-        self.doc_len = []
-        self.doc_term_freqs = []
-        self.doc_freqs = {} 
-        self.inverted_index = defaultdict(list)
+        Tokenizes `docs` into a new segment starting at doc index `doc_start`.
+        Appends doc lengths and URLs and updates document frequencies once the
+        whole segment is built (a failed build changes nothing).
+        vocab: Optional Counter updated with every token, in document order
         
+        Returns:
+            tuple: (Segment, total token count)
+        """
+        postings_by_token = {}
+        url_postings = {}
         total_length = 0
+        doc_len = array(POSTING_TYPECODE)
+        title_len = array(POSTING_TYPECODE)
+        url_index = {}
+        doc_freqs = {}
         
-        print("Training BM25 ranker on corpus...")
-        
-        for doc_index, doc in enumerate(corpus):
+        for doc_index, doc in enumerate(docs, doc_start):
             # Combine title and content for indexing
-            text = (doc.get('title', '') + " " + doc.get('content', ''))
-            tokens = self.tokenize(text)
+            title_tokens, content_tokens = self.analyzer.analyze(doc)
+            tokens = title_tokens + content_tokens
+            if vocab is not None:
+                vocab.update(tokens)
             length = len(tokens)
-            self.doc_len.append(length)
+            doc_len.append(length)
+            title_len.append(len(title_tokens))
             total_length += length
+            if doc.get('url'):
+                url_index[doc['url']] = doc_index
             
-            # Term frequencies in this doc
-            freqs = Counter(tokens)
-            self.doc_term_freqs.append(freqs)
+            # Update Inverted Index (with term positions) and Document Frequencies
+            for token, positions in self._token_positions(tokens).items():
+                doc_freqs[token] = doc_freqs.get(token, 0) + 1
+                postings = postings_by_token.get(token)
+                if postings is None:
+                    postings = postings_by_token[token] = Postings()
+                postings.append(doc_index, len(positions), positions)
+                
+            # URL tokens are indexed for phrase matching only (not scored)
+            for token, positions in self._token_positions(self.tokenize(doc.get('url', ''))).items():
+                postings = url_postings.get(token)
+                if postings is None:
+                    postings = url_postings[token] = Postings()
+                postings.append(doc_index, len(positions), positions)
+                
+        if self.compress_postings:
+            for token, postings in postings_by_token.items():
+                postings_by_token[token] = postings.compress()
+                
+        segment = Segment(postings_by_token, doc_start, doc_start + len(docs), url_postings=url_postings)
+        self.doc_len.extend(doc_len)
+        self.title_len.extend(title_len)
+        self.url_index.update(url_index)
+        for token, freq in doc_freqs.items():
+            self.doc_freqs[token] = self.doc_freqs.get(token, 0) + freq
+        return segment, total_length
+
+    @staticmethod
+    def _token_positions(tokens):
+        """Groups token positions by token: token -> ascending positions"""
+        positions = {}
+        for position, token in enumerate(tokens):
+            found = positions.get(token)
+            if found is None:
+                positions[token] = [position]
+            else:
+                found.append(position)
+        return positions
+
+    def fit(self, corpus, workers=1, chunk_size=None, vocab=None):
+        """
+        Fits the ranker to the corpus and builds Inverted Index.
+        Corpus is a list of documents (dicts with 'title' and 'content').
+        workers: Processes used to tokenize the corpus (1 = serial build)
+        chunk_size: Documents per worker task (default: ~4 tasks per worker)
+        vocab: Optional Counter filled with the corpus word counts (in
+               first-seen order) during the same pass, e.g. for QueryProcessor.fit
+        """
+        if workers > 1 and len(corpus) > 1:
+            return self._fit_parallel(corpus, workers, chunk_size, vocab)
+            
+        with self._lock:
+            self.corpus_size = len(corpus)
+            self.doc_len = array(POSTING_TYPECODE)
+            self.title_len = array(POSTING_TYPECODE)
+            self.doc_freqs = {} 
+            self.url_index = {}
+            self.deleted = set()
+            self._mapped_urls = None
             
-            # Update Inverted Index and Document Frequencies
-            unique_tokens = set(tokens)
-            for token in unique_tokens:
-                self.doc_freqs[token] = self.doc_freqs.get(token, 0) + 1
-                self.inverted_index[token].append(doc_index)
+            print("Training BM25 ranker on corpus...")
+            
+            segment, total_length = self._build_segment(corpus, 0, vocab)
+            self.segments = (segment,)
+            self.generation += 1
                 
-        self.avgdl = total_length / self.corpus_size if self.corpus_size > 0 else 0
+            self.total_length = total_length
+            self.avgdl = total_length / self.corpus_size if self.corpus_size > 0 else 0
+            self._compute_statistics()
+            
+        print(f"BM25 training complete. Vocabulary size: {len(self.idf)}")
+
+    def _fit_parallel(self, corpus, workers, chunk_size=None, vocab=None):
+        """
+        Parallel fit: chunks are tokenized and counted in a process pool, then
+        their partial postings, doc lengths and document frequencies are merged
+        in chunk order. The result is identical to a serial fit.
+        """
+        if chunk_size is None:
+            chunk_size = max(1, -(-len(corpus) // (workers * 4)))
+        tasks = [(self.k1, self.b, self.analyzer, corpus[start:start + chunk_size], start, vocab is not None)
+                 for start in range(0, len(corpus), chunk_size)]
         
+        print(f"Training BM25 ranker on corpus ({workers} workers, {len(tasks)} chunks)...")
+        
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_build_chunk, tasks))
+            
+        with self._lock:
+            self.corpus_size = len(corpus)
+            self.doc_len = array(POSTING_TYPECODE)
+            self.title_len = array(POSTING_TYPECODE)
+            self.doc_freqs = {}
+            self.url_index = {}
+            self.deleted = set()
+            self._mapped_urls = None
+            
+            total_length = 0
+            parts = []
+            for segment, doc_len, title_len, url_index, doc_freqs, length, counts in results:
+                parts.append(segment)
+                self.doc_len.extend(doc_len)
+                self.title_len.extend(title_len)
+                self.url_index.update(url_index)
+                for token, freq in doc_freqs.items():
+                    self.doc_freqs[token] = self.doc_freqs.get(token, 0) + freq
+                total_length += length
+                if vocab is not None:
+                    vocab.update(counts)
+            self.segments = (merge_segments(parts, set(), self.compress_postings),)
+            self.generation += 1
+            
+            self.total_length = total_length
+            self.avgdl = total_length / self.corpus_size if self.corpus_size > 0 else 0
+            self._compute_statistics()
+            
+        print(f"BM25 training complete. Vocabulary size: {len(self.idf)}")
+
+    def _compute_idf(self, freq):
+        """IDF formula: log((N - n + 0.5) / (n + 0.5) + 1)"""
+        return math.log((self.corpus_size - freq + 0.5) / (freq + 0.5) + 1)
+
+    def _compute_statistics(self):
+        """Recomputes IDF and per-term score upper bounds for the whole vocabulary"""
         # Calculate IDF
-        self.idf = {}
+        idf = {}
         for token, freq in self.doc_freqs.items():
-            # IDF formula: log((N - n + 0.5) / (n + 0.5) + 1)
-            self.idf[token] = math.log((self.corpus_size - freq + 0.5) / (freq + 0.5) + 1)
+            idf[token] = self._compute_idf(freq)
+        self.idf = idf
             
-        print(f"BM25 training complete. Vocabulary size: {len(self.idf)}")
+        # Per-term score upper bounds for dynamic pruning:
+        # idf * (k1 + 1) * max(tf / (tf + norm)), with the length norm computed once per doc
+        avgdl = self.avgdl or 1
+        norms = [self.k1 * (1 - self.b + self.b * (length / avgdl)) for length in self.doc_len]
+        deleted = self.deleted
+        max_scores = {}
+        for token, postings in self.inverted_index.items():
+            if deleted:
+                best = max((freq / (freq + norms[doc_idx]) for doc_idx, freq in postings.items()
+                            if doc_idx not in deleted), default=0.0)
+            else:
+                best = max(map(lambda doc_idx, freq: freq / (freq + norms[doc_idx]),
+                               postings.doc_ids, postings.tfs), default=0.0)
+            max_scores[token] = idf[token] * (self.k1 + 1) * best
+        self.max_scores = max_scores
 
-    def search(self, query, top_k=100):
+    def _get_idf(self, token):
+        """IDF of `token`, computed and cached on first use after an update"""
+        idf = self.idf.get(token)
+        if idf is None:
+            freq = self.doc_freqs.get(token, 0)
+            if not freq:
+                return 0
+            idf = self.idf[token] = self._compute_idf(freq)
+        return idf
+
+    def _get_bound(self, token):
         """
-        Efficiently searches the inverted index for the query.
-        Returns a list of (doc_index, score) tuples.
+        Upper bound of `token`'s score contribution. Exact bounds are recomputed
+        by fit/compact; after updates the tf saturation limit idf * (k1 + 1) is used.
         """
-        query_tokens = self.tokenize(query)
-        if not query_tokens:
+        bound = self.max_scores.get(token)
+        if bound is None:
+            bound = self._get_idf(token) * (self.k1 + 1)
+        return bound
+
+    def _term_postings(self, segments, token):
+        """Postings of `token` across a snapshot of segments, or None"""
+        parts = []
+        for segment in segments:
+            postings = segment.postings.get(token)
+            if postings is not None:
+                parts.append(postings)
+        return concat_postings(parts) if parts else None
+
+    def _segment_for(self, segments, doc_index):
+        """The segment of a snapshot holding `doc_index`, or None"""
+        i = bisect_right([segment.doc_start for segment in segments], doc_index) - 1
+        if i >= 0 and doc_index < segments[i].doc_end:
+            return segments[i]
+        return None
+
+    # ------------------------------------------------------------------
+    # Incremental updates
+    # ------------------------------------------------------------------
+
+    def _ensure_mutable(self):
+        """
+        Copies the small per-document and per-term tables of a memory-mapped
+        index into memory before the first update. Postings stay mapped:
+        the loaded file becomes the first (immutable) segment.
+        """
+        if self._mapped_urls is None:
+            return
+        self.doc_len = array(POSTING_TYPECODE, self.doc_len)
+        self.title_len = array(POSTING_TYPECODE, self.title_len)
+        self.total_length = sum(self.doc_len)
+        self.doc_freqs = dict(self.doc_freqs.items())
+        self.idf = dict(self.idf.items())
+        self.max_scores = dict(self.max_scores.items())
+        self.live_urls()
+        self._mapped_urls = None
+
+    def _invalidate_statistics(self):
+        """Corpus size and avgdl changed: drop cached IDF values and exact bounds"""
+        self.avgdl = self.total_length / self.corpus_size if self.corpus_size > 0 else 0
+        self.idf = {}
+        self.max_scores = {}
+
+    def live_urls(self):
+        """
+        URLs of the live documents. A memory-mapped index builds the table
+        from the mapped URLs on first use, without copying any other table.
+        
+        Returns:
+            dict: url -> doc index
+        """
+        with self._lock:
+            if self.url_index is None:
+                self.url_index = {url: doc_idx for doc_idx, url in enumerate(self._mapped_urls) if url}
+            return self.url_index
+
+    def doc_index(self, url):
+        """
+        Index of the live document with `url` (read-only: a memory-mapped
+        index stays mapped)
+        
+        Returns:
+            int: The doc index, or None if no live document has the URL
+        """
+        return self.live_urls().get(url)
+
+    def add_documents(self, docs, vocab=None):
+        """
+        Adds documents to the index as one new immutable segment.
+        Raises ValueError if a live document with the same URL is already indexed
+        (use replace_document).
+        vocab: Optional Counter updated with the documents' word counts, e.g.
+               for QueryProcessor.add_words
+        
+        Returns:
+            list: The new documents' indices
+        """
+        if not docs:
             return []
+        with self._lock:
+            self._ensure_mutable()
+            for doc in docs:
+                url = doc.get('url')
+                if url and url in self.url_index:
+                    raise ValueError(f"Document already indexed: {url}")
+                
+            # Doc lengths are appended before the segment is published,
+            # so readers never see a posting without one
+            doc_start = len(self.doc_len)
+            segment, total_length = self._build_segment(docs, doc_start, vocab)
+            self.segments = self.segments + (segment,)
+            self.generation += 1
+            
+            self.corpus_size += len(docs)
+            self.total_length += total_length
+            self._invalidate_statistics()
             
-        # 1. Retrieve candidates (boolean OR)
-        candidate_ids = set()
+            if self._merger is None:
+                self.maybe_merge()
+            return list(range(doc_start, doc_start + len(docs)))
+
+    def add_document(self, doc):
+        """
+        Adds a single document to the index.
+        
+        Returns:
+            int: The new document's index
+        """
+        return self.add_documents([doc])[0]
+
+    def replace_document(self, doc, previous=None):
+        """
+        Replaces the document with the same URL (or adds it if unknown).
+        previous: Optional old version of the document, see delete_document.
+        
+        Returns:
+            int: The new document's index
+        """
+        with self._lock:
+            self.delete_document(doc['url'], previous)
+            return self.add_document(doc)
+
+    def delete_document(self, url, previous=None):
+        """
+        Tombstones the document with `url`. Its postings are dropped when its
+        segment is next merged; document frequencies and avgdl are updated now.
+        previous: Optional indexed version of the document. Its tokens identify
+        the terms to update; without it the document's segment is scanned.
+        
+        Returns:
+            bool: True if a document was deleted
+        """
+        with self._lock:
+            doc_index = self.live_urls().get(url)
+            if doc_index is None:
+                return False
+            self._ensure_mutable()
+                
+            if previous is not None:
+                terms = set(self.tokenize(previous.get('title', '') + " " + previous.get('content', '')))
+            else:
+                segment = self._segment_for(self.segments, doc_index)
+                terms = [token for token, postings in segment.postings.items() if doc_index in postings]
+            for token in terms:
+                self.doc_freqs[token] -= 1
+                
+            self.deleted.add(doc_index)
+            self.generation += 1
+            del self.url_index[url]
+            self.corpus_size -= 1
+            self.total_length -= self.doc_len[doc_index]
+            self._invalidate_statistics()
+            
+            if self._merger is None:
+                self.maybe_merge()
+            return True
+
+    # ------------------------------------------------------------------
+    # Segment merging
+    # ------------------------------------------------------------------
+
+    def maybe_merge(self):
+        """
+        Runs one merge chosen by the merge policy, if any.
+        The merge itself runs outside the write lock; only the swap is locked.
+        
+        Returns:
+            bool: True if segments were merged
+        """
+        with self._lock:
+            segments = self.segments
+            deleted = set(self.deleted)
+        choice = self.merge_policy.find_merge(list(segments), deleted)
+        if choice is None:
+            return False
+        run = segments[choice[0]:choice[1]]
+        merged = merge_segments(list(run), deleted, self.compress_postings)
+        return self._apply_merge(run, merged, deleted)
+
+    def compact(self):
+        """
+        Merges all segments into one, dropping postings of deleted documents
+        and terms no longer in any live document, then recomputes exact IDF
+        and score bounds. Doc indices are stable: deleted slots keep a zero length.
+        """
+        with self._lock:
+            self._ensure_mutable()
+            segments = self.segments
+            deleted = set(self.deleted)
+            if segments and (len(segments) > 1 or deleted):
+                merged = merge_segments(list(segments), deleted, self.compress_postings)
+                self._apply_merge(segments, merged, deleted)
+            self.doc_freqs = {token: freq for token, freq in self.doc_freqs.items() if freq > 0}
+            self._compute_statistics()
+
+    def _apply_merge(self, run, merged, purged):
+        """
+        Swaps a run of segments for their merge result, unless another writer
+        replaced them meanwhile. Tombstones purged by the merge are released.
+        
+        Returns:
+            bool: True if the merge was applied
+        """
+        with self._lock:
+            segments = self.segments
+            width = len(run)
+            for start in range(len(segments) - width + 1):
+                if all(a is b for a, b in zip(segments[start:start + width], run)):
+                    break
+            else:
+                return False
+            # Publish segments before releasing tombstones (readers load deleted first)
+            self.segments = segments[:start] + (merged,) + segments[start + width:]
+            released = {doc_idx for doc_idx in purged if merged.doc_start <= doc_idx < merged.doc_end}
+            if released:
+                self.deleted = self.deleted - released
+                for doc_idx in released:
+                    self.doc_len[doc_idx] = 0
+            return True
+
+    def start_background_merging(self, interval=1.0):
+        """
+        Starts a daemon thread that merges segments every `interval` seconds,
+        one merge at a time, so writers never merge inline
+        """
+        with self._lock:
+            if self._merger is not None:
+                return
+            self._merger_stop = threading.Event()
+            self._merger = threading.Thread(target=self._merge_loop, args=(interval, self._merger_stop),
+                                            name="bm25-merger", daemon=True)
+            self._merger.start()
+
+    def stop_background_merging(self):
+        """Stops the background merge thread, if running"""
+        with self._lock:
+            merger, stop = self._merger, self._merger_stop
+            self._merger = None
+        if merger is not None:
+            stop.set()
+            merger.join()
+
+    def _merge_loop(self, interval, stop):
+        # At most one merge per interval bounds the merge I/O rate
+        while not stop.wait(interval):
+            try:
+                self.maybe_merge()
+            except Exception as e:
+                print(f"Error merging segments: {e}")
+
+    # ------------------------------------------------------------------
+    # Positional matching
+    # ------------------------------------------------------------------
+
+    def positions(self, doc_index, token, field='body'):
+        """
+        Positions of `token` in a document, read from the postings.
+        field: 'body' (title + content, positions counted from the title start),
+        'title', 'content' or 'url'
+        
+        Returns:
+            list: Ascending token positions (empty if absent)
+        """
+        if doc_index in self.deleted:  # Read before the segments (see _apply_merge)
+            return []
+        segment = self._segment_for(self.segments, doc_index)
+        if segment is None:
+            return []
+        table = segment.url_postings if field == 'url' else segment.postings
+        postings = table.get(token)
+        if postings is None:
+            return []
+        positions = postings.positions_of(doc_index)
+        if field == 'title':
+            title_len = self.title_len[doc_index]
+            return [p for p in positions if p < title_len]
+        if field == 'content':
+            title_len = self.title_len[doc_index]
+            return [p for p in positions if p >= title_len]
+        return list(positions)
+
+    def phrase_match(self, query_tokens, doc_index, field='body'):
+        """
+        True if `query_tokens` occur consecutively, in order, within one field
+        of the document. 'body' matches a phrase in the title or in the content
+        but not one spanning both.
+        """
+        if not query_tokens:
+            return False
+        if field == 'body':
+            return (self.phrase_match(query_tokens, doc_index, 'title') or
+                    self.phrase_match(query_tokens, doc_index, 'content'))
+        position_lists = []
         for token in query_tokens:
-            if token in self.inverted_index:
-                candidate_ids.update(self.inverted_index[token])
+            positions = self.positions(doc_index, token, field)
+            if not positions:
+                return False
+            position_lists.append(positions)
+        return bool(phrase_starts(position_lists))
+
+    def proximity_match(self, query_tokens, doc_index, window, field='body'):
+        """
+        True if every distinct query token occurs within a span of `window`
+        consecutive words of the document field
+        """
+        position_lists = []
+        for token in dict.fromkeys(query_tokens):
+            positions = self.positions(doc_index, token, field)
+            if not positions:
+                return False
+            position_lists.append(positions)
+        span = min_window(position_lists)
+        return span is not None and span <= window
+
+    def search(self, query, top_k=100, exhaustive=False, engine=None):
+        """
+        Efficiently searches the inverted index for the query.
+        Returns a list of (doc_index, score) tuples, best first (ties by doc index).
         
-        if not candidate_ids:
+        By default runs document-at-a-time MaxScore pruning, skipping documents
+        that cannot enter the top_k. exhaustive=True scores every candidate;
+        both paths return identical results. engine overrides self.engine;
+        the NumPy engine matches the Python paths within float tolerance.
+        """
+        query_tokens = self.tokenize(query)
+        if not query_tokens or top_k <= 0:
             return []
+        return self._search_tokens([(token, 1) for token in query_tokens], top_k, exhaustive, engine)
 
-        # 2. Score candidates
-        scores = []
-        for doc_idx in candidate_ids:
-            score = self.get_score_fast(query_tokens, doc_idx)
-            scores.append((doc_idx, score))
+    def search_weighted(self, term_weights, top_k=100, exhaustive=False, engine=None):
+        """
+        Searches for analyzed terms with individual weights in one pass.
+        A document's score is the sum of weight * BM25 contribution over the
+        terms it contains; with every weight 1 this equals search().
+        
+        Args:
+            term_weights (dict): token -> weight (tokens already analyzed;
+                                 non-positive weights are ignored)
             
-        # 3. Sort by score (descending) and return top_k
-        scores.sort(key=lambda x: x[1], reverse=True)
+        Returns:
+            list: (doc_index, score) tuples, best first (ties by doc index)
+        """
+        query_terms = self._weighted_terms(term_weights)
+        if not query_terms or top_k <= 0:
+            return []
+        return self._search_tokens(query_terms, top_k, exhaustive, engine)
+
+    @staticmethod
+    def _weighted_terms(term_weights):
+        """(token, weight) pairs of a term -> weight mapping, keeping positive weights"""
+        return [(token, weight) for token, weight in term_weights.items() if weight > 0]
+
+    def search_many(self, queries, top_k=100, exhaustive=False, engine=None):
+        """
+        Searches several queries against one snapshot of the index.
+        Each distinct term's postings are read once for the whole batch and
+        repeated queries are scored once. Results match search() per query.
+        
+        Args:
+            queries (list): Query strings, or token -> weight mappings
+                            (see search_weighted)
+        
+        Returns:
+            list: One result list per query, in input order
+        """
+        batch_terms = []
+        for query in queries:
+            if isinstance(query, str):
+                batch_terms.append([(token, 1) for token in self.tokenize(query)])
+            else:
+                batch_terms.append(self._weighted_terms(query))
+        if top_k <= 0:
+            return [[] for _ in queries]
+            
+        # Tombstones are read before the segments: a merge publishes its
+        # segments before releasing the tombstones it purged
+        deleted = self.deleted
+        segments = self.segments
+        postings = {}
+        for query_terms in batch_terms:
+            for token, _ in query_terms:
+                if token not in postings:
+                    postings[token] = self._term_postings(segments, token)
+                    
+        results = {}
+        batch = []
+        for query_terms in batch_terms:
+            key = tuple(query_terms)
+            if key not in results:
+                results[key] = self._search_tokens(query_terms, top_k, exhaustive, engine,
+                                                   postings, deleted) if key else []
+            batch.append(list(results[key]))
+        return batch
+
+    def _search_tokens(self, query_terms, top_k, exhaustive=False, engine=None, postings=None, deleted=None):
+        """
+        Dispatches an analyzed query to the scoring engine.
+        query_terms: (token, weight) pairs in query order; a repeated token
+        counts once per occurrence
+        postings: Optional token -> Postings (or None) lookup shared by a batch
+        deleted: Tombstones read before the segments `postings` came from
+                 (required with `postings`)
+        """
+        if postings is None:
+            # Tombstones first (see _apply_merge)
+            deleted = self.deleted
+            segments = self.segments
+            postings = {token: self._term_postings(segments, token)
+                        for token in dict.fromkeys(token for token, _ in query_terms)}
+        if self._use_numpy(engine):
+            return numpy_scoring.search(self, query_terms, top_k, postings, deleted)
+        if exhaustive:
+            return self._search_exhaustive(query_terms, top_k, postings, deleted)
+        return self._search_maxscore(query_terms, top_k, postings, deleted)
+
+    def _use_numpy(self, engine=None):
+        """Resolves the scoring engine, falling back to pure Python without NumPy"""
+        engine = engine or self.engine
+        if engine == 'numpy' and not numpy_scoring.is_available():
+            if not getattr(self, '_warned_numpy', False):
+                print("NumPy not installed; using the pure-Python scoring engine")
+                self._warned_numpy = True
+            return False
+        return engine in ('numpy', 'auto') and numpy_scoring.is_available()
+
+    def _search_exhaustive(self, query_terms, top_k, term_postings, deleted):
+        """Scores every document matching any query term"""
+        # 1. Retrieve candidates (boolean OR) and accumulate scores term-at-a-time,
+        #    reading term frequencies straight from the postings
+        accumulators = {}
+        for token, weight in query_terms:
+            postings = term_postings[token]
+            if postings is None:
+                continue
+            idf = self._get_idf(token)
+            for doc_idx, freq in postings.items():
+                if doc_idx in deleted:
+                    continue
+                accumulators[doc_idx] = accumulators.get(doc_idx, 0.0) + self._term_score(idf, freq, doc_idx) * weight
+        
+        if not accumulators:
+            return []
+
+        # 2. Sort by score (descending) and return top_k
+        scores = list(accumulators.items())
+        scores.sort(key=lambda x: (-x[1], x[0]))
         return scores[:top_k]
 
+    def _search_maxscore(self, query_terms, top_k, term_postings, deleted):
+        """
+        Document-at-a-time top-k retrieval with MaxScore pruning.
+        Terms are ordered by score upper bound; once the heap is full, terms whose
+        cumulative bound cannot beat the threshold become non-essential and are
+        only probed for documents that surface from the essential terms.
+        """
+        weights = {}
+        for token, weight in query_terms:
+            weights[token] = weights.get(token, 0) + weight
+        terms = []
+        for token in weights:
+            postings = term_postings[token]
+            if postings is not None:
+                terms.append((self._get_bound(token) * weights[token], token, postings))
+        if not terms:
+            return []
+            
+        terms.sort(key=lambda t: t[0])
+        # Parallel per-term state, ordered by ascending upper bound
+        tokens = [token for _, token, _ in terms]
+        doc_ids = [postings.doc_ids for _, _, postings in terms]
+        tfs = [postings.tfs for _, _, postings in terms]
+        idfs = [self._get_idf(token) for token in tokens]
+        term_weights = [weights[token] for token in tokens]
+        lengths = [len(ids) for ids in doc_ids]
+        positions = [0] * len(terms)
+        
+        # cumulative_bounds[i]: upper bound of the score from terms[0..i]
+        cumulative_bounds = []
+        total = 0.0
+        for bound, _, _ in terms:
+            total += bound
+            cumulative_bounds.append(total * (1 + _UPPER_BOUND_SLACK))
+        
+        k1_plus_1 = self.k1 + 1
+        doc_len = self.doc_len
+        heap = []  # (score, -doc_idx); heap[0] is the weakest kept result
+        threshold = -1.0
+        first_essential = 0
+        num_terms = len(terms)
+        
+        while True:
+            # Next candidate: smallest current doc among essential terms
+            doc_idx = -1
+            for i in range(first_essential, num_terms):
+                pos = positions[i]
+                if pos < lengths[i]:
+                    current = doc_ids[i][pos]
+                    if doc_idx < 0 or current < doc_idx:
+                        doc_idx = current
+            if doc_idx < 0:
+                break
+                
+            if doc_idx in deleted:
+                for i in range(first_essential, num_terms):
+                    pos = positions[i]
+                    if pos < lengths[i] and doc_ids[i][pos] == doc_idx:
+                        positions[i] = pos + 1
+                continue
+                
+            norm = self.k1 * (1 - self.b + self.b * (doc_len[doc_idx] / self.avgdl))
+            contributions = {}
+            partial = 0.0
+            
+            # Essential terms positioned on this doc
+            for i in range(first_essential, num_terms):
+                pos = positions[i]
+                if pos < lengths[i] and doc_ids[i][pos] == doc_idx:
+                    freq = tfs[i][pos]
+                    contribution = idfs[i] * ((freq * k1_plus_1) / (freq + norm))
+                    contributions[tokens[i]] = contribution
+                    partial += contribution * term_weights[i]
+                    positions[i] = pos + 1
+                    
+            # Probe non-essential terms, highest bound first, while the doc can still qualify
+            pruned = False
+            for i in range(first_essential - 1, -1, -1):
+                if partial + cumulative_bounds[i] <= threshold:
+                    pruned = True
+                    break
+                pos = bisect_left(doc_ids[i], doc_idx, positions[i])
+                positions[i] = pos
+                if pos < lengths[i] and doc_ids[i][pos] == doc_idx:
+                    freq = tfs[i][pos]
+                    contribution = idfs[i] * ((freq * k1_plus_1) / (freq + norm))
+                    contributions[tokens[i]] = contribution
+                    partial += contribution * term_weights[i]
+            if pruned:
+                continue
+                
+            # Exact score, summed in query order exactly like the exhaustive path
+            score = 0.0
+            for token, weight in query_terms:
+                contribution = contributions.get(token)
+                if contribution is not None:
+                    score += contribution * weight
+                    
+            entry = (score, -doc_idx)
+            if len(heap) < top_k:
+                heapq.heappush(heap, entry)
+            elif entry > heap[0]:
+                heapq.heapreplace(heap, entry)
+            else:
+                continue
+                
+            if len(heap) == top_k:
+                threshold = heap[0][0]
+                while first_essential < num_terms and cumulative_bounds[first_essential] <= threshold:
+                    first_essential += 1
+                    
+        results = [(-neg_doc, score) for score, neg_doc in heap]
+        results.sort(key=lambda x: (-x[1], x[0]))
+        return results
+
+    def _term_score(self, idf, freq, doc_index):
+        """BM25 contribution of a single term occurring `freq` times in a document"""
+        numerator = freq * (self.k1 + 1)
+        denominator = freq + self.k1 * (1 - self.b + self.b * (self.doc_len[doc_index] / self.avgdl))
+        return idf * (numerator / denominator)
+
     def get_score_fast(self, query_tokens, doc_index):
         """
         Calculates BM25 score using pre-tokenized query for speed.
         """
-        if doc_index >= len(self.doc_len):
+        if doc_index >= len(self.doc_len) or doc_index in self.deleted:
+            return 0.0
+            
+        segment = self._segment_for(self.segments, doc_index)
+        if segment is None:
             return 0.0
             
         score = 0.0
-        doc_len = self.doc_len[doc_index]
-        
-        # Get pre-computed term frequencies for this doc
-        doc_terms = self.doc_term_freqs[doc_index]
         
         for token in query_tokens:
-            if token not in self.doc_freqs:
+            postings = segment.postings.get(token)
+            if postings is None:
                 continue
                 
-            freq = doc_terms.get(token, 0)
-            idf = self.idf.get(token, 0)
-            
-            # BM25 formula component for this term
-            numerator = freq * (self.k1 + 1)
-            denominator = freq + self.k1 * (1 - self.b + self.b * (doc_len / self.avgdl))
-            
-            score += idf * (numerator / denominator)
+            # Term frequency for this doc, read from the postings
+            freq = postings.tf(doc_index)
+            if freq:
+                score += self._term_score(self._get_idf(token), freq, doc_index)
             
         return score
 
@@ -134,21 +885,58 @@ class BM25Ranker:
         """
         return self.get_score_fast(self.tokenize(query), doc_index)
         
-    def save(self, filepath):
-        """Saves the ranker to a file"""
+    def _statistics_complete(self):
+        """True when IDF and exact score bounds are present for every term"""
+        return len(self.max_scores) == len(self.inverted_index) and len(self.idf) >= len(self.doc_freqs)
+
+    def save(self, filepath, checksum=None):
+        """
+        Saves the ranker to a binary index file (see index_file.py).
+        checksum: Corpus checksum stored in the header for staleness checks
+        """
+        if checksum is not None:
+            self.checksum = checksum
         try:
-            with open(filepath, 'wb') as f:
-                pickle.dump(self, f)
+            with self._lock:
+                if self.deleted or len(self.segments) > 1 or not self._statistics_complete():
+                    self.compact()
+                index_file.write_index(filepath, self, self.checksum)
             print(f"Ranker saved to {filepath}")
         except Exception as e:
             print(f"Error saving ranker: {e}")
             
     @staticmethod
-    def load(filepath):
-        """Loads the ranker from a file"""
+    def load(filepath, checksum=None, analyzer=None):
+        """
+        Loads the ranker from a binary index file. Tables are memory-mapped and
+        read lazily, so loading is near-instant regardless of corpus size.
+        Returns None if the file is missing, invalid, from another format
+        version, or (when `checksum` is given) built from a different corpus.
+        analyzer: The analyzer the index was built with
+        """
         try:
-            with open(filepath, 'rb') as f:
-                return pickle.load(f)
+            mapped = index_file.open_index(filepath)
         except Exception as e:
             print(f"Error loading ranker: {e}")
             return None
+            
+        if checksum is not None and mapped['checksum'] != index_file.pad_checksum(checksum):
+            print("Persisted index checksum does not match corpus")
+            return None
+            
+        ranker = BM25Ranker(k1=mapped['k1'], b=mapped['b'], analyzer=analyzer)
+        ranker.checksum = mapped['checksum']
+        ranker.corpus_size = mapped['corpus_size']
+        ranker.total_length = mapped['total_length']
+        ranker.avgdl = mapped['avgdl']
+        ranker.doc_len = mapped['doc_len']
+        ranker.title_len = mapped['title_len']
+        ranker.doc_freqs = mapped['doc_freqs']
+        ranker.idf = mapped['idf']
+        ranker.max_scores = mapped['max_scores']
+        ranker.segments = (Segment(mapped['inverted_index'], 0, mapped['num_docs'], mapped['corpus_size'],
+                                   mapped['url_postings']),)
+        ranker.url_index = None  # Built from the mapped URLs on first use
+        ranker._mapped_urls = mapped['urls']
+        ranker._mapping = mapped['mmap']
+        return ranker
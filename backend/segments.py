@@ -0,0 +1,170 @@
+"""
+Segments Module for ProXplore
+Immutable index segments, a tiered merge policy and segment merging
+
+A segment holds the postings of a contiguous range of doc indices. Segments
+are never modified once published: new documents go into new segments and
+merges replace a run of adjacent segments with a single larger one, so
+readers can search a snapshot of the segment list without locking.
+"""
+
+import math
+from array import array
+from collections.abc import Mapping
+from postings import Postings, POSTING_TYPECODE
+
+
+class Segment:
+    """
+    Immutable postings for doc indices in [doc_start, doc_end).
+    postings: Mapping of token -> Postings over title + content (scored by BM25)
+    url_postings: Mapping of token -> Postings over URL tokens (positions only, not scored)
+    num_docs: Documents physically present (purged deletes excluded)
+    """
+    __slots__ = ('postings', 'doc_start', 'doc_end', 'num_docs', 'url_postings')
+
+    def __init__(self, postings, doc_start, doc_end, num_docs=None, url_postings=None):
+        self.postings = postings
+        self.doc_start = doc_start
+        self.doc_end = doc_end
+        self.num_docs = doc_end - doc_start if num_docs is None else num_docs
+        self.url_postings = url_postings if url_postings is not None else {}
+
+    def __repr__(self):
+        return f"Segment(docs={self.doc_start}-{self.doc_end}, live={self.num_docs}, terms={len(self.postings)})"
+
+
+def concat_postings(parts):
+    """
+    Concatenates posting lists of consecutive segments into one Postings
+    (doc ids and term frequencies only; positions are read per segment)
+    """
+    if len(parts) == 1:
+        return parts[0]
+    doc_ids = array(POSTING_TYPECODE)
+    tfs = array(POSTING_TYPECODE)
+    for part in parts:
+        doc_ids.frombytes(part.doc_ids.tobytes())
+        tfs.frombytes(part.tfs.tobytes())
+    return Postings(doc_ids, tfs)
+
+
+def _merge_tables(tables, purged, compress):
+    """Merges token -> Postings tables of adjacent segments, keeping positions"""
+    tokens = {}
+    for table in tables:
+        for token in table:
+            tokens.setdefault(token, []).append(table[token])
+
+    merged_table = {}
+    for token, parts in tokens.items():
+        if not purged and len(parts) == 1 and isinstance(parts[0], Postings):
+            merged = parts[0]
+        else:
+            merged = Postings()
+            for part in parts:
+                for doc_idx, freq, positions in part.items_with_positions():
+                    if doc_idx not in purged:
+                        merged.append(doc_idx, freq, positions)
+        if merged:
+            merged_table[token] = merged.compress() if compress else merged
+    return merged_table
+
+
+def merge_segments(segments, deleted, compress=False):
+    """
+    Merges adjacent segments into one, dropping postings of deleted documents
+
+    Args:
+        segments (list): Adjacent segments in doc order
+        deleted (set): Tombstoned doc indices to purge
+        compress (bool): Store the merged postings compressed
+
+    Returns:
+        Segment: The merged segment
+    """
+    doc_start = segments[0].doc_start
+    doc_end = segments[-1].doc_end
+    purged = {doc_idx for doc_idx in deleted if doc_start <= doc_idx < doc_end}
+
+    postings = _merge_tables([segment.postings for segment in segments], purged, compress)
+    url_postings = _merge_tables([segment.url_postings for segment in segments], purged, False)
+
+    num_docs = sum(segment.num_docs for segment in segments)
+    num_docs -= sum(1 for segment in segments for doc_idx in purged
+                    if segment.doc_start <= doc_idx < segment.doc_end)
+    return Segment(postings, doc_start, doc_end, num_docs, url_postings)
+
+
+class SegmentedIndexView(Mapping):
+    """Read-only token -> Postings view across a snapshot of segments"""
+
+    def __init__(self, segments):
+        self.segments = segments
+
+    def __getitem__(self, token):
+        parts = [segment.postings[token] for segment in self.segments if token in segment.postings]
+        if not parts:
+            raise KeyError(token)
+        return concat_postings(parts)
+
+    def get(self, token, default=None):
+        try:
+            return self[token]
+        except KeyError:
+            return default
+
+    def __contains__(self, token):
+        return any(token in segment.postings for segment in self.segments)
+
+    def __iter__(self):
+        if len(self.segments) == 1:
+            return iter(self.segments[0].postings)
+        seen = {}
+        for segment in self.segments:
+            seen.update(dict.fromkeys(segment.postings))
+        return iter(seen)
+
+    def __len__(self):
+        if len(self.segments) == 1:
+            return len(self.segments[0].postings)
+        return sum(1 for _ in self)
+
+
+class TieredMergePolicy:
+    """
+    Picks adjacent segments of similar size to merge.
+
+    Segments are grouped into tiers by size (tier = floor(log_{segments_per_tier}(docs))).
+    A run of `segments_per_tier` adjacent segments in the same tier is merged into
+    one segment of the next tier. Segments over `max_merge_docs` are never merged
+    again, which bounds the I/O of any single merge; they are only rewritten on
+    their own once their share of deleted documents passes `expunge_ratio`.
+    """
+
+    def __init__(self, segments_per_tier=4, max_merge_docs=100000, expunge_ratio=0.2):
+        self.segments_per_tier = segments_per_tier
+        self.max_merge_docs = max_merge_docs
+        self.expunge_ratio = expunge_ratio
+
+    def tier(self, segment):
+        return int(math.log(max(segment.num_docs, 1), self.segments_per_tier))
+
+    def find_merge(self, segments, deleted):
+        """
+        Returns (start, end) slice bounds of the segments to merge, or None
+        """
+        width = self.segments_per_tier
+        for start in range(len(segments) - width + 1):
+            run = segments[start:start + width]
+            tier = self.tier(run[0])
+            if all(self.tier(s) == tier for s in run) and \
+                    sum(s.num_docs for s in run) <= self.max_merge_docs:
+                return start, start + width
+
+        if deleted:
+            for i, segment in enumerate(segments):
+                dead = sum(1 for doc_idx in deleted if segment.doc_start <= doc_idx < segment.doc_end)
+                if dead and dead > self.expunge_ratio * segment.num_docs:
+                    return i, i + 1
+        return None
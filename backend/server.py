@@ -5,75 +5,163 @@ Provides search API with ranking and CORS support
 
 import json
 import os
+import threading
+from collections import Counter
 from flask import Flask, request, jsonify, render_template
 from flask_cors import CORS
+from analysis import Analyzer
 from ranking import BM25Ranker
 from query_processor import QueryProcessor
+from database import file_checksum
+from cache import ResultCache
+from docstore import DocumentStore
+from delta_log import DeltaLogReader, latest_changes
+from snippets import make_snippet
 
 app = Flask(__name__)
 CORS(app)  # Enable CORS for mobile app
 
-# In-memory database
-memory_db = []
-ranker = BM25Ranker()
-processor = QueryProcessor()
+# Index builds over this many documents tokenize in a process pool
+PARALLEL_BUILD_MIN_DOCS = 5000
+BUILD_WORKERS = os.cpu_count() or 1
+
+# BM25 scoring engine: vectorized NumPy when installed, pure Python otherwise
+SCORING_ENGINE = 'auto'
+
+# BM25 candidates reranked per query
+CANDIDATES = 200
+
+# Most queries accepted by one /search/batch request
+MAX_BATCH_QUERIES = 100
+
+# Query terms within this many words of each other get a proximity boost
+PROXIMITY_WINDOW = 5
+
+# Query result caches (LRU, bounded by entries, memory and age)
+SEARCH_CACHE_ENTRIES = 2048
+SEARCH_CACHE_BYTES = 64 * 1024 * 1024
+SUGGEST_CACHE_ENTRIES = 4096
+SUGGEST_CACHE_BYTES = 8 * 1024 * 1024
+CACHE_TTL = 300  # seconds
+
+# Crawl pipeline: the changes a running crawler appends to its delta log are
+# indexed every FOLLOW_INTERVAL seconds, so new pages are searchable while
+# the crawl is still going
+FOLLOW_CRAWL = True
+FOLLOW_INTERVAL = 1.0  # seconds
+DELTA_FILE = 'index_delta.ndjson'
+
+# Document store: zlib-compress blocks of records (smaller file, each
+# result read decompresses its block)
+DOCSTORE_COMPRESSION = False
+
+# Text analysis shared by indexing and querying (e.g. Analyzer(stopwords=...) to
+# drop stopwords; persisted indexes and docs.bin must be rebuilt after changing it)
+analyzer = Analyzer()
+
+# Documents by ranker doc index (None for deleted ones), memory-mapped from
+# docs.bin; fields are only decoded for the results a query returns
+memory_db = DocumentStore()
+ranker = BM25Ranker(engine=SCORING_ENGINE, analyzer=analyzer)
+processor = QueryProcessor(analyzer=analyzer)
+
+search_cache = ResultCache(SEARCH_CACHE_ENTRIES, SEARCH_CACHE_BYTES, CACHE_TTL)
+suggest_cache = ResultCache(SUGGEST_CACHE_ENTRIES, SUGGEST_CACHE_BYTES, CACHE_TTL)
+load_generation = 0  # Bumped on every (re)load of the index
+
+
+def index_generation():
+    """Identifies the current index contents; cached results from other generations are stale"""
+    return (load_generation, ranker.generation)
+
+
+def normalize_query(query):
+    """Cache key for a query: lowercased with whitespace collapsed"""
+    return " ".join(query.lower().split())
+
+
+def read_documents(index_path):
+    """
+    Parses index.json
+    
+    Returns:
+        list: Documents with 'url', 'title' and 'content', in file order
+    """
+    docs = []
+    with open(index_path, 'r', encoding='utf-8') as f:
+        for line_num, line in enumerate(f, 1):
+            line = line.strip()
+            if line:
+                try:
+                    item = json.loads(line)
+                    if 'url' in item and 'title' in item and 'content' in item:
+                        docs.append(item)
+                except json.JSONDecodeError as e:
+                    print(f"Warning: Invalid JSON on line {line_num}: {e}")
+    return docs
 
 
 def load_index():
-    """Loads index.json into memory and initializes ranker"""
-    global memory_db
+    """Maps the document store of index.json and initializes ranker"""
+    global memory_db, load_generation, ranker, processor
     
     # Get the directory where server.py is located
     base_dir = os.path.dirname(os.path.abspath(__file__))
     index_path = os.path.join(base_dir, 'index.json')
-    ranker_path = os.path.join(base_dir, 'bm25_index.pkl')
+    docs_path = os.path.join(base_dir, 'docs.bin')
+    ranker_path = os.path.join(base_dir, 'bm25_index.bin')
+    processor_path = os.path.join(base_dir, 'query_index.bin')
     
     if not os.path.exists(index_path):
         print(f"ERROR: index.json not found at {index_path}. Run crawler.py first!")
         return
     
-    print(f"Loading {index_path} into RAM...")
+    print(f"Loading {index_path}...")
     
     try:
-        # 1. Load Documents
-        with open(index_path, 'r', encoding='utf-8') as f:
-            memory_db = []
-            for line_num, line in enumerate(f, 1):
-                line = line.strip()
-                if line:
-                    try:
-                        item = json.loads(line)
-                        if 'url' in item and 'title' in item and 'content' in item:
-                            item['score'] = 0  # Initialize score
-                            memory_db.append(item)
-                    except json.JSONDecodeError as e:
-                        print(f"Warning: Invalid JSON on line {line_num}: {e}")
-        
-        print(f"✓ Loaded {len(memory_db)} items into memory")
+        # 1. Map the document store. index.json is only parsed to (re)write
+        #    the store when it changed since the store was written
+        checksum = file_checksum(index_path)
+        store = DocumentStore.open(docs_path, checksum) if os.path.exists(docs_path) else None
+        docs = None
+        if store is None:
+            docs = read_documents(index_path)
+            if docs:
+                DocumentStore.write(docs_path, docs, checksum, DOCSTORE_COMPRESSION, analyzer=analyzer)
+                store = DocumentStore.open(docs_path, checksum)
+            if store is None:
+                store = DocumentStore(docs)  # Serve from memory if the store cannot be written
+        memory_db = store
+        
+        print(f"✓ Loaded {len(memory_db)} documents")
         
         if not memory_db:
             return
 
-        # 2. Load or Train Ranker
-        ranker_loaded = False
-        if os.path.exists(ranker_path):
-            print(f"Found persisted index at {ranker_path}, loading...")
-            loaded_ranker = BM25Ranker.load(ranker_path)
-            if loaded_ranker and loaded_ranker.corpus_size == len(memory_db):
-                global ranker
-                ranker = loaded_ranker
-                ranker_loaded = True
-                print("✓ Successfully loaded persisted index")
-            else:
-                print("Persisted index stale or invalid. Rebuilding...")
-        
-        if not ranker_loaded:
+        workers = BUILD_WORKERS if len(memory_db) >= PARALLEL_BUILD_MIN_DOCS else 1
+        
+        # 2. Load the persisted ranker and query processor, or rebuild both
+        #    (stale if index.json changed since the build)
+        loaded = load_persisted(ranker_path, processor_path, checksum, len(memory_db))
+        
+        if loaded:
+            ranker, processor = loaded
+        else:
             print("Building Inverted Index (this may take a while)...")
-            ranker.fit(memory_db)
-            ranker.save(ranker_path)
+            if docs is None:
+                docs = read_documents(index_path)
+            # One analysis pass feeds the postings and the query vocabulary
+            vocab = Counter()
+            ranker = BM25Ranker(engine=SCORING_ENGINE, analyzer=analyzer)
+            ranker.fit(docs, workers=workers, vocab=vocab)
+            
+            # 3. Train Query Processor (fast) from the collected vocabulary
+            processor = QueryProcessor(analyzer=analyzer)
+            processor.fit(docs, vocab=vocab)
             
-        # 3. Train Query Processor (fast)
-        processor.fit(memory_db)
+            ranker.save(ranker_path, checksum=checksum)
+            processor.save(processor_path, checksum=checksum)
+        load_generation += 1
         
     except Exception as e:
         print(f"Error loading index: {e}")
@@ -81,12 +169,121 @@ def load_index():
         traceback.print_exc()
 
 
-def search_index(query):
+def load_persisted(ranker_path, processor_path, checksum, num_docs):
+    """
+    Loads the persisted ranker and query processor together. Both must have
+    been built from the corpus with `checksum`, so a restart with an unchanged
+    index.json does no tokenization at all.
+    
+    Returns:
+        tuple: (BM25Ranker, QueryProcessor), or None if either is missing or stale
+    """
+    if not (os.path.exists(ranker_path) and os.path.exists(processor_path)):
+        return None
+        
+    print(f"Found persisted index at {ranker_path}, loading...")
+    loaded_ranker = BM25Ranker.load(ranker_path, checksum=checksum, analyzer=analyzer)
+    loaded_processor = None
+    if loaded_ranker:
+        loaded_processor = QueryProcessor.load(processor_path, checksum=checksum, analyzer=analyzer)
+    if loaded_processor is None or len(loaded_ranker.doc_len) != num_docs:
+        print("Persisted index stale or invalid. Rebuilding...")
+        return None
+        
+    loaded_ranker.engine = SCORING_ENGINE
+    print("✓ Successfully loaded persisted index")
+    return loaded_ranker, loaded_processor
+
+
+def apply_delta(records):
+    """
+    Applies crawler delta records (see delta_log.py) to the live index. Added
+    and updated documents are indexed together as one new segment; replaced
+    and deleted ones are tombstoned. Records repeating the current version of
+    a document (e.g. a log read again after a restart) change nothing, so
+    records that failed to apply can simply be applied again.
+    
+    Args:
+        records (list): Delta records in log order
+        
+    Returns:
+        int: Documents added, updated or deleted
+    """
+    added = []
+    changed = 0
+    for url, record in latest_changes(records).items():
+        doc_idx = ranker.doc_index(url)
+        current = memory_db[doc_idx] if doc_idx is not None else None
+        if record['op'] == 'delete':
+            if current is None:
+                continue
+        elif current is not None and (current['title'], current['content']) == (record['title'], record['content']):
+            continue
+        changed += 1
+        if current is not None:
+            ranker.delete_document(url, current)
+            memory_db.delete(doc_idx)
+        if record['op'] != 'delete':
+            added.append({'title': record['title'], 'url': url, 'content': record['content']})
+            
+    if added:
+        # Indexed before they are stored: a failed add leaves the store as it
+        # was (searches skip doc indices the store does not have yet)
+        vocab = Counter()
+        doc_indices = ranker.add_documents(added, vocab=vocab)
+        if doc_indices[0] != len(memory_db):
+            raise RuntimeError(f"Ranker doc index {doc_indices[0]} does not match "
+                               f"document store size {len(memory_db)}")
+        memory_db.extend(added)
+        processor.add_words(vocab)
+    return changed
+
+
+def follow_crawl(delta_path, interval=FOLLOW_INTERVAL, stop=None):
+    """
+    Indexes the changes appended to the crawler's delta log every `interval`
+    seconds until `stop` is set. The log of the current (or last) crawl is
+    read from its start, on top of the loaded snapshot.
+    """
+    reader = DeltaLogReader(delta_path)
+    stop = stop or threading.Event()
+    while True:
+        try:
+            records = reader.read()
+            if records:
+                changed = apply_delta(records)
+                if changed:
+                    print(f"✓ Indexed {changed} changed pages from the crawl ({ranker.corpus_size} pages)")
+        except Exception as e:
+            # Applied again at the next poll (records already applied change nothing)
+            reader.rewind()
+            print(f"Error indexing crawl changes (will retry): {e}")
+        if stop.wait(interval):
+            return
+
+
+def start_following(interval=FOLLOW_INTERVAL):
+    """
+    Starts a daemon thread following the crawler's delta log
+    
+    Returns:
+        threading.Event: Set it to stop following
+    """
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    stop = threading.Event()
+    thread = threading.Thread(target=follow_crawl, args=(os.path.join(base_dir, DELTA_FILE), interval, stop),
+                              name="crawl-follower", daemon=True)
+    thread.start()
+    return stop
+
+
+def search_index(query, phrase=None):
     """
     Searches the in-memory index using Inverted Index + BM25
     
     Args:
         query (str): Search query
+        phrase (str): Text matched as a phrase for the boosts (default: the query)
         
     Returns:
         list: List of matching results with scores
@@ -94,56 +291,72 @@ def search_index(query):
     if not query or len(query.strip()) == 0:
         return []
     
-    query_lower = query.lower().strip()
-    
     # 1. Retrieve Candidates using Inverted Index (Fast)
     # Get top 200 candidates by BM25 score
-    candidates = ranker.search(query, top_k=200)
+    candidates = ranker.search(query, top_k=CANDIDATES)
     
-    results = []
+    return rerank(candidates, phrase if phrase is not None else query)
+
+
+def rerank(candidates, phrase, terms=None):
+    """
+    Applies the phrase, proximity and domain boosts to BM25 candidates
+    
+    Args:
+        candidates (list): (doc_index, bm25_score) tuples
+        phrase (str): Text matched as a phrase for the boosts
+        terms (dict): Weighted query terms the snippets are chosen for
+                      (default: the phrase tokens)
+        
+    Returns:
+        list: Top 20 results, best first
+    """
+    phrase_tokens = ranker.tokenize(phrase)
+    scored = []
     
-    # 2. Re-rank/Boost Candidates
+    # 2. Re-rank/Boost Candidates (only the URL of each candidate is read)
     for doc_idx, bm25_score in candidates:
         if doc_idx >= len(memory_db):
             continue
             
         item = memory_db[doc_idx]
+        if item is None:  # Deleted while the query ran
+            continue
         
         final_score = bm25_score
         
-        title_lower = item['title'].lower()
-        url_lower = item['url'].lower()
-        content_lower = item['content'].lower()
-        
-        # Boosts
+        # Boosts, computed from the term positions in the index
         # Exact phrase match in title/content is still valuable
-        is_substring_match = query_lower in title_lower or query_lower in content_lower
+        in_title = ranker.phrase_match(phrase_tokens, doc_idx, 'title')
         
-        if is_substring_match:
+        if in_title or ranker.phrase_match(phrase_tokens, doc_idx, 'content'):
             final_score += 5.0  # Boost for phrase match
+        elif len(phrase_tokens) > 1 and ranker.proximity_match(phrase_tokens, doc_idx, PROXIMITY_WINDOW):
+            final_score += 2.0  # Query terms close together
             
-        if query_lower in title_lower:
+        if in_title:
             final_score += 10.0 # Extra boost if in title
             
-        if query_lower in url_lower:
+        if ranker.phrase_match(phrase_tokens, doc_idx, 'url'):
             final_score += 3.0
             
         # Super boost for proxentix/proxpl domains
+        url_lower = item['url'].lower()
         if 'proxentix' in url_lower or 'proxpl' in url_lower:
             final_score += 1000
             
-        results.append({
-            'title': item['title'],
-            'url': item['url'],
-            'score': final_score,
-            'snippet': item['content'][:200]
-        })
+        scored.append((final_score, doc_idx, item))
     
     # Sort by score (descending)
-    results.sort(key=lambda x: x['score'], reverse=True)
+    scored.sort(key=lambda entry: entry[0], reverse=True)
     
-    # Limit to top 20 results
-    return results[:20]
+    # Limit to top 20 results; only their titles and snippet sentences are decoded
+    return [{
+        'title': item['title'],
+        'url': item['url'],
+        'score': final_score,
+        'snippet': make_snippet(item, doc_idx, ranker, terms if terms is not None else phrase_tokens)
+    } for final_score, doc_idx, item in scored[:20]]
 
 
 @app.route('/')
@@ -157,9 +370,14 @@ def health():
     """Health check endpoint"""
     return jsonify({
         'status': 'healthy',
-        'indexed_pages': len(memory_db),
-        'vocabulrry_size': len(ranker.idf),
-        'index_status': 'loaded' if len(memory_db) > 0 else 'empty_or_missing'
+        'indexed_pages': ranker.corpus_size,
+        'vocabulrry_size': len(ranker.doc_freqs),
+        'index_status': 'loaded' if ranker.corpus_size > 0 else 'empty_or_missing',
+        'cache': {
+            'search': search_cache.stats(),
+            'suggest': suggest_cache.stats(),
+            'corrections': processor.correction_cache.stats()
+        }
     })
 
 
@@ -173,7 +391,12 @@ def suggest():
     if not prefix:
         return jsonify([])
         
-    suggestions = processor.get_suggestions(prefix)
+    key = prefix.lower().strip()
+    generation = index_generation()
+    suggestions = suggest_cache.get(key, generation)
+    if suggestions is None:
+        suggestions = processor.get_suggestions(prefix)
+        suggest_cache.put(key, suggestions, generation)
     return jsonify(suggestions)
 
 
@@ -193,45 +416,130 @@ def search():
     
     print(f"Searching for: {query}")
     
-    # Process Query (Spell check & Expansion)
-    processed = processor.process_query(query)
+    # Results depend only on the normalized query and the index contents;
+    # the generation is read first so a concurrent update can only make the entry stale
+    key = normalize_query(query)
+    generation = index_generation()
+    cached = search_cache.get(key, generation)
+    if cached is None:
+        cached = run_search(query)
+        search_cache.put(key, cached, generation)
+        
+    response = {'query': query}
+    response.update(cached)
+    return jsonify(response)
+
+
+@app.route('/search/batch', methods=['POST'])
+def search_batch():
+    """
+    Batch search endpoint
+    JSON body: {"queries": ["query 1", "query 2", ...]} (or a bare list)
+    Returns one result set per query, in order, each shaped like /search
+    """
+    payload = request.get_json(silent=True)
+    queries = payload.get('queries') if isinstance(payload, dict) else payload
     
-    # Use the expanded query for better recall
-    search_query = processed['expanded']
-    if not search_query.strip():
-        search_query = query # Fallback
+    if not isinstance(queries, list) or not all(isinstance(q, str) for q in queries):
+        return jsonify({
+            'error': 'Expected a JSON list of query strings',
+            'usage': 'POST /search/batch {"queries": ["python", "java"]}'
+        }), 400
+    if len(queries) > MAX_BATCH_QUERIES:
+        return jsonify({'error': f'At most {MAX_BATCH_QUERIES} queries per batch'}), 400
+        
+    print(f"Batch search: {len(queries)} queries")
+    
+    generation = index_generation()
+    keys = [normalize_query(q) for q in queries]
+    found = {}
+    pending = []
+    for query, key in zip(queries, keys):
+        if not key or key in found:
+            continue
+        cached = search_cache.get(key, generation)
+        if cached is None:
+            pending.append(query)
+            found[key] = None
+        else:
+            found[key] = cached
+            
+    for query, result in zip(pending, run_searches(pending)):
+        key = normalize_query(query)
+        found[key] = result
+        search_cache.put(key, result, generation)
+        
+    batch = []
+    for query, key in zip(queries, keys):
+        response = {'query': query}
+        response.update(found.get(key) or {'results': [], 'total_results': 0})
+        batch.append(response)
         
-    results = search_index(search_query)
+    return jsonify({
+        'results': batch,
+        'total_queries': len(batch)
+    })
+
+
+def run_search(query):
+    """
+    Runs the search pipeline for a query: spell check and expansion into a
+    weighted query plan, then one retrieval pass and the rerank
+    
+    Returns:
+        dict: 'results', 'total_results' and (if corrected) 'did_you_mean'
+    """
+    return run_searches([query])[0]
+
+
+def run_searches(queries):
+    """
+    Runs the search pipeline for several queries. All query plans are
+    retrieved in one ranker.search_many call, so postings shared between
+    queries are read once.
+    
+    Returns:
+        list: One response dict per query (see run_search)
+    """
+    # Process Query (Spell check & Expansion)
+    plans = [processor.plan(query) for query in queries]
     
-    # If no results and correction was made, try searching strictly for correction
-    if not results and processed['was_corrected']:
-         # Try with just the corrected version
-         results = search_index(processed['corrected'])
-         
-    # Fallback: If still no results, try original query (in case correction was wrong)
-    if not results and processed['was_corrected']:
-        results = search_index(query)
+    # Corrected terms, synonyms and the original spellings are weighted and
+    # searched together, so a bad correction needs no second pass
+    candidate_lists = ranker.search_many([plan.terms for plan in plans], top_k=CANDIDATES)
+    return [finish_search(plan, candidates) for plan, candidates in zip(plans, candidate_lists)]
+
+
+def finish_search(plan, candidates):
+    """Reranks the candidates of a query plan into a response"""
+    # Phrase boosts use the corrected query (expansion terms are not a phrase);
+    # snippets show any of the weighted terms
+    results = rerank(candidates, plan.corrected, plan.terms)
     
     response = {
-        'query': query,
         'results': results,
         'total_results': len(results)
     }
     
     # Add correction info if applicable
-    if processed['was_corrected']:
-        response['did_you_mean'] = processed['corrected']
+    if plan.was_corrected:
+        response['did_you_mean'] = plan.corrected
         
-    return jsonify(response)
+    return response
 
 
 def main():
     """Main server function"""
     # Load index into memory
     load_index()
+    if FOLLOW_CRAWL:
+        start_following()
     
     if len(memory_db) == 0:
-        print("\n⚠️  WARNING: No data loaded. Run crawler.py first!\n")
+        if FOLLOW_CRAWL:
+            print(f"\n⚠️  WARNING: No data loaded. Pages are indexed as crawler.py writes {DELTA_FILE}\n")
+        else:
+            print("\n⚠️  WARNING: No data loaded. Run crawler.py first!\n")
     
     # Start server
     port = 8080
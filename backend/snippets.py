@@ -0,0 +1,205 @@
+"""
+Snippets Module for ProXplore
+Query-aware result snippets from stored sentence boundaries
+
+Document content is split into sentences (runs of text without sentence
+punctuation into pieces of at most MAX_SENTENCE_CHARS), and the document store
+keeps the byte and token offset at which every sentence starts. A snippet is
+the run of consecutive sentences, spanning at most SNIPPET_LENGTH bytes of
+UTF-8 text, that covers the most query terms. Term positions come from the
+index postings, so only the chosen sentences are read and decoded.
+"""
+
+import re
+from array import array
+from bisect import bisect_right
+
+# UTF-8 bytes the sentences of a result snippet span at most (a longer
+# single sentence is cut to as many characters)
+SNIPPET_LENGTH = 200
+
+# Text without sentence punctuation is cut into sentences of at most this many characters
+MAX_SENTENCE_CHARS = 120
+
+# Sentence ends: terminal punctuation followed by whitespace
+SENTENCE_END = re.compile(r'(?<=[.!?])\s+')
+
+# Marks text cut before or after the snippet
+ELLIPSIS = '...'
+
+
+def _split_long(text, start, end, max_chars):
+    """Starts of the pieces of text[start:end], cut at spaces every `max_chars` characters"""
+    starts = [start]
+    while end - start > max_chars:
+        cut = text.rfind(' ', start + 1, start + max_chars + 1)
+        if cut < 0:
+            cut = text.find(' ', start + max_chars, end)  # A very long word
+            if cut < 0:
+                break
+        start = cut + 1
+        starts.append(start)
+    return starts
+
+
+def split_sentences(text, max_chars=MAX_SENTENCE_CHARS):
+    """
+    Character offsets at which the sentences of `text` start. The whitespace
+    after a sentence belongs to it, so the sentences cover the whole text.
+
+    Returns:
+        list: Ascending offsets, starting with 0 (empty for empty text)
+    """
+    if not text:
+        return []
+    starts = []
+    start = 0
+    for match in SENTENCE_END.finditer(text):
+        starts.extend(_split_long(text, start, match.start(), max_chars))
+        start = match.end()
+    if start < len(text):
+        starts.extend(_split_long(text, start, len(text), max_chars))
+    return starts
+
+
+def sentence_table(text, analyzer, max_chars=MAX_SENTENCE_CHARS):
+    """
+    Sentence boundaries of a document's content
+
+    Args:
+        text (str): Content
+        analyzer (Analyzer): Analyzer the content is indexed with
+
+    Returns:
+        tuple: (char starts, byte starts in the UTF-8 text, token starts),
+               one entry per sentence
+    """
+    char_starts = split_sentences(text, max_chars)
+    byte_starts = array('I')
+    token_starts = array('I')
+    byte_offset = 0
+    token_offset = 0
+    for i, start in enumerate(char_starts):
+        sentence = text[start:char_starts[i + 1] if i + 1 < len(char_starts) else len(text)]
+        byte_starts.append(byte_offset)
+        token_starts.append(token_offset)
+        byte_offset += len(sentence.encode('utf-8'))
+        token_offset += len(analyzer.tokenize(sentence))
+    return char_starts, byte_starts, token_starts
+
+
+def best_window(starts, size, token_starts, hits, length=SNIPPET_LENGTH):
+    """
+    Picks the run of consecutive sentences (at most `length` long, or a single
+    sentence) with the highest total weight of distinct terms, then the most
+    term occurrences; the earliest such run wins
+
+    Args:
+        starts (sequence): Sentence start offsets
+        size (int): Text size, in the unit of `starts`
+        token_starts (sequence): Token offset of every sentence
+        hits (list): (content token position, term, weight) tuples
+        length (int): Maximum run size, in the unit of `starts`
+
+    Returns:
+        tuple: (first sentence, end sentence), or None for text without sentences
+    """
+    count = len(starts)
+    if not count:
+        return None
+
+    def sentence_end(sentence):
+        return starts[sentence + 1] if sentence + 1 < count else size
+
+    def window_end(first):
+        end = first + 1
+        while end < count and sentence_end(end) - starts[first] <= length:
+            end += 1
+        return end
+
+    sentence_hits = {}
+    for position, term, weight in hits:
+        sentence = bisect_right(token_starts, position) - 1
+        sentence_hits.setdefault(max(sentence, 0), []).append((term, weight))
+
+    # Without hits, the lead of the document
+    best_key = None
+    best = (0, window_end(0))
+    for first in sorted(sentence_hits):
+        end = window_end(first)
+        weights = {}
+        occurrences = 0
+        for sentence in range(first, end):
+            for term, weight in sentence_hits.get(sentence, ()):
+                weights[term] = weight
+                occurrences += 1
+        key = (sum(weights.values()), occurrences)
+        if best_key is None or key > best_key:
+            best_key, best = key, (first, end)
+    return best
+
+
+def trim_snippet(text, cut_before, cut_after, length=SNIPPET_LENGTH):
+    """
+    Formats window text as a snippet of at most `length` characters (plus
+    ellipses), cut at a word boundary
+
+    Args:
+        text (str): Window text
+        cut_before (bool): Text precedes the window
+        cut_after (bool): Text follows the window
+    """
+    text = text.strip()
+    if len(text) > length:
+        cut = text.rfind(' ', 0, length + 1)
+        text = text[:cut if cut > 0 else length].rstrip()
+        cut_after = True
+    if cut_before:
+        text = ELLIPSIS + text
+    if cut_after:
+        text += ELLIPSIS
+    return text
+
+
+def make_snippet(doc, doc_idx, ranker, terms, length=SNIPPET_LENGTH):
+    """
+    Query-aware snippet of an indexed document
+
+    Stored documents (see docstore.StoredDocument) supply their sentence table,
+    and only the bytes of the chosen window are decoded; documents held in
+    memory as dicts are split on the fly. Windows are measured in UTF-8 bytes
+    either way, so both give the same snippet.
+
+    Args:
+        doc: Document (StoredDocument or dict)
+        doc_idx (int): Doc index of `doc` in `ranker`
+        ranker (BM25Ranker): Index the term positions are read from
+        terms (dict or iterable): Query terms (analyzed), optionally with weights
+        length (int): Snippet length (see SNIPPET_LENGTH)
+
+    Returns:
+        str: Snippet
+    """
+    if not isinstance(terms, dict):
+        terms = dict.fromkeys(terms, 1.0)
+    title_len = ranker.title_len[doc_idx] if doc_idx < len(ranker.title_len) else 0
+    hits = [(position - title_len, term, weight)
+            for term, weight in terms.items()
+            for position in ranker.positions(doc_idx, term, 'content')]
+
+    sentences = getattr(doc, 'sentences', None)
+    if sentences is not None:
+        starts, size, token_starts = sentences()
+        read = doc.content_range
+    else:
+        content = doc.get('content', '')
+        _, starts, token_starts = sentence_table(content, ranker.analyzer)
+        data = content.encode('utf-8')
+        size = len(data)
+        read = lambda start, end: data[start:end].decode('utf-8')
+    window = best_window(starts, size, token_starts, hits, length)
+    if window is None:
+        return ''
+    first, end = window
+    text = read(starts[first], starts[end] if end < len(starts) else size)
+    return trim_snippet(text, first > 0, end < len(starts), length)
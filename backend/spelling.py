@@ -0,0 +1,223 @@
+"""
+Spelling Module for ProXplore
+Symmetric-delete (SymSpell-style) candidate index for spelling correction
+
+Every vocabulary word is indexed under the strings obtained by deleting up to
+`max_edit_distance` characters from its first `prefix_length` characters. A
+misspelled word generates the same deletes, so every vocabulary word within
+the edit distance shares at least one delete with it and is found by a few
+dictionary lookups. Candidates are then verified with an exact edit distance.
+"""
+
+from array import array
+import index_file
+
+# Characters an edit may insert or substitute in (matches QueryProcessor.edits1)
+LETTERS = 'abcdefghijklmnopqrstuvwxyz'
+
+
+def deletes(word, max_distance):
+    """
+    All strings obtained by deleting up to `max_distance` characters from `word`
+
+    Returns:
+        set: The deletes, including `word` itself
+    """
+    found = {word}
+    frontier = [word]
+    for _ in range(max_distance):
+        following = []
+        for item in frontier:
+            for i in range(len(item)):
+                shorter = item[:i] + item[i + 1:]
+                if shorter not in found:
+                    found.add(shorter)
+                    following.append(shorter)
+        frontier = following
+    return found
+
+
+def edits1(word, letters=LETTERS):
+    """All strings one edit (delete, transpose, replace, insert) away from `word`"""
+    splits     = [(word[:i], word[i:])    for i in range(len(word) + 1)]
+    deletes    = [L + R[1:]               for L, R in splits if R]
+    transposes = [L + R[1] + R[0] + R[2:] for L, R in splits if len(R)>1]
+    replaces   = [L + c + R[1:]           for L, R in splits if R for c in letters]
+    inserts    = [L + c + R               for L, R in splits for c in letters]
+    return set(deletes + transposes + replaces + inserts)
+
+
+def _damerau_levenshtein(source, target, letters=None):
+    """
+    Unrestricted Damerau-Levenshtein distance (Lowrance-Wagner). With `letters`,
+    inserting or substituting in any other character is not allowed, which
+    makes the result an upper bound of the restricted distance.
+    """
+    big = len(source) + len(target) + 1
+    if letters is None:
+        insert_cost = [1] * len(target)
+    else:
+        insert_cost = [1 if ch in letters else big for ch in target]
+    # Cumulative insert costs, for the characters inserted between a transposed pair
+    cumulative = [0]
+    for cost in insert_cost:
+        cumulative.append(cumulative[-1] + cost)
+
+    d = [[big] * (len(target) + 2) for _ in range(len(source) + 2)]
+    for i in range(len(source) + 1):
+        d[i + 1][1] = i
+    for j in range(len(target) + 1):
+        d[1][j + 1] = cumulative[j]
+
+    last_row = {}
+    for i in range(1, len(source) + 1):
+        last_col = 0
+        for j in range(1, len(target) + 1):
+            k = last_row.get(target[j - 1], 0)
+            l = last_col
+            if source[i - 1] == target[j - 1]:
+                cost = 0
+                last_col = j
+            else:
+                cost = insert_cost[j - 1]
+            value = min(d[i][j] + cost,                      # match / substitute
+                        d[i + 1][j] + insert_cost[j - 1],    # insert target[j-1]
+                        d[i][j + 1] + 1)                     # delete source[i-1]
+            if k and l:
+                value = min(value, d[k][l] + (i - k - 1) + 1 + (cumulative[j - 1] - cumulative[l]))
+            d[i + 1][j + 1] = value
+        last_row[source[i - 1]] = i
+    return d[len(source) + 1][len(target) + 1]
+
+
+def edit_distance(source, target, max_distance, letters=LETTERS):
+    """
+    Number of edits1 steps (deletes, adjacent transpositions, and replaces or
+    inserts of a character in `letters`) needed to turn `source` into `target`
+
+    Returns:
+        int: The distance, or max_distance + 1 if it exceeds max_distance
+    """
+    too_far = max_distance + 1
+    if source == target:
+        return 0
+    if abs(len(source) - len(target)) > max_distance:
+        return too_far
+    lower = _damerau_levenshtein(source, target)
+    if lower > max_distance:
+        return too_far
+    if all(ch in letters for ch in target):
+        return lower
+    if _damerau_levenshtein(source, target, letters) == lower:
+        return lower
+
+    # Rare: other characters have to be moved rather than re-inserted
+    # (e.g. by repeated transpositions); search edit paths level by level
+    seen = {source}
+    frontier = {source}
+    for distance in range(1, max_distance + 1):
+        frontier = {edit for item in frontier for edit in edits1(item, letters)} - seen
+        if distance >= lower and target in frontier:
+            return distance
+        seen |= frontier
+    return too_far
+
+
+class SymSpellIndex:
+    """
+    Symmetric-delete index over a word -> frequency vocabulary
+    """
+
+    def __init__(self, max_edit_distance=2, prefix_length=7):
+        """
+        max_edit_distance: Largest edit distance a correction may have
+        prefix_length: Characters of each word that deletes are generated from
+                       (bounds index size; lookups stay exact)
+        """
+        self.max_edit_distance = max_edit_distance
+        self.prefix_length = prefix_length
+        self.vocab = {}
+        self.words = []
+        self.index = {}  # delete -> word id, or list of word ids sharing it
+
+    def fit(self, vocab, words=None):
+        """
+        Builds the delete index for a vocabulary
+
+        Args:
+            vocab (Mapping): word -> frequency
+            words (sequence): Word ids (default: vocab order)
+        """
+        self.vocab = vocab
+        self.words = list(vocab) if words is None else words
+        index = {}
+        for word_id, word in enumerate(self.words):
+            for key in deletes(word[:self.prefix_length], self.max_edit_distance):
+                entry = index.get(key)
+                if entry is None:
+                    index[key] = word_id
+                elif isinstance(entry, list):
+                    entry.append(word_id)
+                else:
+                    index[key] = [entry, word_id]
+        self.index = index
+
+    def candidates(self, word, max_distance=None):
+        """
+        Vocabulary words within `max_distance` edits of `word`
+
+        Returns:
+            dict: candidate -> edit distance
+        """
+        if max_distance is None:
+            max_distance = self.max_edit_distance
+        max_distance = min(max_distance, self.max_edit_distance)
+        found = {}
+        seen = set()
+        for key in deletes(word[:self.prefix_length], max_distance):
+            entry = self.index.get(key)
+            if entry is None:
+                continue
+            for word_id in ((entry,) if isinstance(entry, int) else entry):
+                if word_id in seen:
+                    continue
+                seen.add(word_id)
+                candidate = self.words[word_id]
+                distance = edit_distance(word, candidate, max_distance)
+                if distance <= max_distance:
+                    found[candidate] = distance
+        return found
+
+    def lookup(self, word, max_distance=None):
+        """
+        Best correction for `word`: the vocabulary word at the smallest edit
+        distance, most frequent first (ties by alphabetical order)
+
+        Returns:
+            str: The correction, or None if nothing is within range
+        """
+        if word in self.vocab:
+            return word
+        found = self.candidates(word, max_distance)
+        if not found:
+            return None
+        vocab = self.vocab
+        return min(found, key=lambda w: (found[w], -vocab[w], w))
+
+    def sections(self):
+        """Binary sections for index_file.write_sections (words are stored by the caller)"""
+        lists = index_file.term_lists({key: (entry,) if isinstance(entry, int) else entry
+                                       for key, entry in self.index.items()})
+        sections = {'spelling_params': array('I', [self.max_edit_distance, self.prefix_length])}
+        sections.update(('spelling_' + name, data) for name, data in lists.items())
+        return sections
+
+    @classmethod
+    def from_sections(cls, sections, vocab, words):
+        """SymSpellIndex over mapped sections; `vocab` and `words` as passed to fit"""
+        max_edit_distance, prefix_length = sections['spelling_params'].cast('I')
+        index = cls(max_edit_distance, prefix_length)
+        index.vocab = vocab
+        index.words = words
+        index.index = index_file.open_term_lists(sections, 'spelling_')
+        return index
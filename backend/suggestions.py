@@ -0,0 +1,232 @@
+"""
+Suggestions Module for ProXplore
+Prefix indexes for auto-complete over vocabulary words and title word-starts
+
+Keys are kept in a sorted array and a prefix is resolved to a contiguous key
+range by binary search. Prefixes matching more than `scan_limit` keys have
+their best completions precomputed, so a lookup never ranks more than
+`scan_limit` keys, whatever the corpus size.
+"""
+
+import heapq
+from array import array
+from bisect import bisect_left
+import index_file
+
+# Title suggestions shown ahead of word completions
+TITLE_SUGGESTIONS = 3
+
+
+def _prefix_range(keys, prefix):
+    """Bounds [lo, hi) of the keys starting with `prefix`"""
+    lo = bisect_left(keys, prefix)
+    last = ord(prefix[-1])
+    if last == 0x10FFFF:
+        hi = len(keys)
+        while hi > lo and not keys[hi - 1].startswith(prefix):
+            hi -= 1
+        return lo, hi
+    return lo, bisect_left(keys, prefix[:-1] + chr(last + 1), lo)
+
+
+class PrefixIndex:
+    """
+    Sorted (key, value id) entries. Values are ranked by `ranks[value_id]`
+    (lower is better); a value may appear under several keys.
+    """
+
+    def __init__(self, keys, values, ranks, nodes, top_n=10, scan_limit=64, max_key=48):
+        self.keys = keys
+        self.values = values
+        self.ranks = ranks
+        self.nodes = nodes  # prefix -> best value ids, for prefixes over scan_limit keys
+        self.top_n = top_n
+        self.scan_limit = scan_limit
+        self.max_key = max_key
+
+    @classmethod
+    def build(cls, entries, ranks, top_n=10, scan_limit=64, max_key=48):
+        """
+        Builds the index from (key, value id) entries
+
+        Args:
+            entries (iterable): (key, value id) pairs; keys are cut to max_key characters
+            ranks (sequence): Rank of every value id (lower is better, unique)
+        """
+        entries = sorted((key[:max_key], value) for key, value in entries)
+        keys = [key for key, _ in entries]
+        values = array('I', (value for _, value in entries))
+        ranks = array('I', ranks)
+        index = cls(keys, values, ranks, {}, top_n, scan_limit, max_key)
+
+        # Walk the implicit trie over the sorted keys, expanding only prefixes
+        # with more than scan_limit keys
+        stack = [('', 0, len(keys))]
+        while stack:
+            prefix, lo, hi = stack.pop()
+            if hi - lo <= scan_limit:
+                continue
+            if prefix:
+                index.nodes[prefix] = index._best(values[lo:hi], top_n)
+            depth = len(prefix)
+            i = lo
+            while i < hi and len(keys[i]) == depth:
+                i += 1
+            while i < hi:
+                ch = keys[i][depth]
+                j = i + 1
+                while j < hi and keys[j][depth] == ch:
+                    j += 1
+                stack.append((prefix + ch, i, j))
+                i = j
+        return index
+
+    def _best(self, values, limit):
+        """The `limit` best distinct value ids, best first"""
+        return heapq.nsmallest(limit, set(values), key=self.ranks.__getitem__)
+
+    def query(self, prefix, limit, accept=None):
+        """
+        Best value ids among the keys starting with `prefix`
+
+        Args:
+            prefix (str): Non-empty prefix
+            limit (int): Number of results
+            accept (callable): Filters value ids; required for prefixes longer
+                               than max_key, whose keys were cut short
+
+        Returns:
+            list: Up to `limit` distinct value ids, best first
+        """
+        if not prefix or limit <= 0:
+            return []
+        if len(prefix) <= self.max_key:
+            accept = None
+            if limit <= self.top_n:
+                best = self.nodes.get(prefix)
+                if best is not None:
+                    return list(best[:limit])
+        lo, hi = _prefix_range(self.keys, prefix[:self.max_key])
+        values = self.values[lo:hi]
+        if accept is not None:
+            values = [value for value in set(values) if accept(value)]
+        return self._best(values, limit)
+
+    def sections(self, name):
+        """Binary sections for index_file.write_sections, named with `name`"""
+        key_offsets, key_data = index_file._string_table(self.keys)
+        nodes = index_file.term_lists(self.nodes)
+        return {
+            name + 'params': array('I', [self.top_n, self.scan_limit, self.max_key]),
+            name + 'key_offsets': key_offsets,
+            name + 'key_data': key_data,
+            name + 'values': array('I', self.values),
+            name + 'ranks': array('I', self.ranks),
+            name + 'node_offsets': nodes['offsets'],
+            name + 'node_data': nodes['data'],
+            name + 'node_starts': nodes['starts'],
+            name + 'node_values': nodes['values'],
+        }
+
+    @classmethod
+    def from_sections(cls, sections, name):
+        """Zero-copy PrefixIndex over sections mapped by index_file.open_sections"""
+        top_n, scan_limit, max_key = sections[name + 'params'].cast('I')
+        keys = index_file.MappedStrings(sections[name + 'key_offsets'].cast('Q'), sections[name + 'key_data'])
+        return cls(keys,
+                   sections[name + 'values'].cast('I'),
+                   sections[name + 'ranks'].cast('I'),
+                   index_file.open_term_lists(sections, name + 'node_'),
+                   top_n, scan_limit, max_key)
+
+
+def title_word_starts(title):
+    """Positions in a lowercased title where a word starts (after a space)"""
+    yield 0
+    start = title.find(' ')
+    while start >= 0:
+        yield start + 1
+        start = title.find(' ', start + 1)
+
+
+class SuggestionIndex:
+    """
+    Auto-complete over document titles (matched at any word start, listed
+    alphabetically) and vocabulary words (most frequent first)
+    """
+
+    def __init__(self):
+        self.words = []
+        self.titles = []
+        self.word_index = PrefixIndex.build([], [])
+        self.title_index = PrefixIndex.build([], [])
+
+    def fit(self, vocab, titles):
+        """
+        Builds both prefix indexes
+
+        Args:
+            vocab (Counter): word -> frequency, in first-seen order
+            titles (list): Document titles (duplicates are ignored)
+        """
+        self.words = list(vocab)
+        order = sorted(range(len(self.words)), key=lambda i: -vocab[self.words[i]])
+        word_ranks = [0] * len(self.words)
+        for rank, i in enumerate(order):
+            word_ranks[i] = rank
+        self.word_index = PrefixIndex.build(((word, i) for i, word in enumerate(self.words)), word_ranks)
+
+        self.titles = sorted(set(titles))  # Title ids are alphabetical ranks
+        entries = []
+        for title_id, title in enumerate(self.titles):
+            lowered = title.lower()
+            for start in title_word_starts(lowered):
+                if start < len(lowered):
+                    entries.append((lowered[start:], title_id))
+        self.title_index = PrefixIndex.build(entries, range(len(self.titles)))
+
+    def _title_matches(self, prefix):
+        def accept(title_id):
+            title = self.titles[title_id].lower()
+            return title.startswith(prefix) or " " + prefix in title
+        return accept
+
+    def suggest(self, prefix, limit=5):
+        """
+        Completions for a lowercased, stripped prefix: up to three matching
+        titles, then the most frequent words starting with the prefix
+
+        Returns:
+            list: Up to `limit` distinct suggestions
+        """
+        if not prefix:
+            return []
+        title_ids = self.title_index.query(prefix, TITLE_SUGGESTIONS, self._title_matches(prefix))
+        suggestions = [self.titles[i] for i in title_ids]
+        word_ids = self.word_index.query(prefix, limit, lambda i: self.words[i].startswith(prefix))
+        suggestions.extend(self.words[i] for i in word_ids)
+        return list(dict.fromkeys(suggestions))[:limit]
+
+    def sections(self):
+        """Binary sections for index_file.write_sections"""
+        word_offsets, word_data = index_file._string_table(self.words)
+        title_offsets, title_data = index_file._string_table(self.titles)
+        sections = {
+            'word_offsets': word_offsets,
+            'word_data': word_data,
+            'title_offsets': title_offsets,
+            'title_data': title_data,
+        }
+        sections.update(self.word_index.sections('word_prefix_'))
+        sections.update(self.title_index.sections('title_prefix_'))
+        return sections
+
+    @classmethod
+    def from_sections(cls, sections):
+        """SuggestionIndex over mapped sections (see sections())"""
+        index = cls()
+        index.words = index_file.MappedStrings(sections['word_offsets'].cast('Q'), sections['word_data'])
+        index.titles = index_file.MappedStrings(sections['title_offsets'].cast('Q'), sections['title_data'])
+        index.word_index = PrefixIndex.from_sections(sections, 'word_prefix_')
+        index.title_index = PrefixIndex.from_sections(sections, 'title_prefix_')
+        return index
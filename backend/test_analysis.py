@@ -0,0 +1,55 @@
+import unittest
+import sys
+import os
+from collections import Counter
+
+# Add backend to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from analysis import Analyzer
+from ranking import BM25Ranker
+from query_processor import QueryProcessor
+
+
+def strip_s(token):
+    return token[:-1] if token.endswith('s') else token
+
+
+class TestAnalyzer(unittest.TestCase):
+    def setUp(self):
+        self.corpus = [
+            {'url': 'https://a.example', 'title': 'Python Tutorials', 'content': 'Learn the Python language'},
+            {'url': 'https://b.example', 'title': 'Java', 'content': 'Java tutorials and guides'},
+        ]
+
+    def test_tokenize(self):
+        analyzer = Analyzer()
+        self.assertEqual(analyzer.tokenize("Hello, World! 123"), ['hello', 'world', '123'])
+        self.assertEqual(analyzer.tokenize(''), [])
+        # Equal tokens share one interned string
+        first, second = analyzer.tokenize('Python python')
+        self.assertIs(first, second)
+
+    def test_stopwords_and_stemming(self):
+        analyzer = Analyzer(stopwords={'the', 'and'}, stemmer=strip_s)
+        self.assertEqual(analyzer.tokenize('The tutorials and guides'), ['tutorial', 'guide'])
+        ranker = BM25Ranker(analyzer=analyzer)
+        ranker.fit(self.corpus)
+        self.assertNotIn('the', ranker.inverted_index)
+        self.assertEqual([doc for doc, _ in ranker.search('tutorial')],
+                         [doc for doc, _ in ranker.search('Tutorials')])
+
+    def test_single_pass_vocabulary(self):
+        for workers in (1, 2):
+            vocab = Counter()
+            ranker = BM25Ranker()
+            ranker.fit(self.corpus, workers=workers, chunk_size=1, vocab=vocab)
+            shared = QueryProcessor()
+            shared.fit(self.corpus, vocab=vocab)
+            separate = QueryProcessor()
+            separate.fit(self.corpus)
+            self.assertEqual(list(shared.vocab.items()), list(separate.vocab.items()))
+            self.assertEqual(shared.get_suggestions('t'), separate.get_suggestions('t'))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,56 @@
+import unittest
+import sys
+import os
+import time
+
+# Add backend to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from cache import ResultCache
+from ranking import BM25Ranker
+
+
+class TestResultCache(unittest.TestCase):
+    def test_hits_and_generation_invalidation(self):
+        cache = ResultCache()
+        cache.put('python', ['a'], generation=1)
+        self.assertEqual(cache.get('python', 1), ['a'])
+        self.assertIsNone(cache.get('python', 2))
+        self.assertIsNone(cache.get('python', 1))  # Stale entry was dropped
+        stats = cache.stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['entries']), (1, 2, 0))
+
+    def test_lru_eviction_by_entries_and_bytes(self):
+        cache = ResultCache(max_entries=2)
+        cache.put('a', 1, 0)
+        cache.put('b', 2, 0)
+        cache.get('a', 0)
+        cache.put('c', 3, 0)
+        self.assertIsNone(cache.get('b', 0))
+        self.assertEqual(cache.get('a', 0), 1)
+
+        cache = ResultCache(max_bytes=2000)
+        for i in range(20):
+            cache.put(i, 'x' * 200, 0)
+        self.assertLessEqual(cache.bytes, 2000)
+        self.assertLess(len(cache), 20)
+        self.assertIsNotNone(cache.get(19, 0))
+
+    def test_ttl(self):
+        cache = ResultCache(ttl=0.01)
+        cache.put('a', 1, 0)
+        time.sleep(0.02)
+        self.assertIsNone(cache.get('a', 0))
+
+    def test_ranker_generation_changes_on_updates(self):
+        ranker = BM25Ranker()
+        ranker.fit([{'url': 'u1', 'title': 'python', 'content': 'tutorial'}])
+        generation = ranker.generation
+        ranker.add_document({'url': 'u2', 'title': 'java', 'content': 'tutorial'})
+        self.assertGreater(ranker.generation, generation)
+        generation = ranker.generation
+        ranker.delete_document('u1')
+        self.assertGreater(ranker.generation, generation)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,339 @@
+import unittest
+import sys
+import os
+import io
+import json
+import asyncio
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Add backend to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+try:
+    import crawler
+except ImportError:  # aiohttp / bs4 not installed
+    crawler = None
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """Local stand-in for crawled sites"""
+    protocol_version = 'HTTP/1.1'  # keep-alive
+    requests_seen = []  # (host, path, time, client port)
+    flaky_failures = 1
+    versions = {}  # path -> page version (changes the content and ETag)
+    gone = set()
+    robots_txt = None  # None = no robots.txt (404)
+    links = {}  # path -> linked hrefs
+    slow = set()
+    mirrors = {}  # path -> path whose page it serves a copy of
+    conditional = []  # paths requested with If-None-Match
+
+    def do_GET(self):
+        if self.path == '/robots.txt':
+            if StandInHandler.robots_txt is None:
+                self.send_page(404, 'Not Found')
+            else:
+                self.send_page(200, StandInHandler.robots_txt, content_type='text/plain')
+            return
+        StandInHandler.requests_seen.append((self.headers['Host'], self.path, time.monotonic(), self.client_address[1]))
+        if self.headers.get('If-None-Match'):
+            StandInHandler.conditional.append(self.path)
+        if self.path in StandInHandler.slow:
+            time.sleep(1)
+        page = StandInHandler.mirrors.get(self.path, self.path)
+        version = StandInHandler.versions.get(page, 1)
+        etag = f'"{page}-v{version}"'
+        if self.path == '/flaky' and StandInHandler.flaky_failures:
+            StandInHandler.flaky_failures -= 1
+            self.send_page(503, 'Unavailable')
+        elif self.path == '/missing' or self.path in StandInHandler.gone:
+            self.send_page(404, 'Not Found')
+        elif self.path == '/big':
+            self.send_page(200, '<html><head><title>Big</title></head><body>'
+                                + '<p>word</p>' * 200000 + '<p>tail</p></body></html>')
+        elif self.path == '/image':
+            self.send_page(200, 'PNG', content_type='image/png')
+        elif self.path == '/latin1':
+            self.send_page(200, '<title>Café</title><p>Crème brûlée</p>',
+                           content_type='text/html; charset=iso-8859-1', encoding='iso-8859-1')
+        elif self.headers.get('If-None-Match') == etag:
+            self.send_page(304, '', etag)
+        else:
+            anchors = ''.join(f'<a href="{href}">link</a>' for href in StandInHandler.links.get(self.path, ()))
+            self.send_page(200, f'<html><head><title>Page {page}</title></head>'
+                                f'<body><script>skip()</script><nav>{anchors}</nav>'
+                                f'<p>Content of {page} v{version}</p></body></html>',
+                           etag)
+
+    def send_page(self, status, body, etag=None, content_type='text/html; charset=utf-8', encoding='utf-8'):
+        data = body.encode(encoding)
+        self.send_response(status)
+        if etag:
+            self.send_header('ETag', etag)
+        if status != 304:
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@unittest.skipIf(crawler is None, "aiohttp or beautifulsoup4 not installed")
+class TestAsyncCrawler(unittest.TestCase):
+    def setUp(self):
+        StandInHandler.requests_seen = []
+        StandInHandler.flaky_failures = 1
+        StandInHandler.versions = {}
+        StandInHandler.gone = set()
+        StandInHandler.robots_txt = None
+        StandInHandler.links = {}
+        StandInHandler.slow = set()
+        StandInHandler.mirrors = {}
+        StandInHandler.conditional = []
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), StandInHandler)
+        self.port = self.server.server_address[1]
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def crawl(self, urls, state=None, previous=None, frontier=None, **options):
+        output = io.StringIO()
+        delta = io.StringIO()
+        stats = asyncio.run(crawler.AsyncCrawler(**options).crawl(urls, output, state, previous, delta, frontier))
+        self.delta = [json.loads(line) for line in delta.getvalue().splitlines()]
+        self.snapshot = {json.loads(line)['url']: line for line in output.getvalue().splitlines()}
+        return stats, [json.loads(line) for line in output.getvalue().splitlines()]
+
+    def test_crawl_writes_ndjson(self):
+        base = f'http://127.0.0.1:{self.port}'
+        urls = [base + '/a', base + '/flaky', base + '/missing']
+        stats, docs = self.crawl(urls, host_delay=0, backoff=0.01)
+        self.assertEqual((stats[crawler.ADDED], stats[crawler.FAILED]), (2, 1))
+        by_url = {doc['url']: doc for doc in docs}
+        self.assertEqual(set(by_url), {base + '/a', base + '/flaky'})
+        self.assertEqual(by_url[base + '/a'], {'title': 'Page /a', 'url': base + '/a', 'content': 'Page /aContent of /a v1'})
+        self.assertEqual([doc['op'] for doc in self.delta], ['add', 'add'])
+        # The 503 was retried; the 404 was not
+        paths = [path for _, path, _, _ in StandInHandler.requests_seen]
+        self.assertEqual(paths.count('/flaky'), 2)
+        self.assertEqual(paths.count('/missing'), 1)
+
+    def test_per_host_politeness(self):
+        delay = 0.2
+        hosts = [f'127.0.0.1:{self.port}', f'localhost:{self.port}']
+        urls = [f'http://{host}/page{i}' for i in range(3) for host in hosts]
+        # Both hosts serve the same pages: keep the copies
+        stats, _ = self.crawl(urls, host_delay=delay, dedup_distance=None)
+        self.assertEqual(stats[crawler.ADDED], 6)
+        
+        starts = {}
+        ports = {}
+        for host, _, seen_at, port in StandInHandler.requests_seen:
+            starts.setdefault(host, []).append(seen_at)
+            ports.setdefault(host, set()).add(port)
+        for host in hosts:
+            times = sorted(starts[host])
+            self.assertEqual(len(times), 3)
+            for earlier, later in zip(times, times[1:]):
+                self.assertGreaterEqual(later - earlier, delay - 0.02)
+            # Requests to a host reuse a pooled keep-alive connection
+            self.assertLess(len(ports[host]), 3)
+        # Hosts are throttled independently, not one global delay
+        self.assertLess(abs(starts[hosts[0]][0] - starts[hosts[1]][0]), delay)
+
+    def test_incremental_recrawl(self):
+        base = f'http://127.0.0.1:{self.port}'
+        urls = [base + path for path in ('/same', '/edited', '/gone', '/dropped')]
+        state = crawler.CrawlState()
+        self.crawl(urls, state, host_delay=0)
+        first = self.snapshot
+        
+        StandInHandler.requests_seen = []
+        StandInHandler.versions['/edited'] = 2
+        StandInHandler.gone.add('/gone')
+        stats, docs = self.crawl(urls[:3] + [base + '/new'], state, first, host_delay=0)
+        self.assertEqual(dict(stats), {'unchanged': 1, 'update': 1, 'add': 1, 'delete': 2})
+        
+        # Only the changes are emitted; the snapshot holds every live page
+        delta = {doc['url']: doc for doc in self.delta}
+        self.assertEqual({url: doc['op'] for url, doc in delta.items()},
+                         {base + '/edited': 'update', base + '/new': 'add',
+                          base + '/gone': 'delete', base + '/dropped': 'delete'})
+        self.assertEqual(delta[base + '/edited']['content'], 'Page /editedContent of /edited v2')
+        self.assertEqual(delta[base + '/gone'], {'op': 'delete', 'url': base + '/gone'})
+        self.assertEqual(set(self.snapshot), {base + '/same', base + '/edited', base + '/new'})
+        self.assertEqual(self.snapshot[base + '/same'], first[base + '/same'])
+        self.assertNotIn(base + '/gone', state)
+        self.assertNotIn(base + '/dropped', state)
+        
+        # Unchanged pages were requested conditionally
+        self.assertEqual(len(StandInHandler.requests_seen), 4)
+
+    def test_unchanged_content_without_validators(self):
+        base = f'http://127.0.0.1:{self.port}'
+        state = crawler.CrawlState()
+        self.crawl([base + '/a'], state, host_delay=0)
+        state.entries[base + '/a']['etag'] = None  # e.g. a server that sends no validators
+        stats, _ = self.crawl([base + '/a'], state, self.snapshot, host_delay=0)
+        self.assertEqual(dict(stats), {'unchanged': 1})
+        self.assertEqual(self.delta, [])
+
+    def test_near_duplicates(self):
+        base = f'http://127.0.0.1:{self.port}'
+        StandInHandler.mirrors = {'/copy': '/a'}
+        urls = [base + '/a', base + '/copy', base + '/b']
+        state = crawler.CrawlState()
+        stats, docs = self.crawl(urls, state, host_delay=0)
+        self.assertEqual(dict(stats), {'add': 2, 'duplicate': 1})
+        self.assertEqual(sorted(doc['url'] for doc in docs), [base + '/a', base + '/b'])
+        self.assertEqual(state.get(base + '/copy')['duplicate_of'], base + '/a')
+        self.assertIsNotNone(state.get(base + '/b')['simhash'])
+        
+        # The fingerprints of unchanged (304) pages come from the state
+        stats, _ = self.crawl(urls, state, self.snapshot, host_delay=0)
+        self.assertEqual(dict(stats), {'unchanged': 2, 'duplicate': 1})
+        self.assertEqual(self.delta, [])
+        
+        # Once the copy diverges from the canonical page it is kept
+        StandInHandler.mirrors = {}
+        StandInHandler.versions['/copy'] = 2
+        stats, _ = self.crawl(urls, state, self.snapshot, host_delay=0)
+        self.assertEqual(dict(stats), {'unchanged': 2, 'add': 1})
+        self.assertNotIn('duplicate_of', state.get(base + '/copy'))
+
+    def test_bounded_downloads(self):
+        base = f'http://127.0.0.1:{self.port}'
+        stats, docs = self.crawl([base + '/big', base + '/image', base + '/latin1', base + '/a'],
+                                 host_delay=0, max_page_bytes=64 * 1024)
+        self.assertEqual((stats[crawler.ADDED], stats[crawler.FAILED]), (3, 1))
+        by_url = {doc['url']: doc for doc in docs}
+        self.assertNotIn(base + '/image', by_url)
+        # Only the first 64 KiB of the 2 MB page were read: the tail is missing
+        big = by_url[base + '/big']
+        self.assertEqual(big['title'], 'Big')
+        self.assertTrue(big['content'].startswith('Bigwordword'))
+        self.assertNotIn('tail', big['content'])
+        self.assertEqual(len(big['content']), crawler.MAX_CONTENT_CHARS)
+        # The header charset decodes the raw bytes
+        self.assertEqual(by_url[base + '/latin1']['content'], 'CaféCrème brûlée')
+
+    def test_follow_links(self):
+        base = f'http://127.0.0.1:{self.port}'
+        other = f'http://localhost:{self.port}/other'
+        StandInHandler.robots_txt = 'User-agent: *\nDisallow: /site/private\n'
+        StandInHandler.links = {
+            '/site/': ['a', '/site/b', '/site/b#top', 'private', 'mailto:team@example.com', other],
+            '/site/a': ['../site/deep', '/site/'],
+            '/site/deep': ['/site/deeper'],
+        }
+        frontier = crawler.Frontier(max_depth=2, host_delay=0)
+        stats, docs = self.crawl([base + '/site/'], frontier=frontier, host_delay=0)
+        
+        fetched = sorted((host, path) for host, path, _, _ in StandInHandler.requests_seen)
+        self.assertEqual(fetched, sorted([(f'127.0.0.1:{self.port}', path)
+                                          for path in ('/site/', '/site/a', '/site/b', '/site/deep')]
+                                         + [(f'localhost:{self.port}', '/other')]))
+        self.assertEqual((stats[crawler.ADDED], stats[crawler.BLOCKED]), (5, 1))
+        self.assertEqual(len(docs), 5)
+
+    def test_recrawl_follows_stored_links(self):
+        base = f'http://127.0.0.1:{self.port}'
+        StandInHandler.links = {'/s0': ['/s1', '/s2'], '/s1': ['/s3']}
+        state = crawler.CrawlState()
+        self.crawl([base + '/s0'], state, frontier=crawler.Frontier(max_depth=2, host_delay=0), host_delay=0)
+        self.assertEqual(state.links(base + '/s0'), [base + '/s1', base + '/s2'])
+        self.assertIsNone(state.links(base + '/s3'))  # At max depth: links not collected
+        
+        # Every page is requested conditionally; 304 pages are expanded from their stored links
+        stats, _ = self.crawl([base + '/s0'], state, self.snapshot,
+                              frontier=crawler.Frontier(max_depth=2, host_delay=0), host_delay=0)
+        self.assertEqual(dict(stats), {'unchanged': 4})
+        self.assertEqual(sorted(StandInHandler.conditional), ['/s0', '/s1', '/s2', '/s3'])
+        self.assertEqual(self.delta, [])
+
+    def test_page_budget_keeps_pending_pages(self):
+        base = f'http://127.0.0.1:{self.port}'
+        StandInHandler.links = {'/p0': ['/p1', '/p2', '/p3']}
+        state = crawler.CrawlState()
+        self.crawl([base + '/p0'], state, frontier=crawler.Frontier(max_depth=1, host_delay=0), host_delay=0)
+        first = self.snapshot
+        
+        # Two pages are still queued when the budget runs out: they keep their lines
+        stats, _ = self.crawl([base + '/p0'], state, first,
+                              frontier=crawler.Frontier(max_depth=1, max_pages=2, host_delay=0), host_delay=0)
+        self.assertEqual(dict(stats), {'unchanged': 2})
+        self.assertEqual(self.delta, [])
+        self.assertEqual(self.snapshot, first)
+        self.assertEqual(len(state), 4)
+
+    def test_resume_after_interrupt(self):
+        base = f'http://127.0.0.1:{self.port}'
+        StandInHandler.links = {'/r0': ['/r1', '/r2', '/r3']}
+        StandInHandler.slow = {'/r2'}
+        checkpoint_path = 'test_crawl_checkpoint.json'
+        
+        async def interrupted_crawl(output):
+            frontier = crawler.Frontier(max_depth=1, host_delay=0)
+            task = asyncio.ensure_future(crawler.AsyncCrawler(host_delay=0).crawl(
+                [base + '/r0'], output, frontier=frontier, checkpoint_path=checkpoint_path))
+            # One host is fetched one page at a time: stop while /r2 is in flight
+            while output.getvalue().count('\n') < 2:
+                await asyncio.sleep(0.01)
+            await asyncio.sleep(0.3)
+            task.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+                
+        try:
+            first = io.StringIO()
+            asyncio.run(interrupted_crawl(first))
+            frontier, progress = crawler.load_checkpoint(checkpoint_path)
+            self.assertEqual(progress['stats'], {'add': 2})
+            self.assertEqual(len(frontier), 2)
+            
+            StandInHandler.requests_seen = []
+            output = io.StringIO(first.getvalue()[:progress['output_offset']])
+            output.seek(0, io.SEEK_END)
+            stats = asyncio.run(crawler.AsyncCrawler(host_delay=0).crawl(
+                [base + '/r0'], output, frontier=frontier, stats=progress['stats']))
+        finally:
+            if os.path.exists(checkpoint_path):
+                os.remove(checkpoint_path)
+                
+        # Only the pages not finished before the interrupt were fetched again
+        self.assertEqual(sorted(path for _, path, _, _ in StandInHandler.requests_seen), ['/r2', '/r3'])
+        self.assertEqual(stats[crawler.ADDED], 4)
+        urls = [json.loads(line)['url'] for line in output.getvalue().splitlines()]
+        self.assertEqual(sorted(urls), [base + f'/r{i}' for i in range(4)])
+
+    def test_extract_page(self):
+        html = ('<html><head><title> Docs \n Home </title><style>p {}</style></head><body>'
+                '<header>Menu</header><nav>Links</nav><p>Hello   <b>world</b></p>'
+                '<script>track()</script><footer>Legal</footer></body></html>')
+        self.assertEqual(crawler.extract_page(html, 'http://a.example/'), ('Docs Home', 'Docs Home Hello world'))
+        self.assertEqual(crawler.extract_page('<p>No title</p>', 'http://a.example/'),
+                         ('http://a.example/', 'No title'))
+        self.assertEqual(crawler.strip_tags(html), 'Docs Home Hello world')
+
+    def test_state_persistence(self):
+        state = crawler.CrawlState()
+        state.update('http://a.example/', '"v1"', 'Mon, 01 Jan 2024 00:00:00 GMT', 'abc')
+        state.save('test_crawl_state.json')
+        try:
+            loaded = crawler.CrawlState.load('test_crawl_state.json')
+            self.assertEqual(loaded.entries, state.entries)
+            self.assertEqual(loaded.conditional_headers('http://a.example/'),
+                             {'If-None-Match': '"v1"', 'If-Modified-Since': 'Mon, 01 Jan 2024 00:00:00 GMT'})
+            self.assertEqual(loaded.conditional_headers('http://b.example/'), {})
+        finally:
+            os.remove('test_crawl_state.json')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,110 @@
+import unittest
+import sys
+import os
+import json
+import random
+
+# Add backend to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from dedup import SimHashIndex, simhash, hamming_distance, shingles, drop_near_duplicates, dedup_file
+
+
+def make_text(seed, words=400):
+    rng = random.Random(seed)
+    vocab = [f'word{i}' for i in range(2000)]
+    return ' '.join(rng.choice(vocab) for _ in range(words))
+
+
+class TestSimHash(unittest.TestCase):
+    def test_fingerprints(self):
+        text = make_text(1)
+        self.assertEqual(simhash(text), simhash(text.upper()))
+        self.assertIsNone(simhash(''))
+        self.assertIsNone(simhash(' ... '))
+        self.assertEqual(shingles('one two'), {'one two': 1})
+
+        # A small edit moves the fingerprint a few bits; other text is far away
+        words = text.split()
+        words[200] = 'changed'
+        self.assertLessEqual(hamming_distance(simhash(text), simhash(' '.join(words))), 3)
+        self.assertGreater(hamming_distance(simhash(text), simhash(make_text(2))), 10)
+
+    def test_long_text(self):
+        # More shingles than the packed counters hold: same result as a short repeat
+        text = 'alpha beta gamma delta ' * 20000
+        self.assertEqual(simhash(text), simhash('alpha beta gamma delta ' * 20))
+
+
+class TestSimHashIndex(unittest.TestCase):
+    def test_find(self):
+        index = SimHashIndex(max_distance=3)
+        base = random.Random(5).getrandbits(64)
+        index.add('a', base)
+        index.add('b', base ^ 0b1011)       # 3 bits away
+        index.add('c', base ^ (0b11111 << 40))  # 5 bits away
+        self.assertEqual(index.find(base), 'a')
+        self.assertEqual(index.find(base, exclude='a'), 'b')
+        self.assertEqual(index.find(base ^ (0b1111 << 40)), 'c')
+        self.assertIsNone(index.find(base ^ 0xFFFF))
+
+        index.remove('a')
+        self.assertNotIn('a', index)
+        self.assertEqual(index.find(base), 'b')
+        index.add('b', base ^ (1 << 63))  # Re-adding replaces the fingerprint
+        self.assertEqual(len(index), 2)
+        self.assertEqual(index.find(base), 'b')
+
+        # Equally close keys: the earliest added wins, whatever block matched
+        index.add('d', base ^ (1 << 1))
+        index.add('e', base ^ (1 << 62))
+        self.assertEqual(index.find(base), 'b')
+        index.add('b', base ^ (1 << 63))  # Re-added: now the latest
+        self.assertEqual(index.find(base), 'd')
+
+    def test_matches_linear_scan(self):
+        rng = random.Random(7)
+        index = SimHashIndex(max_distance=3)
+        fingerprints = {}
+        for i in range(2000):
+            fingerprint = rng.getrandbits(64)
+            if i % 4 == 0 and fingerprints:
+                # Near copies of earlier fingerprints
+                fingerprint = rng.choice(list(fingerprints.values()))
+                for bit in rng.sample(range(64), rng.randint(0, 5)):
+                    fingerprint ^= 1 << bit
+            found = index.find(fingerprint)
+            close = [(hamming_distance(fingerprint, other), key) for key, other in fingerprints.items()
+                     if hamming_distance(fingerprint, other) <= 3]
+            # The closest fingerprint; the earliest added among equally close ones
+            self.assertEqual(found, min(close)[1] if close else None)
+            index.add(i, fingerprint)
+            fingerprints[i] = fingerprint
+
+
+class TestDropNearDuplicates(unittest.TestCase):
+    def test_dedup_file(self):
+        text = make_text(3)
+        docs = [
+            {'title': 'Original', 'url': 'https://a.example/', 'content': text},
+            {'title': 'Other', 'url': 'https://b.example/', 'content': make_text(4)},
+            {'title': 'Mirror', 'url': 'https://mirror.example/', 'content': text + ' Mirror footer'},
+            {'title': 'Empty', 'url': 'https://c.example/', 'content': ''},
+        ]
+        canonical = [c for _, c in drop_near_duplicates(docs)]
+        self.assertEqual(canonical, [None, None, 'https://a.example/', None])
+
+        path = 'test_dedup_index.json'
+        try:
+            with open(path, 'w', encoding='utf-8') as f:
+                f.writelines(json.dumps(doc) + '\n' for doc in docs)
+            self.assertEqual(dedup_file(path), 1)
+            with open(path, 'r', encoding='utf-8') as f:
+                urls = [json.loads(line)['url'] for line in f]
+            self.assertEqual(urls, ['https://a.example/', 'https://b.example/', 'https://c.example/'])
+        finally:
+            os.remove(path)
+
+
+if __name__ == '__main__':
+    unittest.main()
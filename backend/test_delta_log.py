@@ -0,0 +1,78 @@
+import unittest
+import sys
+import os
+
+# Add backend to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from delta_log import DeltaLogReader, latest_changes
+from database import format_delta
+
+LOG_PATH = 'test_delta_log.ndjson'
+
+
+class TestDeltaLogReader(unittest.TestCase):
+    def setUp(self):
+        self.reader = DeltaLogReader(LOG_PATH)
+
+    def tearDown(self):
+        if os.path.exists(LOG_PATH):
+            os.remove(LOG_PATH)
+
+    def append(self, text, mode='a'):
+        with open(LOG_PATH, mode, encoding='utf-8') as f:
+            f.write(text)
+
+    def test_follow_appends(self):
+        self.assertEqual(self.reader.read(), [])  # No log yet
+        self.append(format_delta('add', 'https://a.example/', 'A', 'First') + '\n')
+        self.assertEqual(self.reader.read(), [{'op': 'add', 'title': 'A', 'url': 'https://a.example/', 'content': 'First'}])
+        self.assertEqual(self.reader.read(), [])
+
+        # A partly written line is read once it is complete
+        line = format_delta('update', 'https://a.example/', 'A', 'Second')
+        self.append(line[:10])
+        self.assertEqual(self.reader.read(), [])
+        self.append(line[10:] + '\n' + format_delta('delete', 'https://b.example/') + '\n')
+        self.assertEqual([record['op'] for record in self.reader.read()], ['update', 'delete'])
+
+        # Malformed records are skipped
+        self.append('not json\n{"op": "add", "url": "https://c.example/"}\n{"op": "rename", "url": "x"}\n')
+        self.assertEqual(self.reader.read(), [])
+
+    def test_new_run_is_read_from_start(self):
+        self.append(format_delta('add', 'https://a.example/', 'A', 'First run, with a long line') + '\n'
+                    + format_delta('add', 'https://b.example/', 'B', 'First run') + '\n')
+        self.assertEqual(len(self.reader.read()), 2)
+
+        # The next crawl truncates the log: even once it outgrows the old
+        # read position, it is read from its first record
+        self.append(format_delta('add', 'https://c.example/', 'C', 'Second run') + '\n', mode='w')
+        self.append(format_delta('update', 'https://c.example/', 'C', 'Second run ' * 20) + '\n')
+        self.assertEqual([record['op'] for record in self.reader.read()], ['add', 'update'])
+
+    def test_rewind(self):
+        self.append(format_delta('add', 'https://a.example/', 'A', 'First') + '\n')
+        self.assertEqual(len(self.reader.read()), 1)
+        self.append(format_delta('delete', 'https://a.example/') + '\n')
+        self.assertEqual([record['op'] for record in self.reader.read()], ['delete'])
+        # Records that failed to apply are read again, then reading continues
+        self.reader.rewind()
+        self.assertEqual([record['op'] for record in self.reader.read()], ['delete'])
+        self.assertEqual(self.reader.read(), [])
+
+    def test_latest_changes(self):
+        records = [
+            {'op': 'add', 'url': 'a', 'title': 'A', 'content': '1'},
+            {'op': 'add', 'url': 'b', 'title': 'B', 'content': '1'},
+            {'op': 'update', 'url': 'a', 'title': 'A', 'content': '2'},
+            {'op': 'delete', 'url': 'b'},
+        ]
+        latest = latest_changes(records)
+        self.assertEqual(list(latest), ['a', 'b'])
+        self.assertEqual(latest['a']['content'], '2')
+        self.assertEqual(latest['b']['op'], 'delete')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,95 @@
+import unittest
+import sys
+import os
+
+# Add backend to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import docstore
+from docstore import DocumentStore
+
+STORE_PATH = 'test_docs.bin'
+
+DOCS = [
+    {'title': f'Page {i}', 'url': f'https://example.com/{i}', 'content': f'Content of page {i} ' * (i + 1)}
+    for i in range(40)
+] + [{'title': 'Café', 'url': 'https://example.com/ünïcode', 'content': 'Crème brûlée – naïve'}]
+
+
+class TestDocumentStore(unittest.TestCase):
+    def tearDown(self):
+        if os.path.exists(STORE_PATH):
+            os.remove(STORE_PATH)
+
+    def assertSameDocs(self, store, docs):
+        self.assertEqual(len(store), len(docs))
+        for doc_idx, doc in enumerate(docs):
+            self.assertEqual(dict(store[doc_idx]), doc)
+
+    def test_round_trip(self):
+        for compress in (False, True):
+            DocumentStore.write(STORE_PATH, DOCS, checksum=b'c' * 32, compress=compress)
+            store = DocumentStore.open(STORE_PATH, checksum=b'c' * 32)
+            self.assertIsNotNone(store)
+            self.assertEqual(store.block_offsets is not None, compress)
+            self.assertSameDocs(store, DOCS)
+            # Reads out of order hit other blocks
+            self.assertEqual(store[3]['url'], 'https://example.com/3')
+            self.assertEqual(store[40]['title'], 'Café')
+            self.assertIsNone(DocumentStore.open(STORE_PATH, checksum=b'd' * 32))
+            del store
+
+        DocumentStore.write(STORE_PATH, DOCS, checksum=b'short')
+        self.assertIsNotNone(DocumentStore.open(STORE_PATH, checksum=b'short'))
+        self.assertIsNone(DocumentStore.open(STORE_PATH, checksum=b'shorter'))
+
+    def test_lazy_fields(self):
+        DocumentStore.write(STORE_PATH, DOCS)
+        store = DocumentStore.open(STORE_PATH)
+        doc = store[5]
+        self.assertEqual(doc['url'], 'https://example.com/5')
+        self.assertEqual(list(doc._decoded), ['url'])
+        self.assertEqual(doc.get('content'), DOCS[5]['content'])
+        with self.assertRaises(KeyError):
+            doc['score']
+        del doc, store
+
+    def test_sentence_ranges(self):
+        DocumentStore.write(STORE_PATH, DOCS, compress=True)
+        store = DocumentStore.open(STORE_PATH)
+        doc = store[40]
+        starts, size, token_starts = doc.sentences()
+        self.assertEqual((list(starts), list(token_starts)), ([0], [0]))
+        self.assertEqual(size, len(DOCS[40]['content'].encode('utf-8')))
+        self.assertEqual(doc.content_range(0, 6), 'Crème')
+        self.assertNotIn('content', doc._decoded)
+        del doc, store
+
+    def test_block_cache_is_bounded(self):
+        DocumentStore.write(STORE_PATH, DOCS * 50, compress=True, block_docs=4)
+        store = DocumentStore.open(STORE_PATH)
+        for doc_idx in range(len(store)):
+            self.assertEqual(store[doc_idx]['url'], DOCS[doc_idx % len(DOCS)]['url'])
+        self.assertEqual(len(store._blocks), docstore.BLOCK_CACHE_SIZE)
+        del store
+
+    def test_updates(self):
+        DocumentStore.write(STORE_PATH, DOCS[:3])
+        store = DocumentStore.open(STORE_PATH)
+        store.extend(DOCS[3:5])
+        store.delete(1)
+        store.delete(4)
+        self.assertEqual(len(store), 5)
+        self.assertIsNone(store[1])
+        self.assertIsNone(store[4])
+        self.assertEqual(store[3], DOCS[3])
+        self.assertEqual(dict(store[2]), DOCS[2])
+        del store
+
+        in_memory = DocumentStore(DOCS[:2])
+        self.assertSameDocs(in_memory, DOCS[:2])
+        self.assertFalse(DocumentStore())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,102 @@
+import unittest
+import sys
+import os
+
+# Add backend to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from frontier import Frontier, SeenSet, normalize_url, save_checkpoint, load_checkpoint
+
+
+class TestNormalizeUrl(unittest.TestCase):
+    def test_normalize(self):
+        self.assertEqual(normalize_url('HTTPS://Example.COM:443'), 'https://example.com/')
+        self.assertEqual(normalize_url('http://example.com:8080/a/./b/../c?q=1#frag'), 'http://example.com:8080/a/c?q=1')
+        self.assertEqual(normalize_url('../x/', 'https://example.com/a/b/page'), 'https://example.com/a/x/')
+        self.assertEqual(normalize_url('//cdn.example.com/lib.js', 'https://example.com/'), 'https://cdn.example.com/lib.js')
+        for bad in ('mailto:team@example.com', 'javascript:void(0)', 'ftp://example.com/', 'http://'):
+            self.assertIsNone(normalize_url(bad, 'https://example.com/'))
+
+    def test_seen_set(self):
+        seen = SeenSet()
+        urls = [f'https://example.com/page{i}' for i in range(10000)]
+        self.assertTrue(all(seen.add(url) for url in urls))
+        self.assertFalse(any(seen.add(url) for url in urls))
+        self.assertEqual(len(seen), len(urls))
+        restored = SeenSet.from_bytes(seen.to_bytes())
+        self.assertTrue(all(url in restored for url in urls))
+        self.assertNotIn('https://example.com/other', restored)
+
+
+class TestFrontier(unittest.TestCase):
+    def test_scheduling(self):
+        frontier = Frontier(max_depth=2, host_delay=1.0, priority_domains=['proxpl.in'])
+        self.assertTrue(frontier.push('https://a.example/', 0))
+        self.assertTrue(frontier.push('https://a.example/deep', 2))
+        self.assertTrue(frontier.push('https://a.example/x', 1))
+        self.assertTrue(frontier.push('https://b.example/', 0))
+        self.assertTrue(frontier.push('https://docs.proxpl.in/', 1))
+        self.assertFalse(frontier.push('https://A.example:443/#top', 1))  # duplicate
+        self.assertFalse(frontier.push('https://c.example/', 3))  # too deep
+        
+        # Priority domain first, then one page per host at a time
+        self.assertEqual(frontier.pop(0.0), ('https://docs.proxpl.in/', 1))
+        self.assertEqual(frontier.pop(0.0), ('https://a.example/', 0))
+        self.assertEqual(frontier.pop(0.0), ('https://b.example/', 0))
+        self.assertIsNone(frontier.pop(0.0))  # a.example is busy
+        
+        frontier.done('https://a.example/', 10.0)
+        self.assertIsNone(frontier.pop(10.5))  # politeness delay
+        self.assertEqual(frontier.wait_time(10.5), 0.5)
+        self.assertEqual(frontier.pop(11.0), ('https://a.example/x', 1))
+        frontier.done('https://a.example/x', 11.0)
+        self.assertEqual(frontier.pop(12.0), ('https://a.example/deep', 2))
+
+    def test_limits(self):
+        frontier = Frontier(max_depth=1, max_pages=3, max_pages_per_host=2, host_delay=0)
+        for i in range(4):
+            frontier.push(f'https://a.example/{i}', 1)
+            frontier.push(f'https://b.example/{i}', 1)
+        self.assertEqual(len(frontier), 4)
+        popped = []
+        while True:
+            entry = frontier.pop(0.0)
+            if entry is None:
+                break
+            popped.append(entry[0])
+            frontier.done(entry[0], 0.0)
+        self.assertEqual(len(popped), 3)
+        self.assertIsNone(frontier.wait_time(0.0))
+
+    def test_checkpoint(self):
+        frontier = Frontier(max_depth=1, host_delay=0)
+        for path in ('', 'a', 'b'):
+            frontier.push(f'https://a.example/{path}', 1 if path else 0)
+        frontier.push('https://b.example/', 0)
+        url, _ = frontier.pop(0.0)
+        frontier.done(url, 0.0)
+        in_flight, _ = frontier.pop(0.0)
+        
+        save_checkpoint('test_frontier_checkpoint.json', frontier, {'note': 'x'})
+        try:
+            restored, extra = load_checkpoint('test_frontier_checkpoint.json')
+        finally:
+            os.remove('test_frontier_checkpoint.json')
+        self.assertEqual(extra, {'note': 'x'})
+        self.assertEqual(len(restored), 3)
+        # The page in flight is pending again; the finished one is not
+        popped = []
+        while True:
+            entry = restored.pop(0.0)
+            if entry is None:
+                break
+            popped.append(entry[0])
+            restored.done(entry[0], 0.0)
+        self.assertIn(in_flight, popped)
+        self.assertNotIn(url, popped)
+        self.assertEqual(len(popped), 3)
+        self.assertFalse(restored.push(url, 1))
+        self.assertEqual(restored.dispatched(), 4)
+
+if __name__ == '__main__':
+    unittest.main()
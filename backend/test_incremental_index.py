@@ -0,0 +1,141 @@
+import unittest
+import sys
+import os
+from array import array
+from collections import Counter
+
+# Add backend to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from ranking import BM25Ranker
+
+CORPUS = [
+    {'url': 'https://a.example', 'title': 'Python Tutorial', 'content': 'Learn Python programming language'},
+    {'url': 'https://b.example', 'title': 'Java Tutorial', 'content': 'Learn Java programming'},
+    {'url': 'https://c.example', 'title': 'Python vs Java', 'content': 'Comparison of Python and Java'},
+    {'url': 'https://d.example', 'title': 'Cooking 101', 'content': 'How to cook rice'},
+]
+
+QUERIES = ['python', 'java programming', 'learn python java', 'cook', 'tutorial']
+
+
+def by_url(results, ranker):
+    """Maps (doc_index, score) results onto URLs for comparison across rankers"""
+    urls = {doc_idx: url for url, doc_idx in ranker.url_index.items()}
+    return [(urls[doc_idx], round(score, 9)) for doc_idx, score in results]
+
+
+class TestIncrementalIndex(unittest.TestCase):
+    def assertSameRanking(self, ranker, corpus):
+        reference = BM25Ranker()
+        reference.fit(corpus)
+        for query in QUERIES:
+            for exhaustive in (False, True):
+                self.assertEqual(by_url(ranker.search(query, exhaustive=exhaustive), ranker),
+                                 by_url(reference.search(query), reference))
+        self.assertEqual(ranker.corpus_size, reference.corpus_size)
+        self.assertAlmostEqual(ranker.avgdl, reference.avgdl)
+
+    def test_add_matches_full_fit(self):
+        ranker = BM25Ranker()
+        ranker.fit(CORPUS[:2])
+        ranker.add_document(CORPUS[2])
+        ranker.add_document(CORPUS[3])
+        self.assertSameRanking(ranker, CORPUS)
+        self.assertEqual(ranker.doc_freqs['python'], 2)
+
+    def test_add_collects_vocabulary(self):
+        ranker = BM25Ranker()
+        ranker.fit(CORPUS[:2])
+        vocab = Counter()
+        ranker.add_documents(CORPUS[2:], vocab=vocab)
+        self.assertEqual(vocab['python'], 2)
+        self.assertEqual(vocab['rice'], 1)
+        self.assertNotIn('learn', vocab)
+
+    def test_add_duplicate_url_rejected(self):
+        ranker = BM25Ranker()
+        ranker.fit(CORPUS)
+        with self.assertRaises(ValueError):
+            ranker.add_document(CORPUS[0])
+
+    def test_failed_add_changes_nothing(self):
+        ranker = BM25Ranker()
+        ranker.fit(CORPUS[:2])
+        broken = {'url': 'https://broken.example', 'title': 'Broken', 'content': 12345}
+        with self.assertRaises(AttributeError):
+            ranker.add_documents([CORPUS[2], broken])
+        self.assertEqual(len(ranker.doc_len), 2)
+        self.assertIsNone(ranker.doc_index(CORPUS[2]['url']))
+        self.assertNotIn('comparison', ranker.doc_freqs)
+        self.assertSameRanking(ranker, CORPUS[:2])
+
+    def test_delete_tombstones_document(self):
+        ranker = BM25Ranker(compact_ratio=1.0)
+        ranker.fit(CORPUS)
+        self.assertTrue(ranker.delete_document('https://c.example'))
+        self.assertFalse(ranker.delete_document('https://c.example'))
+        self.assertIn(2, ranker.deleted)
+        self.assertNotIn(2, [doc_idx for doc_idx, _ in ranker.search('python java')])
+        self.assertEqual(ranker.get_score('python', 2), 0.0)
+        self.assertSameRanking(ranker, [CORPUS[0], CORPUS[1], CORPUS[3]])
+
+    def test_delete_with_previous_document(self):
+        ranker = BM25Ranker(compact_ratio=1.0)
+        ranker.fit(CORPUS)
+        ranker.delete_document('https://a.example', previous=CORPUS[0])
+        self.assertEqual(ranker.doc_freqs['python'], 1)
+        self.assertSameRanking(ranker, CORPUS[1:])
+
+    def test_replace_by_url(self):
+        ranker = BM25Ranker(compact_ratio=1.0)
+        ranker.fit(CORPUS)
+        updated = {'url': 'https://d.example', 'title': 'Cooking Python', 'content': 'Python recipes'}
+        doc_idx = ranker.replace_document(updated)
+        self.assertEqual(doc_idx, 4)
+        self.assertEqual(ranker.url_index['https://d.example'], 4)
+        self.assertSameRanking(ranker, CORPUS[:3] + [updated])
+
+    def test_compaction_drops_deleted_postings(self):
+        ranker = BM25Ranker(compact_ratio=0.3)
+        ranker.fit(CORPUS)
+        ranker.delete_document('https://d.example')
+        self.assertIn(3, ranker.deleted)
+        ranker.delete_document('https://b.example')  # crosses the ratio
+        self.assertEqual(ranker.deleted, set())
+        self.assertNotIn('cook', ranker.inverted_index)
+        self.assertEqual(list(ranker.inverted_index['java']), [2])
+        self.assertSameRanking(ranker, [CORPUS[0], CORPUS[2]])
+
+    def test_update_after_load(self):
+        ranker = BM25Ranker()
+        ranker.fit(CORPUS[:3])
+        ranker.save('test_incremental.bin')
+        try:
+            loaded = BM25Ranker.load('test_incremental.bin')
+            self.assertEqual(loaded.doc_index('https://c.example'), 2)
+            # Lookups and no-op updates leave the tables mapped
+            self.assertFalse(loaded.delete_document('https://unknown.example'))
+            self.assertEqual(loaded.add_documents([]), [])
+            self.assertIsNotNone(loaded._mapped_urls)
+            self.assertNotIsInstance(loaded.doc_len, array)
+            loaded.add_document(CORPUS[3])
+            loaded.delete_document('https://a.example')
+            self.assertSameRanking(loaded, CORPUS[1:])
+            self.assertEqual(loaded.doc_index('https://d.example'), 3)
+            self.assertIsNone(loaded.doc_index('https://a.example'))
+            
+            # Saving compacts; doc indices stay stable across the round trip
+            loaded.save('test_incremental.bin')
+            reloaded = BM25Ranker.load('test_incremental.bin')
+            self.assertEqual(len(reloaded.doc_len), 4)
+            self.assertEqual(reloaded.corpus_size, 3)
+            for query in QUERIES:
+                self.assertEqual(reloaded.search(query), loaded.search(query))
+            del loaded, reloaded
+        finally:
+            if os.path.exists('test_incremental.bin'):
+                os.remove('test_incremental.bin')
+
+if __name__ == '__main__':
+    unittest.main()
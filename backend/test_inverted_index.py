@@ -1,5 +1,6 @@
 
 import unittest
+import random
 import sys
 import os
 
@@ -7,6 +8,8 @@ import os
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from ranking import BM25Ranker
+from postings import Postings
+import index_file
 
 class TestInvertedIndex(unittest.TestCase):
     def setUp(self):
@@ -30,6 +33,35 @@ class TestInvertedIndex(unittest.TestCase):
         self.assertIn('java', self.ranker.inverted_index)
         self.assertIn(1, self.ranker.inverted_index['java'])
         
+    def test_postings_term_frequencies(self):
+        # 'python' appears twice in doc 0 (title + content) and twice in doc 2
+        postings = self.ranker.inverted_index['python']
+        self.assertEqual(list(postings), [0, 2])
+        self.assertEqual(postings.tf(0), 2)
+        self.assertEqual(postings.tf(1), 0)
+
+    def test_compressed_postings(self):
+        compressed = BM25Ranker(compress_postings=True)
+        compressed.fit(self.corpus)
+        self.assertEqual(list(compressed.inverted_index['python']), [0, 2])
+        self.assertEqual(compressed.search('python java'), self.ranker.search('python java'))
+
+    def test_compressed_lookups(self):
+        rng = random.Random(7)
+        postings = Postings()
+        for doc_id in sorted(rng.sample(range(5000), 300)):
+            positions = sorted(rng.sample(range(100000), rng.randint(1, 5)))
+            postings.append(doc_id, len(positions), positions)
+        compressed = postings.compress()
+        for doc_id in range(5000):
+            self.assertEqual(compressed.tf(doc_id), postings.tf(doc_id))
+            self.assertEqual(list(compressed.positions_of(doc_id)), list(postings.positions_of(doc_id)))
+        # Decoded once and kept; decompressed copies do not share the arrays
+        self.assertIs(compressed.doc_ids, compressed.doc_ids)
+        self.assertIsNot(compressed.decompress().doc_ids, compressed.doc_ids)
+        self.assertEqual(list(compressed.decompress().items_with_positions()),
+                         list(postings.items_with_positions()))
+
     def test_search_single_term(self):
         # Search for 'python'
         results = self.ranker.search('python')
@@ -59,17 +91,113 @@ class TestInvertedIndex(unittest.TestCase):
         results = self.ranker.search('astronaut')
         self.assertEqual(len(results), 0)
 
+    def test_pruned_search_matches_exhaustive(self):
+        rng = random.Random(42)
+        words = ['w%d' % i for i in range(60)]
+        ranker = BM25Ranker()
+        ranker.fit([{'title': rng.choice(words),
+                     'content': ' '.join(rng.choices(words, weights=range(60, 0, -1), k=rng.randint(5, 40)))}
+                    for _ in range(300)])
+        for _ in range(50):
+            query = ' '.join(rng.choices(words, k=rng.randint(1, 5)))
+            for top_k in (1, 5, 20, 500):
+                self.assertEqual(ranker.search(query, top_k=top_k),
+                                 ranker.search(query, top_k=top_k, exhaustive=True))
+
     def test_persistence(self):
         # Test save and load
-        self.ranker.save('test_index.pkl')
-        loaded = BM25Ranker.load('test_index.pkl')
-        self.assertIsNotNone(loaded)
-        self.assertEqual(loaded.corpus_size, 4)
-        self.assertIn('python', loaded.inverted_index)
-        
-        # Clean up
-        if os.path.exists('test_index.pkl'):
-            os.remove('test_index.pkl')
+        self.ranker.save('test_index.bin', checksum=b'x' * 32)
+        try:
+            loaded = BM25Ranker.load('test_index.bin')
+            self.assertIsNotNone(loaded)
+            self.assertEqual(loaded.corpus_size, 4)
+            self.assertIn('python', loaded.inverted_index)
+            self.assertEqual(list(loaded.inverted_index['python']), [0, 2])
+            self.assertEqual(loaded.idf['java'], self.ranker.idf['java'])
+            self.assertEqual(loaded.search('python java'), self.ranker.search('python java'))
+            self.assertEqual(loaded.get_score('cook rice', 3), self.ranker.get_score('cook rice', 3))
+            self.assertEqual(loaded.search('astronaut'), [])
+            
+            # Stale corpus checksum is rejected
+            self.assertIsNotNone(BM25Ranker.load('test_index.bin', checksum=b'x' * 32))
+            self.assertIsNone(BM25Ranker.load('test_index.bin', checksum=b'y' * 32))
+            del loaded
+            
+            # Checksums shorter than the header field match too
+            self.ranker.save('test_index.bin', checksum=b'v1')
+            self.assertIsNotNone(BM25Ranker.load('test_index.bin', checksum=b'v1'))
+            self.assertIsNone(BM25Ranker.load('test_index.bin', checksum=b'v2'))
+            with self.assertRaises(ValueError):
+                index_file.write_index('test_index.bin', self.ranker, checksum=b'z' * 33)
+        finally:
+            # Clean up
+            if os.path.exists('test_index.bin'):
+                os.remove('test_index.bin')
+
+    def test_parallel_build_is_identical(self):
+        rng = random.Random(7)
+        words = ['w%d' % i for i in range(80)]
+        corpus = [{'url': 'https://%d.example' % i, 'title': rng.choice(words),
+                   'content': ' '.join(rng.choices(words, k=rng.randint(0, 30)))}
+                  for i in range(97)]
+        serial = BM25Ranker()
+        serial.fit(corpus)
+        parallel = BM25Ranker()
+        parallel.fit(corpus, workers=3, chunk_size=10)
+        try:
+            serial.save('test_serial.bin')
+            parallel.save('test_parallel.bin')
+            with open('test_serial.bin', 'rb') as a, open('test_parallel.bin', 'rb') as b:
+                self.assertEqual(a.read(), b.read())
+        finally:
+            for path in ('test_serial.bin', 'test_parallel.bin'):
+                if os.path.exists(path):
+                    os.remove(path)
+        self.assertEqual(list(parallel.doc_freqs.items()), list(serial.doc_freqs.items()))
+
+    def test_positions_and_phrases(self):
+        # Body positions count from the start of the title
+        self.assertEqual(self.ranker.positions(0, 'python'), [0, 3])
+        self.assertEqual(self.ranker.positions(0, 'python', 'title'), [0])
+        self.assertEqual(self.ranker.positions(0, 'python', 'content'), [3])
+        self.assertTrue(self.ranker.phrase_match(['python', 'tutorial'], 0, 'title'))
+        self.assertTrue(self.ranker.phrase_match(['python', 'programming'], 0, 'content'))
+        self.assertFalse(self.ranker.phrase_match(['tutorial', 'python'], 0))
+        # 'tutorial learn' crosses from the title into the content
+        self.assertFalse(self.ranker.phrase_match(['tutorial', 'learn'], 0))
+        self.assertTrue(self.ranker.proximity_match(['python', 'language'], 0, 4, 'content'))
+        self.assertFalse(self.ranker.proximity_match(['python', 'language'], 0, 2, 'content'))
+
+    def test_phrases_survive_save_and_compression(self):
+        corpus = [
+            {'url': 'https://docs.python.org/tutorial', 'title': 'The Python Tutorial',
+             'content': 'new york new york is a python tutorial'},
+            {'url': 'https://example.com/york', 'title': 'York', 'content': 'york new'},
+        ]
+        for compress in (False, True):
+            ranker = BM25Ranker(compress_postings=compress)
+            ranker.fit(corpus)
+            ranker.save('test_index.bin')
+            try:
+                loaded = BM25Ranker.load('test_index.bin')
+                for r in (ranker, loaded):
+                    self.assertTrue(r.phrase_match(['new', 'york', 'new', 'york'], 0))
+                    self.assertFalse(r.phrase_match(['new', 'york'], 1))
+                    self.assertTrue(r.phrase_match(['python', 'tutorial'], 0, 'title'))
+                    self.assertTrue(r.phrase_match(['python', 'org'], 0, 'url'))
+                    self.assertFalse(r.phrase_match(['python', 'org'], 0, 'body'))
+                    self.assertEqual(r.positions(1, 'york', 'url'), [3])
+                del loaded
+            finally:
+                os.remove('test_index.bin')
+
+    def test_load_rejects_other_versions(self):
+        with open('test_index.bin', 'wb') as f:
+            f.write(b'not an index')
+        try:
+            self.assertIsNone(BM25Ranker.load('test_index.bin'))
+        finally:
+            os.remove('test_index.bin')
 
 if __name__ == '__main__':
     unittest.main()
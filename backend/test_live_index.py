@@ -0,0 +1,73 @@
+import unittest
+import threading
+import sys
+import os
+
+# Add backend to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from database import format_delta
+
+try:
+    import server
+except ImportError:  # flask / flask_cors not installed
+    server = None
+
+LOG_PATH = 'test_live_index.ndjson'
+
+CORPUS = [
+    {'title': 'Python Tutorial', 'url': 'https://a.example/', 'content': 'Learn Python programming'},
+    {'title': 'Java Tutorial', 'url': 'https://b.example/', 'content': 'Learn Java programming'},
+]
+
+
+@unittest.skipIf(server is None, "flask not installed")
+class TestFollowCrawl(unittest.TestCase):
+    def setUp(self):
+        self.saved = (server.memory_db, server.ranker, server.processor)
+        server.memory_db = server.DocumentStore(list(CORPUS))
+        server.ranker = server.BM25Ranker(analyzer=server.analyzer)
+        server.ranker.fit(CORPUS)
+        server.processor = server.QueryProcessor(analyzer=server.analyzer)
+
+    def tearDown(self):
+        server.memory_db, server.ranker, server.processor = self.saved
+        if os.path.exists(LOG_PATH):
+            os.remove(LOG_PATH)
+
+    def test_failed_add_is_retried(self):
+        with open(LOG_PATH, 'w', encoding='utf-8') as f:
+            f.write(format_delta('update', 'https://a.example/', 'Python Guide', 'Learn Python crawling') + '\n')
+            f.write(format_delta('add', 'https://c.example/', 'Rust Tutorial', 'Learn Rust programming') + '\n')
+
+        stop = threading.Event()
+        add_documents = server.ranker.add_documents
+        calls = []
+
+        def flaky_add(docs, **kwargs):
+            calls.append(len(docs))
+            if len(calls) == 1:
+                raise MemoryError("simulated indexing failure")
+            stop.set()
+            return add_documents(docs, **kwargs)
+
+        server.ranker.add_documents = flaky_add
+        follower = threading.Thread(target=server.follow_crawl, args=(LOG_PATH, 0.01, stop))
+        follower.start()
+        follower.join(timeout=5)
+        stop.set()
+        follower.join()
+
+        # The failed batch (including the replaced page) is applied at the next poll
+        self.assertEqual(calls, [2, 2])
+        self.assertEqual(len(server.memory_db), len(server.ranker.doc_len))
+        for url, title in [('https://a.example/', 'Python Guide'), ('https://c.example/', 'Rust Tutorial')]:
+            doc_idx = server.ranker.doc_index(url)
+            self.assertEqual(server.memory_db[doc_idx]['title'], title)
+        self.assertIn(server.ranker.doc_index('https://c.example/'),
+                      [doc_idx for doc_idx, _ in server.ranker.search('rust')])
+        self.assertEqual(server.ranker.corpus_size, 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
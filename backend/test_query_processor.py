@@ -0,0 +1,147 @@
+import unittest
+import random
+import sys
+import os
+from collections import Counter
+
+# Add backend to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from query_processor import QueryProcessor
+
+
+class TestQueryProcessor(unittest.TestCase):
+    def setUp(self):
+        self.corpus = [
+            {'title': 'Python Tutorial', 'content': 'Learn Python programming language'},
+            {'title': 'Java Tutorial', 'content': 'Learn Java programming'},
+            {'title': 'JavaScript Guide', 'content': 'JavaScript runs in the browser'},
+            {'title': 'Database Design', 'content': 'Relational database design with SQL'},
+        ]
+        self.processor = QueryProcessor()
+        self.processor.fit(self.corpus)
+
+    def test_parallel_fit_matches_serial(self):
+        parallel = QueryProcessor()
+        parallel.fit(self.corpus, workers=2, chunk_size=1)
+        self.assertEqual(list(parallel.vocab.items()), list(self.processor.vocab.items()))
+        self.assertEqual(parallel.doc_titles, self.processor.doc_titles)
+        self.assertEqual(parallel.total_words, self.processor.total_words)
+
+    def test_correction(self):
+        self.assertEqual(self.processor.correction('pyhton'), 'python')
+        self.assertEqual(self.processor.correction('javascritp'), 'javascript')
+        self.assertEqual(self.processor.correction('python'), 'python')
+
+    def test_correction_matches_edit_enumeration(self):
+        # Reference: known words among edits1, else edits2, most frequent first
+        rng = random.Random(5)
+        letters = 'abcde1'
+        words = [''.join(rng.choices(letters, k=rng.randint(1, 9))) for _ in range(300)]
+        processor = QueryProcessor()
+        processor.fit([{'title': '', 'content': ' '.join(rng.choices(words, k=2000))}])
+        for _ in range(100):
+            word = ''.join(rng.choices(letters, k=rng.randint(1, 7)))
+            candidates = (processor.known([word]) or
+                          processor.known(processor.edits1(word)) or
+                          processor.known(processor.edits2(word)) or
+                          [word])
+            expected = min(candidates, key=lambda w: (-processor.vocab[w], w))
+            self.assertEqual(processor.correction(word), expected)
+
+    def test_max_edit_distance(self):
+        processor = QueryProcessor(max_edit_distance=1)
+        processor.fit(self.corpus)
+        self.assertEqual(processor.correction('pyhton'), 'python')
+        self.assertEqual(processor.correction('pythnn'), 'python')
+        self.assertEqual(processor.correction('pthn'), 'pthn')
+        self.assertEqual(self.processor.correction('pthn'), 'python')
+
+    def test_suggestions(self):
+        # Titles matching at a word start come first (alphabetically), then words by frequency
+        self.assertEqual(self.processor.get_suggestions('java'),
+                         ['Java Tutorial', 'JavaScript Guide', 'java', 'javascript'])
+        self.assertEqual(self.processor.get_suggestions('TUT'), ['Java Tutorial', 'Python Tutorial', 'tutorial'])
+        self.assertEqual(self.processor.get_suggestions('design w'), [])
+        self.assertEqual(self.processor.get_suggestions('  '), [])
+
+    def test_suggestions_over_scan_limit(self):
+        words = ['w%03d' % i for i in range(500)]
+        corpus = [{'title': 'Title %s %s' % (word, 'x' * 60), 'content': ' '.join(words[:i + 1])}
+                  for i, word in enumerate(words)]
+        processor = QueryProcessor()
+        processor.fit(corpus)
+        self.assertEqual(processor.get_suggestions('w', limit=8)[3:], ['w000', 'w001', 'w002', 'w003', 'w004'])
+        self.assertEqual(processor.get_suggestions('title', limit=3),
+                         ['Title w000 ' + 'x' * 60, 'Title w001 ' + 'x' * 60, 'Title w002 ' + 'x' * 60])
+        long_prefix = 'w499 ' + 'x' * 60
+        self.assertEqual(processor.get_suggestions(long_prefix), ['Title ' + long_prefix])
+
+    def test_correction_cache(self):
+        cache = self.processor.correction_cache
+        self.assertEqual(self.processor.correction('pyhton'), 'python')
+        self.assertEqual(self.processor.correction('zzzzzz'), 'zzzzzz')
+        self.assertEqual(cache.stats()['misses'], 2)
+        # Repeats, including the word without a correction, are served from the cache
+        self.assertEqual(self.processor.correction('pyhton'), 'python')
+        self.assertEqual(self.processor.correction('zzzzzz'), 'zzzzzz')
+        self.assertEqual(cache.stats()['hits'], 2)
+        # Known words bypass the cache
+        self.processor.correction('python')
+        self.assertEqual(len(cache), 2)
+        
+        # A new vocabulary drops earlier corrections
+        self.processor.fit([{'title': 'Pyhton', 'content': 'zzzzzz'}])
+        self.assertEqual(len(cache), 0)
+        self.assertEqual(self.processor.correction('pyhton'), 'pyhton')
+        self.assertEqual(self.processor.correction('zzzzzy'), 'zzzzzz')
+
+    def test_add_words(self):
+        self.assertEqual(self.processor.correction('pythons'), 'python')
+        total = self.processor.total_words
+        self.processor.add_words(Counter({'pythons': 2, 'python': 1}))
+        # Newly indexed words are no longer corrected
+        self.assertEqual(self.processor.correction('pythons'), 'pythons')
+        self.assertEqual(self.processor.vocab['python'], 3)
+        self.assertEqual(self.processor.total_words, total + 3)
+
+    def test_add_words_invalidates_cached_corrections(self):
+        processor = QueryProcessor()
+        processor.fit([{'title': 'Rust', 'content': 'rust rust bust'}])
+        self.assertEqual(processor.correction('dust'), 'rust')  # Cached
+        processor.add_words(Counter({'bust': 10}))
+        self.assertEqual(processor.correction('dust'), 'bust')
+
+    def test_query_plan(self):
+        plan = self.processor.plan('Pyhton database pyhton')
+        self.assertTrue(plan.was_corrected)
+        self.assertEqual(plan.corrected, 'python database python')
+        # Each term once, weighted by its strongest role
+        self.assertEqual(plan.terms, {'python': 1.0, 'database': 1.0, 'py': 0.5, 'db': 0.5, 'pyhton': 0.25})
+        self.assertEqual(plan.expanded, 'python database py db')
+        
+        self.processor.synonyms['sql'] = ['structured query language', 'sql']
+        plan = self.processor.plan('SQL language')
+        self.assertFalse(plan.was_corrected)
+        self.assertEqual(plan.terms, {'sql': 1.0, 'language': 1.0, 'structured': 0.5, 'query': 0.5})
+
+    def test_persistence(self):
+        self.processor.save('test_query_index.bin', checksum=b'x' * 32)
+        try:
+            loaded = QueryProcessor.load('test_query_index.bin', checksum=b'x' * 32)
+            self.assertIsNotNone(loaded)
+            self.assertEqual(list(loaded.vocab.items()), list(self.processor.vocab.items()))
+            self.assertEqual(list(loaded.doc_titles), self.processor.doc_titles)
+            self.assertEqual(loaded.total_words, self.processor.total_words)
+            for word in ('pyhton', 'javascritp', 'pthn', 'python', 'zzzzzz'):
+                self.assertEqual(loaded.correction(word), self.processor.correction(word))
+            for prefix in ('java', 'p', 'tut', 'relational d', 'zzz'):
+                self.assertEqual(loaded.get_suggestions(prefix), self.processor.get_suggestions(prefix))
+            self.assertEqual(loaded.process_query('pyhton tutorial'), self.processor.process_query('pyhton tutorial'))
+            self.assertIsNone(QueryProcessor.load('test_query_index.bin', checksum=b'y' * 32))
+            del loaded
+        finally:
+            os.remove('test_query_index.bin')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,6 +1,7 @@
 
 import unittest
 from ranking import BM25Ranker
+import numpy_scoring
 
 class TestBM25Ranker(unittest.TestCase):
     def setUp(self):
@@ -43,5 +44,41 @@ class TestBM25Ranker(unittest.TestCase):
         self.assertTrue(score0 > 0)
         self.assertTrue(score1 > 0)
 
+    def test_search_many_matches_search(self):
+        queries = ["programming language", "python", "zebra", "", "python", "Java programming"]
+        batch = self.ranker.search_many(queries, top_k=3)
+        self.assertEqual(len(batch), len(queries))
+        for query, results in zip(queries, batch):
+            self.assertEqual(results, self.ranker.search(query, top_k=3))
+        self.assertEqual(self.ranker.search_many(queries, top_k=3, exhaustive=True), batch)
+
+    def test_search_weighted(self):
+        unit = self.ranker.search_weighted({'programming': 1, 'language': 1}, top_k=3)
+        self.assertEqual(unit, self.ranker.search("programming language", top_k=3))
+        weighted = {'java': 0.25, 'python': 1.0, 'zebra': 2.0, 'pizza': 0}
+        results = self.ranker.search_weighted(weighted, top_k=4)
+        self.assertEqual([doc for doc, _ in results], [0, 1])
+        self.assertAlmostEqual(results[1][1], self.ranker.search("java")[0][1] * 0.25)
+        self.assertEqual(self.ranker.search_weighted(weighted, top_k=4, exhaustive=True), results)
+        self.assertEqual(self.ranker.search_many([weighted, "python"], top_k=4),
+                         [results, self.ranker.search("python", top_k=4)])
+
+    def test_numpy_engine_matches_python(self):
+        # Runs the vectorized engine when NumPy is installed, the fallback otherwise
+        for query in ["programming language", "python python java", "pizza", "zebra"]:
+            expected = self.ranker.search(query, top_k=3)
+            actual = self.ranker.search(query, top_k=3, engine='numpy')
+            self.assertEqual([doc for doc, _ in actual], [doc for doc, _ in expected])
+            for (_, a), (_, e) in zip(actual, expected):
+                self.assertAlmostEqual(a, e, places=9)
+
+    @unittest.skipUnless(numpy_scoring.is_available(), "NumPy not installed")
+    def test_numpy_engine_with_deletes(self):
+        ranker = BM25Ranker(compact_ratio=1.0)
+        ranker.fit([dict(doc, url=str(i)) for i, doc in enumerate(self.corpus)])
+        ranker.delete_document('0')
+        self.assertEqual(ranker.search("python", engine='numpy'), [])
+        self.assertEqual([doc for doc, _ in ranker.search("programming", engine='numpy')], [1])
+
 if __name__ == '__main__':
     unittest.main()
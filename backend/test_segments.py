@@ -0,0 +1,160 @@
+import unittest
+import threading
+import time
+import sys
+import os
+
+# Add backend to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from ranking import BM25Ranker
+from segments import Segment, TieredMergePolicy
+import numpy_scoring
+
+WORDS = ['python', 'java', 'rust', 'search', 'engine', 'index', 'web', 'crawler', 'rank', 'query']
+
+
+def make_docs(n, offset=0):
+    return [{'url': f'https://site{i}.example',
+             'title': f'{WORDS[i % 10]} {WORDS[(i * 3) % 10]}',
+             'content': ' '.join(WORDS[(i + j) % 10] for j in range(i % 7 + 3))}
+            for i in range(offset, offset + n)]
+
+
+def ranked_urls(ranker, query):
+    urls = {doc_idx: url for url, doc_idx in ranker.url_index.items()}
+    return [(urls[doc_idx], round(score, 9)) for doc_idx, score in ranker.search(query, top_k=10)]
+
+
+class TestSegments(unittest.TestCase):
+    def assertMatchesFullFit(self, ranker, corpus):
+        reference = BM25Ranker()
+        reference.fit(corpus)
+        for query in ['python', 'web crawler', 'rank query index', 'rust java']:
+            self.assertEqual(ranked_urls(ranker, query), ranked_urls(reference, query))
+
+    def test_tiered_policy_merges_adjacent_runs(self):
+        policy = TieredMergePolicy(segments_per_tier=3, max_merge_docs=100)
+        small = [Segment({}, i, i + 1) for i in range(2)]
+        self.assertIsNone(policy.find_merge(small, set()))
+        small.append(Segment({}, 2, 3))
+        self.assertEqual(policy.find_merge(small, set()), (0, 3))
+        big = [Segment({}, 0, 90), Segment({}, 90, 180), Segment({}, 180, 270)]
+        self.assertIsNone(policy.find_merge(big, set()))  # over max_merge_docs
+        self.assertEqual(policy.find_merge(big, set(range(90, 130))), (1, 2))  # expunge
+
+    def test_adds_create_segments_and_merge(self):
+        corpus = make_docs(40)
+        ranker = BM25Ranker(merge_policy=TieredMergePolicy(segments_per_tier=4))
+        ranker.fit(corpus[:4])
+        for doc in corpus[4:]:
+            ranker.add_document(doc)
+            self.assertLess(len(ranker.segments), 12)
+        self.assertMatchesFullFit(ranker, corpus)
+        ranker.compact()
+        self.assertEqual(len(ranker.segments), 1)
+        self.assertMatchesFullFit(ranker, corpus)
+
+    def test_background_merging(self):
+        corpus = make_docs(30)
+        ranker = BM25Ranker(merge_policy=TieredMergePolicy(segments_per_tier=2))
+        ranker.fit(corpus[:2])
+        ranker.start_background_merging(interval=0.01)
+        try:
+            for doc in corpus[2:]:
+                ranker.add_document(doc)
+            deadline = time.time() + 5
+            while len(ranker.segments) > 5 and time.time() < deadline:
+                time.sleep(0.01)
+            self.assertLessEqual(len(ranker.segments), 5)
+        finally:
+            ranker.stop_background_merging()
+        self.assertMatchesFullFit(ranker, corpus)
+
+    def test_reads_during_writes(self):
+        corpus = make_docs(60)
+        ranker = BM25Ranker(merge_policy=TieredMergePolicy(segments_per_tier=2))
+        ranker.fit(corpus[:10])
+        errors = []
+        done = threading.Event()
+
+        def reader():
+            try:
+                while not done.is_set():
+                    for doc_idx, score in ranker.search('python web', top_k=5):
+                        self.assertGreater(score, 0)
+            except Exception as e:
+                errors.append(e)
+
+        thread = threading.Thread(target=reader)
+        thread.start()
+        ranker.start_background_merging(interval=0.001)
+        try:
+            for i, doc in enumerate(corpus[10:]):
+                ranker.add_document(doc)
+                if i % 5 == 0:
+                    ranker.delete_document(corpus[i]['url'])
+        finally:
+            done.set()
+            thread.join()
+            ranker.stop_background_merging()
+        self.assertEqual(errors, [])
+        deleted_urls = {corpus[i]['url'] for i in range(0, 50, 5)}
+        self.assertMatchesFullFit(ranker, [doc for doc in corpus if doc['url'] not in deleted_urls])
+
+    @unittest.skipUnless(numpy_scoring.is_available(), "NumPy not installed")
+    def test_numpy_search_during_adds(self):
+        corpus = make_docs(2000)
+        ranker = BM25Ranker(engine='numpy')
+        ranker.fit(corpus[:1000])
+        errors = []
+        done = threading.Event()
+
+        def reader():
+            try:
+                while not done.is_set():
+                    ranker.search('python web', top_k=5)
+            except Exception as e:
+                errors.append(e)
+
+        thread = threading.Thread(target=reader)
+        thread.start()
+        try:
+            for start in range(1000, 2000, 5):
+                ranker.add_documents(corpus[start:start + 5])
+        finally:
+            done.set()
+            thread.join()
+        self.assertEqual(errors, [])
+        self.assertEqual(len(ranker.doc_len), 2000)
+        self.assertMatchesFullFit(ranker, corpus)
+
+    def test_merge_during_query_keeps_deletes(self):
+        corpus = make_docs(20)
+        engines = [('python', False), ('python', True)]
+        if numpy_scoring.is_available():
+            engines.append(('numpy', False))
+        for engine, exhaustive in engines:
+            ranker = BM25Ranker(compact_ratio=1.0)
+            ranker.fit(corpus)
+            deleted = ranker.doc_index(corpus[0]['url'])
+            ranker.delete_document(corpus[0]['url'])
+            term_postings = ranker._term_postings
+
+            def merge_after_snapshot(segments, token):
+                # The query already holds the old segments: purge the tombstone now
+                if ranker.deleted:
+                    ranker.compact()
+                return term_postings(segments, token)
+
+            ranker._term_postings = merge_after_snapshot
+            results = ranker.search('python', top_k=20, exhaustive=exhaustive, engine=engine)
+            self.assertEqual(ranker.deleted, set())
+            self.assertNotIn(deleted, [doc_idx for doc_idx, _ in results])
+
+            ranker.delete_document(corpus[1]['url'])
+            batch = ranker.search_many(['python', 'java'], top_k=20, exhaustive=exhaustive, engine=engine)
+            self.assertNotIn(1, [doc_idx for results in batch for doc_idx, _ in results])
+
+if __name__ == '__main__':
+    unittest.main()
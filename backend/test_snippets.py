@@ -0,0 +1,107 @@
+import unittest
+import sys
+import os
+
+# Add backend to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from analysis import Analyzer
+from ranking import BM25Ranker
+from docstore import DocumentStore
+from snippets import split_sentences, sentence_table, best_window, make_snippet, ELLIPSIS
+
+STORE_PATH = 'test_snippets_docs.bin'
+
+LEAD = 'Python is a programming language. It is used for scripting and automation. '
+FILLER = 'This sentence talks about nothing in particular at all. ' * 6
+DOCS = [
+    {'title': 'Python', 'url': 'https://example.com/python',
+     'content': LEAD + FILLER + 'Crawlers fetch pages and the indexer builds postings. Café crème is served.'},
+    {'title': 'Short', 'url': 'https://example.com/short', 'content': 'No query terms here.'},
+    {'title': 'Empty', 'url': 'https://example.com/empty', 'content': ''},
+    {'title': 'Städte', 'url': 'https://example.com/staedte',
+     'content': 'Ärger öffnet Türen. ' * 3 + 'Zürich liegt am See. ' + 'Grüße aus Köln. ' * 4},
+]
+
+
+class TestSentences(unittest.TestCase):
+    def test_split_sentences(self):
+        text = 'First one. Second one? Third!  Fourth'
+        starts = split_sentences(text)
+        self.assertEqual([text[start:start + 5] for start in starts], ['First', 'Secon', 'Third', 'Fourt'])
+        self.assertEqual(split_sentences(''), [])
+
+        # Text without punctuation is cut at spaces
+        words = ' '.join(['word'] * 100)
+        starts = split_sentences(words, max_chars=50)
+        self.assertTrue(all(words[start - 1] == ' ' for start in starts[1:]))
+        self.assertTrue(all(b - a <= 50 for a, b in zip(starts, starts[1:])))
+
+    def test_table_offsets(self):
+        analyzer = Analyzer()
+        text = DOCS[0]['content']
+        char_starts, byte_starts, token_starts = sentence_table(text, analyzer)
+        tokens = analyzer.tokenize(text)
+        for char_start, byte_start, token_start in zip(char_starts, byte_starts, token_starts):
+            self.assertEqual(len(text[:char_start].encode('utf-8')), byte_start)
+            self.assertEqual(analyzer.tokenize(text[char_start:])[0], tokens[token_start])
+
+    def test_best_window(self):
+        starts = [0, 10, 20, 30, 40]
+        tokens = [0, 2, 4, 6, 8]
+        hits = [(1, 'a', 1.0), (6, 'b', 1.0), (7, 'b', 1.0), (9, 'a', 1.0)]
+        # Sentences 3-4 hold both terms; sentence 0 alone only one
+        self.assertEqual(best_window(starts, 50, tokens, hits, length=20), (3, 5))
+        self.assertEqual(best_window(starts, 50, tokens, [], length=20), (0, 2))
+        self.assertIsNone(best_window([], 0, [], hits))
+
+
+class TestMakeSnippet(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.ranker = BM25Ranker()
+        cls.ranker.fit(DOCS)
+        DocumentStore.write(STORE_PATH, DOCS, analyzer=cls.ranker.analyzer)
+
+    @classmethod
+    def tearDownClass(cls):
+        if os.path.exists(STORE_PATH):
+            os.remove(STORE_PATH)
+
+    def snippets(self, terms, doc_idx=0, length=80):
+        store = DocumentStore.open(STORE_PATH)
+        stored = make_snippet(store[doc_idx], doc_idx, self.ranker, self.ranker.tokenize(terms), length)
+        in_memory = make_snippet(DOCS[doc_idx], doc_idx, self.ranker, self.ranker.tokenize(terms), length)
+        del store
+        return stored, in_memory
+
+    def test_window_holds_query_terms(self):
+        stored, in_memory = self.snippets('crawlers postings')
+        self.assertEqual(stored, in_memory)
+        self.assertTrue(stored.startswith(ELLIPSIS + 'Crawlers fetch pages'))
+        self.assertLessEqual(len(stored), 80 + 2 * len(ELLIPSIS))
+
+        # Multi-byte text decodes from the byte offsets
+        stored, in_memory = self.snippets('café')
+        self.assertEqual(stored, in_memory)
+        self.assertIn('Café crème', stored)
+
+    def test_windows_measured_in_bytes(self):
+        # Stored and in-memory documents pick the same window of non-ASCII text
+        stored, in_memory = self.snippets('zürich', doc_idx=3, length=55)
+        self.assertEqual(stored, in_memory)
+        self.assertTrue(stored.startswith(ELLIPSIS + 'Zürich liegt am See.'))
+        self.assertLessEqual(len(stored.strip('.').encode('utf-8')), 55)
+
+    def test_lead_without_hits(self):
+        stored, in_memory = self.snippets('unknownterm')
+        self.assertEqual(stored, in_memory)
+        self.assertTrue(stored.startswith('Python is a programming language.'))
+        self.assertTrue(stored.endswith(ELLIPSIS))
+
+        self.assertEqual(self.snippets('terms', doc_idx=1), ('No query terms here.',) * 2)
+        self.assertEqual(self.snippets('python', doc_idx=2), ('', ''))
+
+
+if __name__ == '__main__':
+    unittest.main()